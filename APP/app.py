@@ -4,27 +4,48 @@ Autor: AI Assistant
 Data: 2026-01-12
 """
 
+from utils.startup_profiler import profile_import, mark_stage, write_startup_report  # Pomiar zimnego startu (jako pierwszy)
+import time  # Czas obsługi całego żądania (metryki)
+_request_started = time.perf_counter()  # Początek przebiegu skryptu
+
 import streamlit as st  # Framework do tworzenia aplikacji webowych
-import pandas as pd  # Biblioteka do pracy z danymi
 import os  # Operacje na systemie plików
+import uuid  # ID sesji (limity komentarzy AI)
 from dotenv import load_dotenv  # Ładowanie zmiennych środowiskowych
 
 # Załaduj zmienne środowiskowe z pliku .env
 load_dotenv()
 
 # Import modułów z aplikacji
+# Ciężkie zależności (PyCaret, OpenAI/Langfuse) są importowane leniwie - dopiero w funkcjach, które ich potrzebują
 from config import *  # Import wszystkich stałych z konfiguracji
-from utils.data_loader import load_historical_data, get_data_summary  # Import funkcji do ładowania danych
-from utils.model_loader import load_model_from_local, get_model_info  # Import funkcji do ładowania modelu
-from utils.predictor import prepare_input_data, predict_time, calculate_age_category  # Import funkcji predykcji
-from utils.stats_calculator import (  # Import funkcji statystyk
-    get_winners, get_averages, get_category_stats,
-    estimate_ranking, format_time_from_seconds,
-    get_winners_by_category, get_average_times_by_category
-)
-from utils.openai_helper import (  # Import funkcji OpenAI (z automatycznym Langfuse)
-    initialize_openai_client, generate_commentary, check_openai_availability
-)
+with profile_import('utils.data_loader'):
+    from utils.data_loader import load_historical_data, get_data_summary  # Import funkcji do ładowania danych
+with profile_import('utils.model_loader'):
+    from utils.model_loader import get_model_registry, get_model_info  # Rejestr wersji modelu (podmiana bez restartu)
+with profile_import('utils.predictor'):
+    from utils.predictor import prepare_input_data, predict_time, predict_batch, calculate_age_category  # Import funkcji predykcji
+with profile_import('utils.stats_calculator'):
+    from utils.stats_calculator import (  # Import funkcji statystyk
+        get_winners, get_averages, get_category_stats,
+        estimate_ranking, format_time_from_seconds,
+        get_winners_by_category, get_average_times_by_category,
+        get_category_winners, get_stats_cube, get_ranking_index, get_data_version
+    )
+with profile_import('utils.result_cache'):
+    from utils.result_cache import get_result_cache, result_cache_key  # Wyniki wspólne dla sesji
+with profile_import('utils.intervals'):
+    from utils.intervals import get_residual_table  # Import tabeli reszt (przedziały predykcji)
+with profile_import('utils.metrics'):
+    from utils.metrics import METRICS, stage_timer  # Czasy etapów (histogramy, eksport Prometheus)
+with profile_import('utils.langfuse_helper'):
+    from utils.langfuse_helper import get_telemetry_exporter  # Liczniki eksportera telemetrii
+with profile_import('utils.openai_helper'):
+    from utils.openai_helper import (  # Import funkcji OpenAI (telemetria Langfuse przez eksporter w tle)
+        start_commentary_stream, check_openai_availability, get_commentary_cache, get_commentary_bank,
+        OPENAI_CIRCUIT, OPENAI_ADMISSION
+    )
+mark_stage('importy')  # Koniec importów
 
 # ============================================
 # KONFIGURACJA STRONY
@@ -350,6 +371,8 @@ with st.expander("ℹ️ O aplikacji", expanded=True):  # Rozwijana sekcja z inf
     Jeśli nie znasz swojego czasu, spróbuj pobiec 5km i zmierz czas!
     """)
 
+mark_stage('nagłówek')  # Konfiguracja strony, CSS, hero, sekcja informacyjna
+
 # ============================================
 # ŁADOWANIE DANYCH I MODELU
 # ============================================
@@ -362,7 +385,12 @@ def load_app_data():
 
 # Wczytaj dane
 try:
-    df_historical, data_summary = load_app_data()  # Załaduj dane i podsumowanie
+    with stage_timer('load_data'):
+        df_historical, data_summary = load_app_data()  # Załaduj dane i podsumowanie
+    
+    # Zbuduj kostkę agregatów i indeks rankingowy (raz na wersję danych w procesie)
+    get_stats_cube(df_historical)
+    get_ranking_index(df_historical)
     
     # Wyświetl info o danych
     st.sidebar.success(f"✅ Załadowano {data_summary['total_records']:,} rekordów")  # Potwierdzenie
@@ -371,22 +399,61 @@ except Exception as e:  # Jeśli błąd podczas ładowania
     st.error(f"❌ Błąd inicjalizacji aplikacji: {e}")  # Wyświetl błąd
     st.stop()  # Zatrzymaj aplikację
 
+mark_stage('dane')  # Dane, kostka agregatów i indeks rankingowy
+
 # Wczytaj model ML
 try:
-    model = load_model_from_local()  # Załaduj model z lokalnego folderu
+    with stage_timer('load_model'):
+        model_registry = get_model_registry()  # Pierwsze wywołanie w procesie ładuje wersję z manifestu
+        model_registry.refresh()  # Zmieniony manifest - nowa wersja ładuje się w tle
+        active_model = model_registry.current()  # Jedna wersja na cały przebieg skryptu
+    model = active_model['model']  # Model aktywnej wersji
+    model_version = active_model['version']  # Etykieta predykcji
     model_info = get_model_info(model)  # Pobierz info o modelu
     st.sidebar.success(f"✅ Model {model_info.get('model_name', 'N/A')} załadowany")  # Potwierdzenie
+    st.sidebar.caption(f"🏷️ Wersja modelu: {model_version}")
+    registry_status = model_registry.status()
+    if registry_status['loading']:  # Podmiana nastąpi po załadowaniu
+        st.sidebar.info(f"⏳ Ładowanie wersji {registry_status['loading']} w tle")
+    if registry_status['error']:  # Nieudane ładowanie - działa dotychczasowa wersja
+        st.sidebar.warning(f"⚠️ Nie udało się załadować modelu: {registry_status['error']}")
 except Exception as e:  # Jeśli błąd
     st.error(f"❌ Błąd ładowania modelu: {e}")  # Wyświetl błąd
     st.stop()  # Zatrzymaj
 
-# Inicjalizuj klienta OpenAI (z Langfuse wrapper jeśli skonfigurowany)
-openai_client = None  # Domyślnie None
+# Tabela reszt modelu na danych historycznych (przedziały predykcji)
+try:
+    residual_table = get_residual_table(df_historical, model, model_version)  # Raz na wersję danych i modelu
+except Exception as e:  # Bez przedziałów aplikacja nadal działa
+    residual_table = None
+    st.sidebar.warning(f"⚠️ Przedziały predykcji niedostępne: {e}")
+
+mark_stage('model')  # Model ML i tabela reszt
+
+# OpenAI - tu tylko sprawdzenie klucza; klient (import openai/langfuse) powstaje dopiero przy generowaniu komentarza
+openai_enabled = check_openai_availability()  # Czy OpenAI skonfigurowane
 
-if check_openai_availability():  # Jeśli OpenAI skonfigurowane
-    openai_client = initialize_openai_client()  # Inicjalizuj klienta (automatycznie z Langfuse jeśli dostępny)
-    if openai_client:  # Jeśli sukces
-        st.sidebar.success("✅ OpenAI połączone")  # Potwierdzenie
+if openai_enabled:  # Jeśli jest klucz API
+    st.sidebar.success("✅ OpenAI skonfigurowane")  # Potwierdzenie
+    
+    # Liczniki cache komentarzy (monitoring kosztów API) i stan circuit breakera
+    with st.sidebar.expander("📊 Komentarze AI"):
+        cache_stats = get_commentary_cache().stats()
+        st.caption(
+            f"Cache - trafienia: {cache_stats['hits']} · chybienia: {cache_stats['misses']} · "
+            f"skuteczność: {cache_stats['hit_rate']}% · wpisy: {cache_stats['size']}"
+        )
+        circuit_stats = OPENAI_CIRCUIT.stats()
+        st.caption(
+            f"API - obwód: {circuit_stats['state']} · błędy: {circuit_stats['error_rate']}% · "
+            f"p95: {circuit_stats['p95_seconds']} s · odrzucone: {circuit_stats['rejected']}"
+        )
+        admission_stats = OPENAI_ADMISSION.stats()
+        st.caption(
+            f"Kolejka - w toku: {admission_stats['in_flight']} · czeka: {admission_stats['waiting']} · "
+            f"dopuszczone: {admission_stats['admitted']} · odrzucone: {sum(admission_stats['rejected'].values())} · "
+            f"śr. oczekiwanie: {admission_stats['mean_wait_seconds']} s"
+        )
 
 # ============================================
 # PANEL BOCZNY - FORMULARZ
@@ -484,9 +551,10 @@ if st.session_state.get('prediction_done', False):
         type="secondary",
         use_container_width=True
     ):
-        # Wyczyść session_state i przeładuj
+        # Wyczyść session_state i przeładuj (ID sesji zostaje - limit komentarzy AI dotyczy całej sesji)
         for key in list(st.session_state.keys()):
-            del st.session_state[key]
+            if key != 'session_id':
+                del st.session_state[key]
         st.rerun()
 
 # Przycisk do przewidywania
@@ -499,6 +567,10 @@ predict_button = st.sidebar.button(
 # ============================================
 # INICJALIZACJA SESSION STATE
 # ============================================
+# ID sesji - klucz limitu wywołań LLM dla sesji
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 # Jeśli kliknięto przycisk, zapisz dane w session_state
 if predict_button:
     st.session_state.prediction_done = True
@@ -508,6 +580,9 @@ if predict_button:
     st.session_state.time_5km_seconds = time_5km_seconds
     st.session_state.time_5km_minutes = time_5km_minutes
     st.session_state.time_5km_display = time_5km_display
+    st.rerun()  # Panel boczny od nowa - przycisk "Nowa predykcja" widoczny od razu (symulator to fragment)
+
+mark_stage('formularz')  # Panel boczny
 
 # ============================================
 # SEKCJA GŁÓWNA - PLACEHOLDER
@@ -530,80 +605,103 @@ else:  # Jeśli wykonano predykcję (zapisaną w session_state)
         st.stop()  # Zatrzymaj
     
     # ============================================
-    # PRZEWIDYWANIE CZASU (tylko raz, potem cache w session_state)
+    # WYNIKI (wspólny cache procesu - sesja trzyma tylko klucz)
     # ============================================
-    if 'prediction_result' not in st.session_state:
+    if 'result_key' not in st.session_state:
+        st.session_state.result_key = result_cache_key(
+            gender, age, time_5km_seconds, get_data_version(df_historical), model_version
+        )  # Te same wejścia, dane i model = ten sam pakiet wyników
+    result_cache = get_result_cache()
+    result_bundle = result_cache.get(st.session_state.result_key)
+    if result_bundle is None and st.session_state.result_key[-1] != model_version:  # Pakiet starej wersji usunięty
+        st.session_state.result_key = result_cache_key(
+            gender, age, time_5km_seconds, get_data_version(df_historical), model_version
+        )  # Liczymy aktywną wersją - etykieta zgodna z modelem
+        result_bundle = result_cache.get(st.session_state.result_key)
+    
+    if result_bundle is None:  # Pierwsze takie wejścia w procesie (lub pakiet usunięty przez limit)
         st.success(f"✅ Witaj, {user_name}! Trwa przewidywanie...")  # Potwierdzenie
         
         with st.spinner("🤖 Trwa przewidywanie czasu..."):
             # Przygotuj dane wejściowe
-            df_input = prepare_input_data(
-                gender=gender,  # Płeć
-                age=age,  # Wiek
-                time_5km_seconds=time_5km_seconds,  # Czas na 5km w sekundach
-                country=DEFAULT_COUNTRY  # Kraj (POL)
-            )
+            with stage_timer('prepare_input_data'):
+                df_input = prepare_input_data(
+                    gender=gender,  # Płeć
+                    age=age,  # Wiek
+                    time_5km_seconds=time_5km_seconds,  # Czas na 5km w sekundach
+                    country=DEFAULT_COUNTRY  # Kraj (POL)
+                )
             
             # Wykonaj predykcję
-            prediction_result = predict_time(model, df_input)  # Przewiduj czas
+            with stage_timer('predict_time'):
+                prediction_result = predict_time(model, df_input, residual_table)  # Przewiduj czas (+ przedział)
+        
+        # Kategoria wiekowa (przekaż płeć do funkcji)
+        age_category = calculate_age_category(age, gender)  # Oblicz kategorię z uwzględnieniem płci
+        
+        # Statystyki kategorii
+        category_stats = get_category_stats(df_historical, age_category, gender)  # Statystyki
+        
+        # Szacowana pozycja
+        with stage_timer('estimate_ranking'):  # Obie pozycje jako jeden etap
+            ranking_general = estimate_ranking(
+                df_historical,
+                prediction_result['time_seconds'],
+                gender
+            )  # Pozycja ogólna
             
-            # Zapisz w session_state
-            st.session_state.prediction_result = prediction_result
-    else:
-        # Odczytaj z cache
-        prediction_result = st.session_state.prediction_result
+            ranking_category = estimate_ranking(
+                df_historical,
+                prediction_result['time_seconds'],
+                gender,
+                age_category
+            )  # Pozycja w kategorii
+        
+        # Zwycięzcy z kategorii użytkownika (odczyt z kostki agregatów)
+        with stage_timer('category_winners'):
+            category_winners = get_category_winners(df_historical, age_category, gender)
+        
+        result_bundle = {
+            'prediction_result': prediction_result,  # Czas, tempo, przedział
+            'age_category': age_category,  # Np. 'M30'
+            'category_stats': category_stats,  # Statystyki kategorii
+            'ranking_general': ranking_general,  # Pozycja ogólna
+            'ranking_category': ranking_category,  # Pozycja w kategorii
+            'category_winners': category_winners,  # Zwycięzcy kategorii z poszczególnych lat
+            'model_version': model_version  # Wersja modelu, która policzyła predykcję
+        }
+        result_cache.put(st.session_state.result_key, result_bundle)
+    
+    # Pakiet jest współdzielony przez sesje - tylko odczyt
+    prediction_result = result_bundle['prediction_result']
+    age_category = result_bundle['age_category']
+    category_stats = result_bundle['category_stats']
+    ranking_general = result_bundle['ranking_general']
+    ranking_category = result_bundle['ranking_category']
+    gender_pl = "mężczyzn" if gender == 'M' else "kobiet"  # Płeć po polsku (do wyświetlania)
     
     # ============================================
     # WYŚWIETL WYNIK PREDYKCJI - PREMIUM CARD
     # ============================================
+    # Przedział predykcji (jeśli dostępna tabela reszt)
+    interval_label = f"P{round(INTERVAL_QUANTILES[0] * 100)}–P{round(INTERVAL_QUANTILES[1] * 100)}"  # Np. P10–P90
+    interval_html = ""
+    if 'time_low_formatted' in prediction_result:
+        interval_html = f'<div class="prediction-pace">📏 Zakres {interval_label}: {prediction_result["time_low_formatted"]} – {prediction_result["time_high_formatted"]}</div>'
+    
     st.markdown(f"""
     <div class="prediction-box">
         <div class="prediction-label">🎯 Przewidywany czas końcowy dla <strong>{user_name}</strong></div>
         <div class="prediction-time">{prediction_result["time_formatted"]}</div>
         <div class="prediction-pace">⚡ Tempo: {prediction_result['pace_per_km']} na kilometr</div>
+        {interval_html}
     </div>
     """, unsafe_allow_html=True)
     
-    # ============================================
-    # OBLICZ STATYSTYKI (tylko raz, potem cache)
-    # ============================================
-    if 'age_category' not in st.session_state:
-        # Kategoria wiekowa (przekaż płeć do funkcji)
-        age_category = calculate_age_category(age, gender)  # Oblicz kategorię z uwzględnieniem płci
-        
-        # Płeć po polsku (do wyświetlania)
-        gender_pl = "mężczyzn" if gender == 'M' else "kobiet"
-        
-        # Statystyki kategorii
-        category_stats = get_category_stats(df_historical, age_category, gender)  # Statystyki
-        
-        # Szacowana pozycja
-        ranking_general = estimate_ranking(
-            df_historical,
-            prediction_result['time_seconds'],
-            gender
-        )  # Pozycja ogólna
-        
-        ranking_category = estimate_ranking(
-            df_historical,
-            prediction_result['time_seconds'],
-            gender,
-            age_category
-        )  # Pozycja w kategorii
-        
-        # Zapisz w session_state
-        st.session_state.age_category = age_category
-        st.session_state.gender_pl = gender_pl
-        st.session_state.category_stats = category_stats
-        st.session_state.ranking_general = ranking_general
-        st.session_state.ranking_category = ranking_category
-    else:
-        # Odczytaj z cache
-        age_category = st.session_state.age_category
-        gender_pl = st.session_state.gender_pl
-        category_stats = st.session_state.category_stats
-        ranking_general = st.session_state.ranking_general
-        ranking_category = st.session_state.ranking_category
+    if interval_html and residual_table is not None:
+        st.caption(f"📏 Zakres {interval_label}: tak szacujemy niepewność modelu - "
+                   f"w danych historycznych {residual_table['coverage']}% wyników mieściło się w swoim zakresie.")
+    st.caption(f"🏷️ Wersja modelu: {result_bundle['model_version']}")
     
     # ============================================
     # SEKCJA STATYSTYK - PREMIUM CARDS
@@ -680,182 +778,217 @@ else:  # Jeśli wykonano predykcję (zapisaną w session_state)
             st.info("Brak danych")
     
     # ============================================
-    # KOMENTARZ AI (OPENAI) - generuj tylko raz
+    # KOMENTARZ AI (OPENAI) - generuj tylko raz, strumieniowo w tle
     # ============================================
-    if openai_client:  # Jeśli OpenAI dostępne
+    if openai_enabled:  # Jeśli OpenAI skonfigurowane
         st.markdown("---")
         st.markdown('<div class="section-header">🤖 Komentarz Trenera AI</div>', unsafe_allow_html=True)
         st.markdown("<br>", unsafe_allow_html=True)
         
-        if 'commentary' not in st.session_state:
-            with st.spinner("Generuję spersonalizowany komentarz..."):
-                # Generuj komentarz (Langfuse wrapper automatycznie loguje)
-                commentary = generate_commentary(
-                    client=openai_client,
-                    user_name=user_name,
-                    predicted_time_formatted=prediction_result['time_formatted'],
-                    gender=gender,
-                    age=age,
-                    age_category=age_category,
-                    category_stats=category_stats,
-                    ranking_info=ranking_category
-                )
-                
-                # Zapisz w session_state
-                st.session_state.commentary = commentary
-        else:
-            # Odczytaj z cache
-            commentary = st.session_state.commentary
+        # Generowanie startuje w tle (raz na predykcję) - reszta strony renderuje się od razu,
+        # niezależnie od tego, czy API odpowiada szybko, wolno czy wcale
+        if 'commentary_stream' not in st.session_state:
+            st.session_state.commentary_stream = start_commentary_stream(
+                predicted_time_formatted=prediction_result['time_formatted'],
+                gender=gender,
+                age_category=age_category,
+                category_stats=category_stats,
+                ranking_info=ranking_category,
+                session_id=st.session_state.session_id
+            )
+        commentary_stream = st.session_state.commentary_stream
         
-        if commentary:  # Jeśli wygenerowano komentarz
-            st.markdown(f"""
-            <div class="ai-box">
-                <strong>💬 {user_name}, oto moja analiza Twojego wyniku:</strong><br><br>
-                {commentary}
-            </div>
-            """, unsafe_allow_html=True)
+        def show_commentary(polling):
+            """Wyświetla komentarz - w trakcie strumieniowania fragment odświeża się co COMMENTARY_POLL_SECONDS"""
+            stream = st.session_state.commentary_stream
+            if polling and stream.done:  # Koniec strumienia - pełny rerun wyłącza odświeżanie fragmentu
+                st.rerun()
+            
+            commentary = stream.render(user_name, prediction_result['time_formatted'])  # Imię i czas zamiast znaczników
+            if commentary:  # Jeśli jest już (część) komentarza
+                cursor = "" if stream.done else " ▌"  # Kursor w trakcie generowania
+                st.markdown(f"""
+                <div class="ai-box">
+                    <strong>💬 {user_name}, oto moja analiza Twojego wyniku:</strong><br><br>
+                    {commentary}{cursor}
+                </div>
+                """, unsafe_allow_html=True)
+            elif not stream.done:  # Czekamy na pierwszy token
+                st.caption("⏳ Generuję spersonalizowany komentarz...")
+            
+            if stream.rejected_reason == 'session_rate':  # Limit komentarzy AI dla sesji
+                st.caption("ℹ️ Komentarz uproszczony - osiągnięto limit komentarzy AI, spróbuj ponownie za chwilę")
+            elif stream.is_fallback:  # API niedostępne lub przeciążone - komentarz lokalny (wątek nie może wywołać st.*)
+                st.caption("ℹ️ Komentarz uproszczony - usługa AI jest chwilowo niedostępna")
+            elif stream.done and stream.error:  # Np. brak klucza API
+                st.warning(f"⚠️ Nie udało się wygenerować komentarza AI: {stream.error}")
+        
+        polling = not commentary_stream.done  # Odświeżaj tylko dopóki trwa generowanie
+        st.fragment(run_every=COMMENTARY_POLL_SECONDS if polling else None)(show_commentary)(polling)
     
     # ============================================
     # ZWYCIĘZCY Z KATEGORII UŻYTKOWNIKA
     # ============================================
-    st.markdown("---")
-    st.markdown('<div class="section-header">🏆 Zwycięzcy z Twojej Kategorii</div>', unsafe_allow_html=True)
-    st.markdown("<br>", unsafe_allow_html=True)
-    st.markdown(f"**📍 Twoja kategoria:** {age_category} ({gender_pl})")
-    
-    # Pobierz wszystkich zwycięzców
-    all_winners = get_winners_by_category(df_historical)
-    
-    # Filtruj tylko zwycięzców z kategorii użytkownika
-    user_category_winners = all_winners[
-        (all_winners['Kategoria wiekowa'] == age_category) &
-        (all_winners['Płeć'] == gender)
-    ].copy()
-    
-    if len(user_category_winners) > 0:
-        # Przygotuj DataFrame do wyświetlenia
-        if '5km_formatted' in user_category_winners.columns:
-            display_cols = ['Rok', 'Imię i nazwisko', 'Czas_formatted', '5km_formatted', 'Kraj']
-            col_names = ['Rok', 'Zawodnik', 'Czas końcowy', 'Czas 5km', 'Kraj']
-        else:
-            display_cols = ['Rok', 'Imię i nazwisko', 'Czas_formatted', 'Kraj']
-            col_names = ['Rok', 'Zawodnik', 'Czas końcowy', 'Kraj']
-        
-        winners_display = user_category_winners[display_cols].copy()
-        winners_display.columns = col_names
-        
-        st.dataframe(
-            winners_display,
-            use_container_width=True,
-            hide_index=True
-        )
+    # Fragment - rerun tej sekcji nie uruchamia reszty skryptu
+    @st.fragment
+    def show_category_winners(result_bundle, prediction_result, age_category, gender_pl):
+        """Wyświetla zwycięzców z kategorii użytkownika i różnicę do najlepszego czasu"""
+        st.markdown("---")
+        st.markdown('<div class="section-header">🏆 Zwycięzcy z Twojej Kategorii</div>', unsafe_allow_html=True)
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown(f"**📍 Twoja kategoria:** {age_category} ({gender_pl})")
         
-        # Dodaj informację porównawczą
-        best_time = user_category_winners['Czas_sekundy'].min()
-        diff_to_winner = prediction_result['time_seconds'] - best_time
+        user_category_winners = result_bundle['category_winners']  # Zwycięzcy kategorii (z pakietu wyników)
         
-        if diff_to_winner > 0:
-            st.info(f"📈 Twój przewidywany czas jest o **{diff_to_winner//60} min {diff_to_winner%60} s** wolniejszy od najlepszego czasu w Twojej kategorii")
+        if len(user_category_winners) > 0:
+            # Przygotuj DataFrame do wyświetlenia
+            if '5km_formatted' in user_category_winners.columns:
+                display_cols = ['Rok', 'Imię i nazwisko', 'Czas_formatted', '5km_formatted', 'Kraj']
+                col_names = ['Rok', 'Zawodnik', 'Czas końcowy', 'Czas 5km', 'Kraj']
+            else:
+                display_cols = ['Rok', 'Imię i nazwisko', 'Czas_formatted', 'Kraj']
+                col_names = ['Rok', 'Zawodnik', 'Czas końcowy', 'Kraj']
+            
+            winners_display = user_category_winners[display_cols].copy()
+            winners_display.columns = col_names
+            
+            st.dataframe(
+                winners_display,
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            # Dodaj informację porównawczą
+            best_time = user_category_winners['Czas_sekundy'].min()
+            diff_to_winner = prediction_result['time_seconds'] - best_time
+            
+            if diff_to_winner > 0:
+                st.info(f"📈 Twój przewidywany czas jest o **{diff_to_winner//60} min {diff_to_winner%60} s** wolniejszy od najlepszego czasu w Twojej kategorii")
+            else:
+                st.success(f"🚀 Gratulacje! Twój przewidywany czas jest lepszy niż najlepszy zarejestrowany wynik!")
         else:
-            st.success(f"🚀 Gratulacje! Twój przewidywany czas jest lepszy niż najlepszy zarejestrowany wynik!")
-    else:
-        st.warning(f"Brak danych o zwycięzcach w kategorii {age_category} dla płci {gender_pl}")
+            st.warning(f"Brak danych o zwycięzcach w kategorii {age_category} dla płci {gender_pl}")
+    
+    show_category_winners(result_bundle, prediction_result, age_category, gender_pl)
     
     # ============================================
     # SYMULATOR CZASÓW
     # ============================================
-    st.markdown("---")
-    st.markdown('<div class="section-header">🎮 Symulator Czasów</div>', unsafe_allow_html=True)
-    st.markdown("<br>", unsafe_allow_html=True)
-    st.markdown("""
-    <div class="info-box">
-        <strong>💡 Jak to działa?</strong><br>
-        Dostosuj parametry poniżej i kliknij przycisk, aby zobaczyć jak zmiana wieku, płci lub czasu na 5km wpływa na przewidywany czas końcowy.
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Formularz - blokuje reruns do momentu kliknięcia submit
-    with st.form(key="simulator_form"):
-        # Suwaki symulacji
-        sim_col1, sim_col2 = st.columns(2)
-        
-        with sim_col1:
-            sim_age = st.slider(
-                "Wiek:",
-                min_value=MIN_AGE,
-                max_value=MAX_AGE,
-                value=age,
-                key="sim_age_slider"
-            )
-        
-        with sim_col2:
-            sim_gender_display = st.selectbox(
-                "Płeć:",
-                options=list(GENDER_MAPPING.keys()),
-                index=0 if gender == 'M' else 1,
-                key="sim_gender_select"
-            )
-            sim_gender = GENDER_MAPPING[sim_gender_display]
-        
-        # Czas na 5km z minutami i sekundami
-        st.markdown("**Czas na 5 km:**")
-        sim_time_col1, sim_time_col2 = st.columns(2)
-        
-        with sim_time_col1:
-            sim_time_5km_minutes = st.number_input(
-                "Minuty:",
-                min_value=MIN_TIME_5KM,
-                max_value=MAX_TIME_5KM,
-                value=time_5km_minutes,
-                step=1,
-                key="sim_time_5km_min"
-            )
-        
-        with sim_time_col2:
-            sim_time_5km_seconds_only = st.number_input(
-                "Sekundy:",
-                min_value=0,
-                max_value=59,
-                value=time_5km_seconds_only,
-                step=1,
-                key="sim_time_5km_sec"
-            )
+    # Fragment - wysłanie formularza uruchamia ponownie tylko tę funkcję (bez CSS, danych, wyników i komentarza)
+    @st.fragment
+    def show_simulator(model, model_version, residual_table, prediction_result, gender, age,
+                       time_5km_minutes, time_5km_seconds_only, interval_label):
+        """
+        Symulator czasów - formularz i predykcja dla zmienionych parametrów
         
-        # Przycisk submit w formularzu
-        submit_button = st.form_submit_button("🚀 Symulacja dla nowych parametrów", type="primary", use_container_width=True)
-    
-    # Wykonaj symulację tylko po kliknięciu przycisku
-    if submit_button:
-        # Oblicz całkowity czas w sekundach
-        sim_time_5km_seconds = sim_time_5km_minutes * 60 + sim_time_5km_seconds_only
-        sim_time_5km_display = f"{sim_time_5km_minutes:02d}:{sim_time_5km_seconds_only:02d}"
+        Args:
+            model: Aktywny model (wersja z chwili renderu strony)
+            model_version (str): Wersja modelu (etykieta wyniku)
+            residual_table (dict): Tabela reszt (przedziały) lub None
+            prediction_result (dict): Wynik predykcji użytkownika (punkt odniesienia)
+            gender (str): Płeć użytkownika ('M' lub 'K') - wartość domyślna
+            age (int): Wiek użytkownika - wartość domyślna
+            time_5km_minutes (int): Minuty czasu na 5km - wartość domyślna
+            time_5km_seconds_only (int): Sekundy czasu na 5km - wartość domyślna
+            interval_label (str): Opis przedziału predykcji
+        """
+        st.markdown("---")
+        st.markdown('<div class="section-header">🎮 Symulator Czasów</div>', unsafe_allow_html=True)
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown("""
+        <div class="info-box">
+            <strong>💡 Jak to działa?</strong><br>
+            Dostosuj parametry poniżej i kliknij przycisk, aby zobaczyć jak zmiana wieku, płci lub czasu na 5km wpływa na przewidywany czas końcowy.
+        </div>
+        """, unsafe_allow_html=True)
         
-        with st.spinner("Obliczam..."):
-            # Przygotuj dane symulacji
-            sim_df_input = prepare_input_data(
-                gender=sim_gender,
-                age=sim_age,
-                time_5km_seconds=sim_time_5km_seconds,
-                country=DEFAULT_COUNTRY
-            )
+        # Formularz - blokuje reruns do momentu kliknięcia submit
+        with st.form(key="simulator_form"):
+            # Suwaki symulacji
+            sim_col1, sim_col2 = st.columns(2)
+            
+            with sim_col1:
+                sim_age = st.slider(
+                    "Wiek:",
+                    min_value=MIN_AGE,
+                    max_value=MAX_AGE,
+                    value=age,
+                    key="sim_age_slider"
+                )
             
-            # Przewiduj
-            sim_prediction = predict_time(model, sim_df_input)
+            with sim_col2:
+                sim_gender_display = st.selectbox(
+                    "Płeć:",
+                    options=list(GENDER_MAPPING.keys()),
+                    index=0 if gender == 'M' else 1,
+                    key="sim_gender_select"
+                )
+                sim_gender = GENDER_MAPPING[sim_gender_display]
             
-            # Wyświetl wynik symulacji
-            st.markdown("---")
-            st.markdown(f"**Parametry symulacji:** Wiek: {sim_age}, Płeć: {sim_gender_display}, Czas 5km: {sim_time_5km_display} ({sim_time_5km_seconds}s)")
-            st.success(f"### 🎯 Przewidywany czas: **{sim_prediction['time_formatted']}**")
-            st.info(f"**Tempo:** {sim_prediction['pace_per_km']}")
+            # Czas na 5km z minutami i sekundami
+            st.markdown("**Czas na 5 km:**")
+            sim_time_col1, sim_time_col2 = st.columns(2)
             
-            # Porównaj z oryginalnym wynikiem
-            diff_seconds = sim_prediction['time_seconds'] - prediction_result['time_seconds']
-            if diff_seconds > 0:
-                st.warning(f"⬆️ Wolniejszy o {abs(diff_seconds)//60} min {abs(diff_seconds)%60} s względem Twojego wyniku")
-            elif diff_seconds < 0:
-                st.success(f"⬇️ Szybszy o {abs(diff_seconds)//60} min {abs(diff_seconds)%60} s względem Twojego wyniku")
-            else:
-                st.info("➡️ Identyczny czas jak Twój wynik")
+            with sim_time_col1:
+                sim_time_5km_minutes = st.number_input(
+                    "Minuty:",
+                    min_value=MIN_TIME_5KM,
+                    max_value=MAX_TIME_5KM,
+                    value=time_5km_minutes,
+                    step=1,
+                    key="sim_time_5km_min"
+                )
+            
+            with sim_time_col2:
+                sim_time_5km_seconds_only = st.number_input(
+                    "Sekundy:",
+                    min_value=0,
+                    max_value=59,
+                    value=time_5km_seconds_only,
+                    step=1,
+                    key="sim_time_5km_sec"
+                )
+            
+            # Przycisk submit w formularzu
+            submit_button = st.form_submit_button("🚀 Symulacja dla nowych parametrów", type="primary", use_container_width=True)
+        
+        # Wykonaj symulację tylko po kliknięciu przycisku
+        if submit_button:
+            # Oblicz całkowity czas w sekundach
+            sim_time_5km_seconds = sim_time_5km_minutes * 60 + sim_time_5km_seconds_only
+            sim_time_5km_display = f"{sim_time_5km_minutes:02d}:{sim_time_5km_seconds_only:02d}"
+            
+            with st.spinner("Obliczam..."):
+                # Przewiduj (API wsadowe - bez efektów ubocznych Streamlit, jeden wiersz)
+                with stage_timer('simulator'):
+                    sim_prediction = predict_batch(
+                        model,
+                        genders=[sim_gender],
+                        ages=[sim_age],
+                        times_5km_seconds=[sim_time_5km_seconds],
+                        residual_table=residual_table
+                    ).iloc[0]
+                
+                # Wyświetl wynik symulacji
+                st.markdown("---")
+                st.markdown(f"**Parametry symulacji:** Wiek: {sim_age}, Płeć: {sim_gender_display}, Czas 5km: {sim_time_5km_display} ({sim_time_5km_seconds}s)")
+                st.success(f"### 🎯 Przewidywany czas: **{sim_prediction['time_formatted']}**")
+                st.info(f"**Tempo:** {sim_prediction['pace_per_km']}")
+                if 'time_low_formatted' in sim_prediction:  # Przedział predykcji
+                    st.caption(f"📏 Zakres {interval_label}: {sim_prediction['time_low_formatted']} – {sim_prediction['time_high_formatted']}")
+                st.caption(f"🏷️ Wersja modelu: {model_version}")
+                
+                # Porównaj z oryginalnym wynikiem
+                diff_seconds = sim_prediction['time_seconds'] - prediction_result['time_seconds']
+                if diff_seconds > 0:
+                    st.warning(f"⬆️ Wolniejszy o {abs(diff_seconds)//60} min {abs(diff_seconds)%60} s względem Twojego wyniku")
+                elif diff_seconds < 0:
+                    st.success(f"⬇️ Szybszy o {abs(diff_seconds)//60} min {abs(diff_seconds)%60} s względem Twojego wyniku")
+                else:
+                    st.info("➡️ Identyczny czas jak Twój wynik")
+    
+    show_simulator(model, model_version, residual_table, prediction_result, gender, age,
+                   time_5km_minutes, time_5km_seconds_only, interval_label)
     
     # ============================================
     # EKSPORT DANYCH DO EXCELA
@@ -893,3 +1026,58 @@ else:  # Jeśli wykonano predykcję (zapisaną w session_state)
 st.sidebar.markdown("---")  # Separator
 st.sidebar.caption("🤖 Powered by AI & PyCaret")  # Stopka
 st.sidebar.caption(f"📊 Dane: {EVENT_NAME} {EVENT_YEARS[0]}-{EVENT_YEARS[1]}")  # Info o danych
+
+mark_stage('render')  # Sekcja główna i stopka
+write_startup_report()  # Raport zimnego startu (tylko po pierwszym renderze w procesie)
+
+# ============================================
+# METRYKI ETAPÓW
+# ============================================
+if st.session_state.get('prediction_done', False):  # Pełna obsługa predykcji (od kliknięcia do końca strony)
+    METRICS.observe('request_total', time.perf_counter() - _request_started)
+
+# Wartości chwilowe obok histogramów (cache, bank, kolejka i obwód LLM)
+_cache_stats = get_commentary_cache().stats()
+_bank = get_commentary_bank()
+_admission_stats = OPENAI_ADMISSION.stats()
+_result_stats = get_result_cache().stats()
+_exporter = get_telemetry_exporter()  # None = Langfuse nie skonfigurowane
+_telemetry_stats = _exporter.stats() if _exporter is not None else {}
+METRICS.export_prometheus(gauges={  # Wartości chwilowe
+    'result_cache_entries': _result_stats['size'],
+    'result_cache_bytes': _result_stats['bytes'],
+    'llm_in_flight': _admission_stats['in_flight'],
+    'llm_waiting': _admission_stats['waiting'],
+    'llm_circuit_open': int(OPENAI_CIRCUIT.stats()['state'] != 'closed'),
+    'telemetry_queue_depth': _telemetry_stats.get('queue_depth', 0)
+}, counters={  # Liczniki od startu procesu (eksportowane jako <nazwa>_total)
+    'result_cache_hits': _result_stats['hits'],
+    'result_cache_misses': _result_stats['misses'],
+    'commentary_cache_hits': _cache_stats['hits'],
+    'commentary_cache_misses': _cache_stats['misses'],
+    'commentary_bank_hits': _bank.stats()['hits'] if _bank is not None else 0,
+    'llm_rejected': sum(_admission_stats['rejected'].values()),
+    'telemetry_sent': _telemetry_stats.get('sent', 0),
+    'telemetry_dropped': _telemetry_stats.get('dropped', 0),
+    'telemetry_failed': _telemetry_stats.get('failed', 0)
+})
+
+if METRICS_ADMIN_PANEL:  # Panel administratora (METRICS_ADMIN_PANEL=1 w .env)
+    with st.sidebar.expander("⏱️ Metryki etapów (admin)"):
+        st.dataframe(METRICS.summary(), hide_index=True, use_container_width=True)
+        st.caption(f"Percentyle z ostatnich {METRICS_WINDOW_SIZE} pomiarów · eksport: {METRICS_PROMETHEUS_PATH}")
+        st.caption(
+            f"🗂️ Cache wyników: {_result_stats['hit_rate']}% trafień · {_result_stats['size']} pakietów · "
+            f"{_result_stats['bytes'] / 1024 / 1024:.1f} MB · usunięte: {_result_stats['evictions']}"
+        )
+        if _exporter is not None:  # Eksporter Langfuse
+            st.caption(
+                f"📡 Telemetria: kolejka {_telemetry_stats['queue_depth']} · wysłane: {_telemetry_stats['sent']} · "
+                f"usunięte: {_telemetry_stats['dropped']} · odrzucone: {_telemetry_stats['failed']}"
+                + (f" · błąd: {_telemetry_stats['last_error']}" if _telemetry_stats['last_error'] else "")
+            )
+        _wait_histogram = OPENAI_ADMISSION.stats()['wait_histogram']  # Oczekiwanie na slot LLM
+        if any(_wait_histogram.values()):
+            st.caption("⏳ Oczekiwanie w kolejce LLM (≤ s: liczba): " + " · ".join(
+                f"{bound}: {count}" for bound, count in _wait_histogram.items()
+            ))
@@ -0,0 +1,3 @@
+"""
+Benchmarki gorących ścieżek utils - uruchamiane z folderu APP: python -m benchmarks.run
+"""
@@ -0,0 +1,323 @@
+"""
+Benchmarki gorących ścieżek utils na prawdziwych danych i danych syntetycznych (1M, 10M wierszy)
+
+Użycie (z folderu APP):
+    python -m benchmarks.run [--sizes real,1M,10M] [--repeat 5] [--only ranking,excel] [--compare PLIK.json]
+
+Każdy przypadek jest mierzony w --repeat rundach (runda = tyle wywołań, aby trwała
+co najmniej BENCHMARK_MIN_ROUND_SECONDS). Funkcje z cache wersji danych mierzone są
+osobno "cold" (każda runda z nową wersją danych - budowa kostki/indeksu) i "warm"
+(odczyt z gotowej struktury). Wynik trafia do BENCHMARK_RESULTS_DIR jako JSON
+(czasy w ms, commit git, wersje bibliotek); --compare porównuje mediany z wcześniejszym
+plikiem i kończy się kodem 1, jeśli któraś jest wolniejsza o ponad BENCHMARK_REGRESSION_RATIO.
+
+Dane syntetyczne (benchmarks/synthetic.py) są generowane przy pierwszym użyciu
+rozmiaru. 1M wierszy po wczytaniu zajmuje ok. 1 GB RAM, 10M - ok. 10 GB (plus CSV
+parsowany przy pomiarze cold).
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import gc  # Zwolnienie danych poprzedniego rozmiaru
+import itertools  # Kolejne wersje danych dla pomiarów cold
+import json  # Zapis i odczyt wyników
+import os  # Ścieżki do plików
+import platform  # Opis środowiska
+import shutil  # Usuwanie cache Parquet między rundami
+import statistics  # Mediana i odchylenie
+import subprocess  # Commit git
+import sys  # Kod wyjścia
+import time  # Pomiar czasu
+from datetime import datetime  # Znacznik czasu wyniku
+
+import numpy as np  # Próbki czasów
+import pandas as pd  # Wersja biblioteki
+
+from config import (  # Ustawienia benchmarków
+    APP_DIR, DATA_FILE, BENCHMARK_DATA_DIR, BENCHMARK_RESULTS_DIR, BENCHMARK_SIZES, BENCHMARK_SEED,
+    BENCHMARK_MIN_ROUND_SECONDS, BENCHMARK_EXCEL_MAX_ROWS, BENCHMARK_REGRESSION_RATIO
+)
+import utils.data_loader as data_loader  # Ścieżki loadera podmieniane na dane syntetyczne
+from utils.data_loader import time_to_seconds, times_to_seconds  # Parsowanie czasów
+from utils.model_loader import get_model_registry  # Model jak w aplikacji
+from utils.intervals import get_residual_table  # Przedziały predykcji jak w aplikacji
+from utils.predictor import prepare_input_data, predict_time  # Predykcja jednego zawodnika
+from utils.stats_calculator import (  # Statystyki
+    estimate_ranking, get_category_stats, get_winners_by_category, get_average_times_by_category,
+    prepare_excel_export, get_data_version
+)
+from benchmarks.synthetic import write_synthetic_csv  # Dane syntetyczne
+
+PARSE_SAMPLE_SIZE = 100_000  # time_to_seconds (skalarna) mierzona na tylu wartościach
+_COLD_VERSIONS = itertools.count()  # Numeracja wersji danych pomiarów cold
+CASE_GROUPS = ('parse', 'load', 'stats', 'ranking', 'predict', 'excel')  # Grupy dla --only
+
+
+def measure(func, repeat, setup=None):
+    """
+    Mierzy funkcję w kilku rundach
+
+    Args:
+        func (callable): Funkcja bez argumentów (wynik setup jest przekazywany, jeśli podano setup)
+        repeat (int): Liczba rund
+        setup (callable, optional): Przygotowanie przed każdym wywołaniem (poza pomiarem) -
+            wtedy runda to jedno wywołanie
+
+    Returns:
+        dict: min_ms, median_ms, mean_ms, stdev_ms (czas jednego wywołania), calls_per_round, rounds
+    """
+    number = 1
+    if setup is None:  # Szybkie funkcje - tyle wywołań, aby runda trwała BENCHMARK_MIN_ROUND_SECONDS
+        start = time.perf_counter()
+        func()  # Rozgrzewka i kalibracja
+        elapsed = time.perf_counter() - start
+        number = max(1, int(BENCHMARK_MIN_ROUND_SECONDS / max(elapsed, 1e-9)))
+
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            argument = setup()
+            start = time.perf_counter()
+            func(argument)
+            samples.append(time.perf_counter() - start)
+        else:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number)
+
+    ms = [s * 1000 for s in samples]
+    return {
+        'min_ms': round(min(ms), 4),
+        'median_ms': round(statistics.median(ms), 4),
+        'mean_ms': round(statistics.mean(ms), 4),
+        'stdev_ms': round(statistics.stdev(ms), 4) if len(ms) > 1 else 0.0,
+        'calls_per_round': number,
+        'rounds': repeat
+    }
+
+
+def _load_cold(csv_path, cache_dir):
+    """Wczytuje dane przez load_historical_data bez cache Parquet (parsowanie CSV + zapis cache)"""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return data_loader.load_historical_data.__wrapped__()
+
+
+def _load_warm():
+    """Wczytuje dane przez load_historical_data z gotowego cache Parquet"""
+    return data_loader.load_historical_data.__wrapped__()
+
+
+def load_dataset(csv_path, cache_dir, repeat, results, groups):
+    """
+    Wczytuje zbiór przez load_historical_data (podmienione DATA_FILE i DATA_CACHE_DIR) i mierzy wczytanie
+
+    Args:
+        csv_path (str): Plik CSV
+        cache_dir (str): Osobny folder cache Parquet (loader usuwa inne wersje w swoim folderze)
+        repeat (int): Liczba rund
+        results (dict): Wyniki przypadków (uzupełniane)
+        groups (set): Wybrane grupy przypadków
+
+    Returns:
+        pd.DataFrame: Dane historyczne
+    """
+    original = (data_loader.DATA_FILE, data_loader.DATA_CACHE_DIR)
+    data_loader.DATA_FILE, data_loader.DATA_CACHE_DIR = csv_path, cache_dir
+    try:
+        if 'load' in groups:
+            results['load_historical_data[cold]'] = measure(lambda _: _load_cold(csv_path, cache_dir), repeat, setup=gc.collect)
+            results['load_historical_data[warm]'] = measure(lambda _: _load_warm(), repeat, setup=gc.collect)
+        return _load_warm() if 'load' in groups else _load_cold(csv_path, cache_dir)
+    finally:
+        data_loader.DATA_FILE, data_loader.DATA_CACHE_DIR = original
+
+
+def _fresh_version(df):
+    """Nadaje danym nową wersję - kolejne wywołanie zbuduje struktury z cache wersji od nowa"""
+    df.attrs['data_version'] = f"benchmark-cold-{next(_COLD_VERSIONS)}"
+    return df
+
+
+def _cold_and_warm(results, name, func, df, repeat):
+    """Mierzy funkcję z cache wersji danych: cold (nowa wersja w każdej rundzie) i warm"""
+    version = df.attrs.get('data_version')
+    results[f'{name}[cold]'] = measure(lambda data: func(data), repeat, setup=lambda: _fresh_version(df))
+    df.attrs['data_version'] = version  # Warm na wersji z loadera
+    func(df)  # Zbuduj strukturę dla tej wersji
+    results[f'{name}[warm]'] = measure(lambda: func(df), repeat)
+
+
+def check_subset_versions(df):
+    """
+    Sprawdza, że podzbiór danych nie dzieli wersji (i struktur z cache) z pełnymi danymi
+
+    pandas kopiuje df.attrs do przefiltrowanych ramek - bez tej kontroli statystyki
+    podzbioru mogłyby wrócić z cache pełnych danych (lub odwrotnie).
+
+    Raises:
+        ValueError: Jeśli podzbiór ma tę samą wersję lub inne liczności niż liczone wprost
+    """
+    subset = df[df['Rok'] == df['Rok'].iloc[0]]  # Jeden rok (attrs skopiowane z pełnych danych)
+    if len(subset) == len(df):
+        return  # Jeden rok w danych - brak podzbioru do sprawdzenia
+    if get_data_version(subset) == get_data_version(df):
+        raise ValueError("Podzbiór danych ma tę samą wersję co pełne dane")
+    for data in (subset, df, subset):  # Kolejność wywołań nie może zmieniać wyniku
+        expected = int(((data['Płeć'] == 'M') & (data['Kategoria wiekowa'] == 'M30')).sum())
+        if get_category_stats(data, 'M30', 'M')['count'] != expected:
+            raise ValueError("get_category_stats zwróciło statystyki innego zbioru danych")
+
+
+def run_size(label, n_rows, repeat, groups, model, model_version=None):
+    """
+    Uruchamia wszystkie przypadki dla jednego rozmiaru danych
+
+    Args:
+        label (str): Nazwa rozmiaru (klucz BENCHMARK_SIZES)
+        n_rows (int): Liczba wierszy syntetycznych (None = prawdziwe dane)
+        repeat (int): Liczba rund
+        groups (set): Wybrane grupy przypadków
+        model: Wczytany model (predykcja)
+        model_version (str): Wersja modelu z rejestru (klucz tabeli reszt)
+
+    Returns:
+        dict: rows (liczba wierszy) i cases (nazwa przypadku -> wynik measure)
+    """
+    csv_path = DATA_FILE if n_rows is None else write_synthetic_csv(n_rows)
+    cache_dir = os.path.join(BENCHMARK_DATA_DIR, f"cache_{label}")
+    results = {}
+    df = load_dataset(csv_path, cache_dir, repeat, results, groups)
+
+    if 'parse' in groups:
+        values = df['Czas'].to_numpy(dtype=object)
+        sample = values[np.random.default_rng(BENCHMARK_SEED).integers(0, len(values), min(PARSE_SAMPLE_SIZE, len(values)))]
+        results[f'time_to_seconds[x{len(sample)}]'] = measure(lambda: [time_to_seconds(v) for v in sample], repeat)
+        column = pd.Series(values)
+        results['times_to_seconds[Czas]'] = measure(lambda: times_to_seconds(column), repeat)
+
+    if 'stats' in groups:
+        check_subset_versions(df)  # Poprawność kluczy cache przed pomiarami
+        _cold_and_warm(results, 'get_category_stats', lambda data: get_category_stats(data, 'M30', 'M'), df, repeat)
+        _cold_and_warm(results, 'get_winners_by_category', get_winners_by_category, df, repeat)
+        _cold_and_warm(results, 'get_average_times_by_category', get_average_times_by_category, df, repeat)
+
+    if 'ranking' in groups:
+        _cold_and_warm(results, 'estimate_ranking', lambda data: estimate_ranking(data, 6600, 'M', 'M30'), df, repeat)
+
+    if 'predict' in groups and model is not None:
+        residual_table = get_residual_table(df, model, model_version)  # Jak w aplikacji (poza pomiarem)
+        results['prepare_input_data+predict_time'] = measure(
+            lambda: predict_time(model, prepare_input_data('M', 35, 1500), residual_table), repeat
+        )
+
+    if 'excel' in groups:
+        export_df = df.head(BENCHMARK_EXCEL_MAX_ROWS)
+        results[f'prepare_excel_export[{len(export_df)}]'] = measure(lambda: prepare_excel_export(export_df), repeat)
+
+    rows = len(df)
+    del df
+    gc.collect()  # Zwolnij dane przed kolejnym rozmiarem
+    return {'rows': rows, 'cases': results}
+
+
+def _environment():
+    """Opis środowiska zapisywany z wynikami (porównania między maszynami)"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):  # Brak gita - wynik nadal zapisywany
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare_results(current, baseline_path, ratio=BENCHMARK_REGRESSION_RATIO):
+    """
+    Porównuje mediany z wcześniejszym wynikiem
+
+    Args:
+        current (dict): Bieżący wynik
+        baseline_path (str): Plik JSON z wcześniejszego przebiegu
+        ratio (float): Próg regresji (bieżąca / poprzednia mediana)
+
+    Returns:
+        list: Przypadki wolniejsze niż próg ("rozmiar / przypadek")
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\nPorównanie z {baseline_path} (commit {baseline['environment'].get('git_commit')}):")
+    for label, size in current['sizes'].items():
+        previous_cases = baseline['sizes'].get(label, {}).get('cases', {})
+        for case, result in size['cases'].items():
+            previous = previous_cases.get(case)
+            if previous is None or previous['median_ms'] <= 0:  # Nowy przypadek - brak odniesienia
+                continue
+            change = result['median_ms'] / previous['median_ms']
+            marker = "❌" if change > ratio else "✓"
+            print(f"  {marker} {label:<5} {case:<42} {previous['median_ms']:>11.3f} -> {result['median_ms']:>11.3f} ms ({change:.2f}x)")
+            if change > ratio:
+                regressions.append(f"{label} / {case}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarki gorących ścieżek utils (prawdziwe dane i syntetyczne 1M/10M)")
+    parser.add_argument('--sizes', default="real,1M", help=f"Rozmiary danych, po przecinku ({', '.join(BENCHMARK_SIZES)})")
+    parser.add_argument('--repeat', type=int, default=5, help="Liczba rund każdego przypadku")
+    parser.add_argument('--only', default=",".join(CASE_GROUPS), help=f"Grupy przypadków ({', '.join(CASE_GROUPS)})")
+    parser.add_argument('--output', default=None, help="Plik wyniku JSON (domyślnie BENCHMARK_RESULTS_DIR/<czas>.json)")
+    parser.add_argument('--compare', default=None, help="Wcześniejszy wynik JSON do porównania")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    groups = {g.strip() for g in args.only.split(",") if g.strip()}
+    unknown = [s for s in sizes if s not in BENCHMARK_SIZES] + sorted(groups - set(CASE_GROUPS))
+    if unknown:
+        parser.error(f"Nieznane rozmiary lub grupy: {', '.join(unknown)}")
+
+    active = get_model_registry().current() if 'predict' in groups else None  # Model wspólny dla rozmiarów
+    model = active['model'] if active else None
+    model_version = active['version'] if active else None
+
+    print("=" * 70)
+    print(f"⏱️ BENCHMARKI UTILS (mediana z {args.repeat} rund)")
+    print("=" * 70)
+    result = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'repeat': args.repeat,
+        'environment': _environment(),
+        'sizes': {}
+    }
+    for label in sizes:
+        size_result = run_size(label, BENCHMARK_SIZES[label], args.repeat, groups, model, model_version)
+        result['sizes'][label] = size_result
+        print(f"\n{label} ({size_result['rows']:,} wierszy):")
+        for case, stats in size_result['cases'].items():
+            print(f"  • {case:<42} {stats['median_ms']:>11.3f} ms (min {stats['min_ms']:.3f}, ±{stats['stdev_ms']:.3f})")
+
+    output = args.output or os.path.join(BENCHMARK_RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=4, ensure_ascii=False)
+    print(f"\nWynik: {output}")
+
+    if args.compare:
+        regressions = compare_results(result, args.compare)
+        if regressions:
+            print(f"❌ Regresje (> {BENCHMARK_REGRESSION_RATIO:.2f}x): {', '.join(regressions)}")
+            return 1
+        print("✓ Brak regresji")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Dane syntetyczne w schemacie CSV 2023/2024 - do benchmarków na 1M i 10M wierszy
+
+Wiersze są losowane (ze zwracaniem) z prawdziwego pliku, a czasy każdego
+zawodnika mnożone przez wspólny losowy współczynnik (międzyczasy i czas końcowy
+zostają spójne). Plik jest zapisywany paczkami, więc pamięć nie rośnie z liczbą
+wierszy. Nazwa pliku zawiera rozmiar, ziarno i odcisk źródła - gotowy plik jest
+używany ponownie.
+"""
+
+import hashlib  # Odcisk pliku źródłowego
+import os  # Ścieżki do plików
+
+import numpy as np  # Losowanie wierszy i współczynników
+import pandas as pd  # Odczyt i zapis CSV
+
+from config import DATA_FILE, BENCHMARK_DATA_DIR, BENCHMARK_SEED  # Plik źródłowy i katalog danych
+from utils.data_loader import TIME_COLUMNS, times_to_seconds  # Kolumny czasów i parser
+
+CHUNK_ROWS = 500_000  # Wiersze zapisywane jednorazowo
+TIME_JITTER = 0.03  # Odchylenie standardowe współczynnika czasu (3%)
+PACE_COLUMNS = ['5 km Tempo', '10 km Tempo', '15 km Tempo', '20 km Tempo', 'Tempo']  # Tempa (min/km)
+
+
+def _format_hms(seconds):
+    """Sekundy (float z NaN) -> tekst HH:MM:SS jak w CSV (NaN zostaje NaN)"""
+    missing = np.isnan(seconds)
+    total = np.where(missing, 0, np.round(seconds)).astype(np.int64)
+    text = (
+        pd.Series(total // 3600).astype(str).str.zfill(2) + ':' +
+        pd.Series((total % 3600) // 60).astype(str).str.zfill(2) + ':' +
+        pd.Series(total % 60).astype(str).str.zfill(2)
+    )
+    return text.mask(missing).to_numpy(dtype=object)
+
+
+def synthesize_chunk(source, n_rows, rng, first_bib=1):
+    """
+    Losuje n_rows wierszy z danych źródłowych i zaburza czasy
+
+    Args:
+        source (pd.DataFrame): Surowe dane CSV (bez kolumn pochodnych)
+        n_rows (int): Liczba wierszy
+        rng (np.random.Generator): Generator liczb losowych
+        first_bib (int): Pierwszy numer startowy (numery unikalne w całym pliku)
+
+    Returns:
+        pd.DataFrame: Wiersze w schemacie źródła
+    """
+    chunk = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+    factor = np.clip(rng.normal(1.0, TIME_JITTER, n_rows), 0.8, 1.2)  # Jeden współczynnik na zawodnika
+
+    for col in TIME_COLUMNS:
+        if col in chunk.columns:
+            seconds = times_to_seconds(chunk[col])[0].to_numpy(dtype=np.float64, na_value=np.nan)
+            chunk[col] = _format_hms(seconds * factor)
+    for col in PACE_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col] * factor
+    if '5km_sekundy' in chunk.columns:
+        chunk['5km_sekundy'] = np.round(chunk['5km_sekundy'] * factor)
+    if 'Numer startowy' in chunk.columns:
+        chunk['Numer startowy'] = np.arange(first_bib, first_bib + n_rows)
+    return chunk
+
+
+def synthetic_csv_path(n_rows, seed=BENCHMARK_SEED, source_path=DATA_FILE):
+    """
+    Ścieżka pliku syntetycznego dla rozmiaru, ziarna i zawartości źródła
+
+    Args:
+        n_rows (int): Liczba wierszy
+        seed (int): Ziarno generatora
+        source_path (str): Plik źródłowy
+
+    Returns:
+        str: Ścieżka w BENCHMARK_DATA_DIR
+    """
+    with open(source_path, 'rb') as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()[:8]  # Inny plik źródłowy = inne dane
+    return os.path.join(BENCHMARK_DATA_DIR, f"synthetic_{n_rows}_{seed}_{source_hash}.csv")
+
+
+def write_synthetic_csv(n_rows, seed=BENCHMARK_SEED, source_path=DATA_FILE):
+    """
+    Zapisuje (lub zwraca istniejący) plik CSV z n_rows syntetycznych wierszy
+
+    Args:
+        n_rows (int): Liczba wierszy
+        seed (int): Ziarno generatora
+        source_path (str): Plik źródłowy (schemat i rozkłady)
+
+    Returns:
+        str: Ścieżka pliku CSV
+    """
+    path = synthetic_csv_path(n_rows, seed, source_path)
+    if os.path.exists(path):  # Dane już wygenerowane
+        return path
+
+    os.makedirs(BENCHMARK_DATA_DIR, exist_ok=True)
+    source = pd.read_csv(source_path, encoding='utf-8-sig')
+    rng = np.random.default_rng(seed)
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # Przerwane generowanie nie zostawia niepełnego pliku
+    written = 0
+    while written < n_rows:
+        size = min(CHUNK_ROWS, n_rows - written)
+        chunk = synthesize_chunk(source, size, rng, first_bib=written + 1)
+        chunk.to_csv(tmp_path, mode='w' if written == 0 else 'a', header=written == 0,
+                     index=False, encoding='utf-8-sig' if written == 0 else 'utf-8')
+        written += size
+    os.replace(tmp_path, path)
+    return path
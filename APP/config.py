@@ -49,6 +49,29 @@ MAX_AGE = 99  # Maksymalny wiek zawodnika
 MIN_TIME_5KM = 10  # Minimalny czas na 5km (minuty)
 MAX_TIME_5KM = 90  # Maksymalny czas na 5km (minuty)
 
+# ============================================
+# MODEL ML
+# ============================================
+MODEL_DIR = os.path.join(APP_DIR, "model")  # Folder z modelami
+MODEL_NAME = "halfmarathon_model_3features_20260115_224149"  # Domyślna wersja modelu (bez .pkl), gdy brak manifestu
+MODEL_MANIFEST_FILE = os.path.join(MODEL_DIR, "manifest.json")  # Aktywna i poprzednia wersja modelu (rejestr)
+MODEL_INFO_SUFFIX = "_info.json"  # Sufiks metadanych wersji (z notebooka treningowego)
+MODEL_FEATURES = ['Płeć', '5 km Czas_sekundy', 'Rocznik']  # Cechy modelu (kolejność jak w treningu)
+COMPILED_MODEL_SUFFIX = "_compiled.json"  # Sufiks skompilowanego modelu (NumPy, bez PyCaret)
+USE_COMPILED_MODEL = True  # Używaj skompilowanego modelu jeśli plik istnieje
+COMPILED_MODEL_TOLERANCE = 1e-6  # Maksymalna różnica predykcji względem PyCaret (sekundy)
+LOOKUP_TABLE_SUFFIX = "_lookup.npy"  # Sufiks tablicy wszystkich predykcji (int32, memory-mapped)
+LOOKUP_META_SUFFIX = "_lookup.json"  # Sufiks opisu tablicy (zakresy osi, wersja modelu)
+USE_LOOKUP_TABLE = True  # Odczytuj predykcje z tablicy zamiast liczyć model
+LOOKUP_YEAR_MARGIN = 5  # Zapas roczników w tablicy (ile lat po budowie tablica pozostaje kompletna)
+
+# ============================================
+# PRZEDZIAŁY PREDYKCJI (kwantyle reszt modelu na danych historycznych)
+# ============================================
+INTERVAL_QUANTILES = (0.1, 0.9)  # Dolny i górny kwantyl reszt (przedział P10-P90)
+INTERVAL_BUCKET_SECONDS = 60  # Szerokość przedziału czasu 5km przy grupowaniu reszt (sekundy)
+INTERVAL_MIN_SAMPLES = 50  # Minimalna liczba wyników w grupie - mniejsze grupy używają poziomu ogólniejszego
+
 # ============================================
 # VERCEL BLOB
 # ============================================
@@ -61,6 +84,10 @@ VERCEL_BLOB_MODEL_URL = "https://eon9lclh7qwsfg3p.public.blob.vercel-storage.com
 # LANGFUSE
 # ============================================
 LANGFUSE_TRACE_NAME = "halfmarathon_prediction"  # Nazwa trace w Langfuse
+TELEMETRY_QUEUE_SIZE = 1000  # Maksymalna liczba zdarzeń w kolejce (po przekroczeniu usuwane najstarsze)
+TELEMETRY_BATCH_SIZE = 50  # Maksymalna liczba zdarzeń w jednym żądaniu do Langfuse
+TELEMETRY_FLUSH_SECONDS = 2.0  # Maksymalny czas oczekiwania zdarzenia w kolejce (sekundy)
+TELEMETRY_HTTP_TIMEOUT = 5.0  # Limit czasu wysyłki paczki (sekundy)
 
 # ============================================
 # OPENAI
@@ -68,6 +95,34 @@ LANGFUSE_TRACE_NAME = "halfmarathon_prediction"  # Nazwa trace w Langfuse
 OPENAI_MODEL = "gpt-4o-mini"  # Model OpenAI do generowania komentarzy
 OPENAI_TEMPERATURE = 0.7  # Temperatura (kreatywność odpowiedzi)
 OPENAI_MAX_TOKENS = 300  # Maksymalna długość odpowiedzi
+COMMENTARY_POLL_SECONDS = 0.3  # Odświeżanie komentarza w trakcie strumieniowania (sekundy)
+OPENAI_TIMEOUT_SECONDS = 15.0  # Limit czasu pojedynczego żądania (sekundy)
+OPENAI_CONNECT_TIMEOUT_SECONDS = 3.0  # Limit czasu nawiązania połączenia (sekundy)
+OPENAI_MAX_CONNECTIONS = 20  # Pula połączeń HTTP wspólnego klienta (keep-alive)
+OPENAI_MAX_RETRIES = 2  # Ponowienia po błędach przejściowych (timeout, 429, 5xx)
+OPENAI_RETRY_BASE_DELAY = 0.5  # Bazowe opóźnienie ponowienia (sekundy, rośnie wykładniczo)
+OPENAI_RETRY_MAX_DELAY = 4.0  # Maksymalne opóźnienie ponowienia (sekundy)
+
+# ============================================
+# CIRCUIT BREAKER (OPENAI)
+# ============================================
+CIRCUIT_WINDOW_SIZE = 50  # Liczba ostatnich wywołań branych pod uwagę
+CIRCUIT_MIN_CALLS = 10  # Minimalna liczba wywołań w oknie przed oceną
+CIRCUIT_ERROR_RATE_THRESHOLD = 0.5  # Odsetek błędów otwierający obwód (0-1)
+CIRCUIT_P95_LATENCY_THRESHOLD = 8.0  # p95 opóźnienia otwierające obwód (sekundy)
+CIRCUIT_OPEN_SECONDS = 60  # Jak długo obwód jest otwarty (komentarz lokalny) przed próbą powrotu
+
+# ============================================
+# KONTROLA DOPUSZCZANIA (OPENAI)
+# ============================================
+LLM_MAX_CONCURRENT = 8  # Maksymalna liczba równoległych wywołań LLM w procesie
+LLM_GLOBAL_RATE = 5.0  # Globalny limit wywołań LLM na sekundę
+LLM_GLOBAL_BURST = 20  # Globalna liczba wywołań dopuszczalnych naraz (pojemność kubełka)
+LLM_SESSION_RATE = 1 / 30  # Limit wywołań na sekundę dla jednej sesji (1 na 30 s)
+LLM_SESSION_BURST = 3  # Liczba komentarzy, które sesja może wygenerować od razu
+LLM_QUEUE_BUDGET_SECONDS = 2.0  # Maksymalne oczekiwanie w kolejce - dłużej = komentarz lokalny
+LLM_MAX_TRACKED_SESSIONS = 10000  # Limit pamiętanych kubełków sesji (najstarsze usuwane)
+LLM_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)  # Granice histogramu oczekiwania (sekundy)
 
 # ============================================
 # DOMYŚLNE WARTOŚCI
@@ -87,3 +142,104 @@ GENDER_MAPPING = {
 # ŚCIEŻKI DO PLIKÓW
 # ============================================
 DATA_FILE = os.path.join(APP_DIR, "data", "halfmarathon_2023_2024.csv")  # Plik z danymi historycznymi
+EDA_DATA_DIR = os.path.join(os.path.dirname(APP_DIR), "EDA-ML", "data")  # Surowe dane z notebooka EDA-ML
+EDA_DATA_PATTERN = "halfmarathon_wroclaw_*__final.csv"  # Wzorzec plików źródłowych z Vercel Blob
+
+# ============================================
+# CACHE DANYCH (format kolumnowy)
+# ============================================
+DATA_CACHE_DIR = os.path.join(APP_DIR, "data", ".cache")  # Folder z cache danych (Parquet)
+DATA_CACHE_SCHEMA = 2  # Wersja schematu cache - zwiększ po zmianie sposobu wyliczania kolumn
+
+# ============================================
+# PROFILOWANIE STARTU
+# ============================================
+STARTUP_REPORT_PATH = os.path.join(APP_DIR, "logs", "startup_profile.json")  # Raport zimnego startu (JSON)
+STARTUP_BUDGET_MS = 3000  # Budżet czasu pierwszego renderu (ms) - przekroczenie oznaczane w raporcie
+
+# ============================================
+# METRYKI ETAPÓW (histogramy czasów)
+# ============================================
+METRICS_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Granice (sekundy)
+METRICS_WINDOW_SIZE = 1000  # Liczba ostatnich pomiarów etapu do percentyli p50/p95/p99
+METRICS_PROMETHEUS_PATH = os.path.join(APP_DIR, "logs", "metrics.prom")  # Plik w formacie tekstowym Prometheus
+METRICS_EXPORT_SECONDS = 10  # Minimalny odstęp między zapisami pliku metryk (sekundy)
+METRICS_ADMIN_PANEL = os.getenv("METRICS_ADMIN_PANEL", "0") == "1"  # Panel metryk w panelu bocznym (administrator)
+
+# ============================================
+# BENCHMARKI
+# ============================================
+BENCHMARK_DATA_DIR = os.path.join(DATA_CACHE_DIR, "benchmarks")  # Syntetyczne CSV (budowane raz na rozmiar)
+BENCHMARK_RESULTS_DIR = os.path.join(APP_DIR, "benchmarks", "results")  # Wyniki JSON (porównania w czasie)
+BENCHMARK_SIZES = {"real": None, "1M": 1_000_000, "10M": 10_000_000}  # Rozmiary danych (None = prawdziwe dane)
+BENCHMARK_SEED = 2024  # Ziarno generatora danych syntetycznych
+BENCHMARK_MIN_ROUND_SECONDS = 0.2  # Szybkie funkcje są powtarzane w rundzie co najmniej tyle sekund
+BENCHMARK_EXCEL_MAX_ROWS = 5_000  # Eksport Excel mierzony na najwyżej tylu wierszach (limit arkusza ~1M)
+BENCHMARK_REGRESSION_RATIO = 1.2  # --compare: mediana wolniejsza o ponad 20% = regresja
+
+# ============================================
+# TEST OBCIĄŻENIOWY (scripts/load_test.py)
+# ============================================
+LOAD_TEST_PORT = 8599  # Port serwera Streamlit uruchamianego przez test
+LOAD_TEST_USERS = (1, 4, 8)  # Poziomy liczby równoczesnych użytkowników (kolejne przebiegi)
+LOAD_TEST_FLOWS_PER_USER = 3  # Pełne ścieżki (formularz -> predykcja -> symulator -> Excel) na użytkownika
+LOAD_TEST_THINK_SECONDS = 2.0  # Przerwa między akcjami użytkownika (odświeżanie fragmentów trwa dalej)
+LOAD_TEST_RERUN_TIMEOUT = 120  # Maksymalny czas jednego reruna (sekundy)
+LOAD_TEST_REPORT_DIR = os.path.join(APP_DIR, "logs")  # Raporty JSON testu
+
+# ============================================
+# TRENING MODELU (scripts/train_model.py)
+# ============================================
+TRAINING_CACHE_DIR = os.path.join(DATA_CACHE_DIR, "training")  # Macierz cech (Parquet, klucz = hash plików CSV)
+TRAINING_FEATURES_SCHEMA = 1  # Wersja macierzy cech - zwiększ po zmianie inżynierii cech
+TRAINING_TARGET = "Czas_sekundy"  # Zmienna docelowa
+TRAINING_SEED = 42  # Ziarno podziału, losowania konfiguracji i modeli (session_id z notebooka)
+TRAINING_TEST_SIZE = 0.2  # Zbiór testowy (hold-out) - wybór finalnego modelu
+TRAINING_FOLDS = 5  # Walidacja krzyżowa na zbiorze treningowym
+TRAINING_TOP_MODELS = 5  # Modele z porównania przekazywane do tuningu
+TRAINING_TUNING_ITERATIONS = 10  # Losowe konfiguracje na model (plus domyślna)
+TRAINING_SEARCH_ETA = 3  # Hyperband: na kolejny szczebel przechodzi 1/eta konfiguracji, budżet rośnie eta razy
+TRAINING_SEARCH_MIN_BUDGET = 1 / 27  # Hyperband: najmniejszy budżet (ułamek wierszy foldu i foldów)
+TRAINING_SEARCH_MIN_ROWS = 200  # Minimalna liczba wierszy dopasowania na najniższym szczeblu
+
+# ============================================
+# AKTUALIZACJA PRZYROSTOWA MODELU (scripts/update_model.py)
+# ============================================
+INCREMENTAL_CHUNK_ROWS = 2_000  # Wiersze w jednym wywołaniu partial_fit (i w jednej paczce CSV)
+INCREMENTAL_SHUFFLE_ROWS = 50_000  # Okno tasowania (CSV posortowane po miejscu; cała edycja mieści się w oknie)
+INCREMENTAL_HOLDOUT_FRACTION = 0.2  # Część nowych wierszy odłożona do walidacji (bez uczenia)
+INCREMENTAL_MAX_MAE_RATIO = 1.0  # Promocja, jeśli MAE po aktualizacji <= MAE modelu bazowego × współczynnik
+
+# ============================================
+# OCENA LIST STARTOWYCH (scripts/score_start_list.py)
+# ============================================
+SCORING_CHUNK_ROWS = 20_000  # Wiersze listy startowej w jednej paczce (jedno wywołanie predict_batch)
+SCORING_PENDING_PER_WORKER = 2  # Paczki w kolejce na proces - ogranicza pamięć niezależnie od rozmiaru pliku
+SCORING_GENDER_COLUMN = "Płeć"  # Kolumna płci ('M' / 'K')
+SCORING_BIRTH_YEAR_COLUMN = "Rocznik"  # Kolumna roku urodzenia
+SCORING_TIME_5KM_COLUMN = "5 km Czas"  # Kolumna deklarowanego czasu 5 km (H:MM:SS, MM:SS lub sekundy)
+
+# ============================================
+# CACHE WYNIKÓW PREDYKCJI (wspólny dla sesji)
+# ============================================
+RESULT_CACHE_MAX_ENTRIES = 5000  # Maksymalna liczba pakietów wyników (LRU)
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Maksymalny szacowany rozmiar pakietów (64 MB)
+
+# ============================================
+# CACHE KOMENTARZY AI
+# ============================================
+COMMENTARY_CACHE_PATH = os.path.join(DATA_CACHE_DIR, "commentary_cache.json")  # Trwały cache komentarzy (JSON)
+COMMENTARY_CACHE_SIZE = 2000  # Maksymalna liczba komentarzy (LRU - najdawniej użyte są usuwane)
+COMMENTARY_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Czas życia komentarza (7 dni)
+COMMENTARY_CACHE_SAVE_SECONDS = 5.0  # Najwyżej jeden zapis pliku cache na tyle sekund (reszta przy zamknięciu)
+COMMENTARY_TIME_BUCKET_SECONDS = 300  # Szerokość przedziału przewidywanego czasu (5 min)
+COMMENTARY_PERCENTILE_BUCKET = 10  # Szerokość przedziału "szybszy niż X%" (punkty procentowe)
+COMMENTARY_NAME_PLACEHOLDER = "[IMIĘ]"  # Znacznik imienia w komentarzu z cache
+COMMENTARY_TIME_PLACEHOLDER = "[CZAS]"  # Znacznik przewidywanego czasu w komentarzu z cache
+
+# ============================================
+# BANK KOMENTARZY AI (generowany z wyprzedzeniem)
+# ============================================
+COMMENTARY_BANK_PATH = os.path.join(APP_DIR, "data", "commentary_bank.sqlite")  # Bank komentarzy (SQLite)
+COMMENTARY_BANK_CONCURRENCY = 8  # Równoległe wywołania LLM podczas generowania banku
+COMMENTARY_BANK_TIME_STEP_SECONDS = 10  # Krok próbkowania czasów przy wyliczaniu kluczy banku
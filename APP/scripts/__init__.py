@@ -0,0 +1,3 @@
+"""
+Moduł scripts - narzędzia wiersza poleceń (uruchamiane z folderu APP: python -m scripts.<nazwa>)
+"""
@@ -0,0 +1,130 @@
+"""
+Budowa artefaktów modelu - uruchamiane po każdym treningu nowego modelu
+
+Użycie (z folderu APP):
+    python -m scripts.build_model_artifacts [--model NAZWA_MODELU]
+
+Kroki:
+    1. Kompilacja pipeline PyCaret do JSON (utils.compiled_model) + weryfikacja predykcji
+    2. Tablica wszystkich predykcji int32 (utils.lookup_table) dla całej dziedziny wejść
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import os  # Ścieżki do plików
+import sys  # Kod wyjścia
+
+import numpy as np  # Siatka testowa
+import pandas as pd  # Dane testowe dla modelu
+
+from config import (  # Ustawienia modelu
+    MODEL_DIR, MODEL_NAME, COMPILED_MODEL_SUFFIX, COMPILED_MODEL_TOLERANCE,
+    LOOKUP_TABLE_SUFFIX, LOOKUP_META_SUFFIX,
+    MIN_AGE, MAX_AGE, MIN_TIME_5KM, MAX_TIME_5KM, CURRENT_YEAR
+)
+from utils.compiled_model import (  # Eksport i weryfikacja
+    export_compiled_model, save_compiled_model, CompiledModel, verify_compiled_model
+)
+from utils.lookup_table import (  # Tablica predykcji
+    build_lookup_table, save_lookup_table, load_lookup_table, model_fingerprint
+)
+
+
+def build_probe_data():
+    """
+    Buduje dane testowe pokrywające cały zakres wejść aplikacji (płeć x wiek x czas 5km)
+
+    Returns:
+        pd.DataFrame: Dane w formacie prepare_input_data
+    """
+    ages = np.arange(MIN_AGE, MAX_AGE + 1, 3)  # Co 3 lata
+    times = np.arange(MIN_TIME_5KM * 60, MAX_TIME_5KM * 60 + 1, 37)  # Co 37 sekund
+    genders, ages_grid, times_grid = np.meshgrid(np.array(['M', 'K'], dtype=object), ages, times, indexing='ij')
+    return pd.DataFrame({
+        'Płeć': genders.ravel(),  # 'M' / 'K'
+        '5 km Czas_sekundy': times_grid.ravel(),  # Czas w sekundach
+        'Rocznik': CURRENT_YEAR - ages_grid.ravel(),  # Rok urodzenia
+    })
+
+
+def build_compiled_model(pipeline, model_path):
+    """
+    Kompiluje pipeline do JSON i sprawdza zgodność predykcji
+
+    Args:
+        pipeline: Model PyCaret
+        model_path (str): Ścieżka modelu (bez rozszerzenia)
+
+    Returns:
+        str: Ścieżka zapisanego artefaktu
+    """
+    artifact = export_compiled_model(pipeline)  # Parametry + współczynniki
+    probe = build_probe_data()
+    no_gender = probe[probe['Płeć'] == 'M'].assign(**{'Płeć': None})  # Brak płci - kod braku enkodera
+    max_diff = verify_compiled_model(  # Porównanie z PyCaret
+        pipeline, CompiledModel(artifact), pd.concat([probe, no_gender], ignore_index=True), COMPILED_MODEL_TOLERANCE
+    )
+
+    compiled_path = model_path + COMPILED_MODEL_SUFFIX
+    save_compiled_model(artifact, compiled_path)  # Zapis JSON
+    print(f"✓ Skompilowany model: {compiled_path}")
+    print(f"  • Estymator: {artifact['estimator']}")
+    print(f"  • Maksymalna różnica względem PyCaret: {max_diff:.2e} s (tolerancja {COMPILED_MODEL_TOLERANCE})")
+    return compiled_path
+
+
+def build_prediction_table(pipeline, model_path):
+    """
+    Buduje tablicę predykcji dla całej siatki wejść i sprawdza ją na danych testowych
+
+    Args:
+        pipeline: Model PyCaret
+        model_path (str): Ścieżka modelu (bez rozszerzenia)
+
+    Returns:
+        str: Ścieżka zapisanej tablicy
+    """
+    fingerprint = model_fingerprint(model_path + ".pkl")  # Tablica przypisana do tego pliku .pkl
+    table, meta = build_lookup_table(pipeline, fingerprint)  # Wszystkie predykcje
+
+    table_path = model_path + LOOKUP_TABLE_SUFFIX
+    meta_path = model_path + LOOKUP_META_SUFFIX
+    save_lookup_table(table, meta, table_path, meta_path)
+
+    # Odczyt z tablicy musi dać to samo co int() z predykcji pipeline
+    probe = build_probe_data()
+    expected = np.trunc(np.asarray(pipeline.predict(probe), dtype=np.float64))
+    actual = load_lookup_table(table_path, meta_path, pipeline, fingerprint).predict(probe)
+    mismatches = int(np.sum(expected != actual))
+    if mismatches:
+        raise ValueError(f"Tablica predykcji różni się od modelu w {mismatches} przypadkach")
+
+    print(f"✓ Tablica predykcji: {table_path}")
+    print(f"  • Wymiary: {table.shape} (płeć x rocznik {meta['rocznik_min']}-{meta['rocznik_max']} "
+          f"x czas 5km {meta['time_min']}-{meta['time_max']} s)")
+    print(f"  • Rozmiar: {os.path.getsize(table_path) / 1024 / 1024:.1f} MB")
+    return table_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buduje artefakty modelu (skompilowany model, tablica predykcji)")
+    parser.add_argument('--model', default=MODEL_NAME, help="Nazwa modelu w folderze model/ (bez .pkl)")
+    args = parser.parse_args(argv)
+
+    model_path = os.path.join(MODEL_DIR, args.model)  # Ścieżka bez rozszerzenia
+    if not os.path.exists(model_path + ".pkl"):
+        print(f"❌ Nie znaleziono pliku modelu: {model_path}.pkl")
+        return 1
+
+    from pycaret.regression import load_model  # PyCaret potrzebny tylko do budowy artefaktów
+    pipeline = load_model(model_path, verbose=False)  # Oryginalny pipeline
+
+    print("=" * 70)
+    print(f"🔧 BUDOWA ARTEFAKTÓW MODELU: {args.model}")
+    print("=" * 70)
+    build_compiled_model(pipeline, model_path)
+    build_prediction_table(pipeline, model_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Lokalny serwer zgodny z API ingestion Langfuse - do testów eksportera telemetrii
+
+Użycie (z folderu APP):
+    python -m scripts.fake_langfuse_server [--port 8766] [--delay 0.0] [--fail-rate 0.0]
+
+Aplikacja łączy się z nim przez zmienne środowiskowe:
+    LANGFUSE_BASE_URL=http://127.0.0.1:8766  LANGFUSE_PUBLIC_KEY=pk-test  LANGFUSE_SECRET_KEY=sk-test
+
+Obsługuje POST /api/public/ingestion i odpowiada 207 jak prawdziwe API.
+Opcja --delay symuluje wolny backend, --fail-rate błędy 503.
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import json  # Format żądań i odpowiedzi
+import random  # Losowe błędy
+import sys  # Kod wyjścia
+import threading  # Liczniki
+import time  # Opóźnienia
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Serwer HTTP (wiele połączeń naraz)
+
+
+class FakeLangfuseHandler(BaseHTTPRequestHandler):
+    """Obsługa /api/public/ingestion (ustawienia w atrybutach serwera)"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive jak w prawdziwym API
+
+    def log_message(self, format, *args):  # noqa: A002 - sygnatura z BaseHTTPRequestHandler
+        """Bez logowania każdego żądania na stderr"""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip('/') != "/api/public/ingestion":
+            self._send_json(404, {"message": f"Nieznana ścieżka: {self.path}"})
+            return
+
+        server = self.server
+        time.sleep(server.delay)  # Wolny backend
+        if random.random() < server.fail_rate:  # Symulowane przeciążenie
+            self._send_json(503, {"message": "Symulowane przeciążenie"})
+            return
+
+        batch = request.get("batch", [])
+        with server.lock:
+            server.batches += 1  # Liczba przyjętych paczek
+            server.events.extend(batch)  # Zdarzenia do sprawdzenia w testach
+        self._send_json(207, {
+            "successes": [{"id": event.get("id"), "status": 201} for event in batch],
+            "errors": []
+        })
+
+
+def create_server(port=8766, delay=0.0, fail_rate=0.0):
+    """
+    Tworzy serwer (do uruchomienia w wątku w testach lub z wiersza poleceń)
+
+    Args:
+        port (int): Port (0 = dowolny wolny)
+        delay (float): Opóźnienie odpowiedzi (sekundy)
+        fail_rate (float): Odsetek żądań kończonych błędem 503 (0-1)
+
+    Returns:
+        ThreadingHTTPServer: Serwer; adres w server.server_address, zdarzenia w server.events
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLangfuseHandler)
+    server.daemon_threads = True  # Wątki połączeń nie blokują zamknięcia
+    server.delay = delay
+    server.fail_rate = fail_rate
+    server.batches = 0  # Liczba przyjętych paczek
+    server.events = []  # Przyjęte zdarzenia
+    server.lock = threading.Lock()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokalny serwer zgodny z API ingestion Langfuse (testy)")
+    parser.add_argument('--port', type=int, default=8766, help="Port serwera")
+    parser.add_argument('--delay', type=float, default=0.0, help="Opóźnienie odpowiedzi (s)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Odsetek żądań z błędem 503 (0-1)")
+    args = parser.parse_args(argv)
+
+    server = create_server(args.port, args.delay, args.fail_rate)
+    print(f"📊 Fałszywe API Langfuse: http://127.0.0.1:{server.server_address[1]} (Ctrl+C kończy)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with server.lock:
+            print(f"Przyjęto {len(server.events)} zdarzeń w {server.batches} paczkach")
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Lokalny serwer zgodny z OpenAI Chat Completions - do testów bez kosztów i sieci
+
+Użycie (z folderu APP):
+    python -m scripts.fake_openai_server [--port 8765] [--first-token-delay 2.0] [--token-delay 0.05]
+
+Aplikacja łączy się z nim przez zmienne środowiskowe klienta OpenAI:
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1  OPENAI_API_KEY=sk-test  streamlit run app.py
+
+Obsługuje POST /v1/chat/completions w trybie zwykłym i strumieniowym (stream=true, SSE).
+Opcja --fail-rate pozwala symulować błędy 500 (testy odporności).
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import json  # Format żądań i odpowiedzi
+import random  # Losowe błędy
+import sys  # Kod wyjścia
+import threading  # Licznik żądań
+import time  # Opóźnienia
+import uuid  # Identyfikatory odpowiedzi
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Serwer HTTP (wiele połączeń naraz)
+
+# Odpowiedź z tymi samymi znacznikami co prompt aplikacji (cache komentarzy)
+DEFAULT_REPLY = (
+    "[IMIĘ], przewidywany czas [CZAS] to solidny wynik na tle Twojej kategorii. "
+    "Utrzymuj równe tempo na pierwszych kilometrach i dołóż jeden dłuższy bieg tygodniowo - "
+    "to najprostsza droga do poprawy."
+)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Obsługa /v1/chat/completions (ustawienia w atrybutach serwera)"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive jak w prawdziwym API
+
+    def log_message(self, format, *args):  # noqa: A002 - sygnatura z BaseHTTPRequestHandler
+        """Bez logowania każdego żądania na stderr"""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Nieznana ścieżka: {self.path}"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests += 1  # Licznik do testów obciążeniowych
+
+        if random.random() < server.fail_rate:  # Symulowany błąd serwera
+            self._send_json(500, {"error": {"message": "Symulowany błąd serwera", "type": "server_error"}})
+            return
+
+        time.sleep(server.first_token_delay)  # Czas do pierwszego tokenu
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "fake-model")
+        words = server.reply.split(" ")
+
+        if not request.get("stream"):  # Cała odpowiedź naraz
+            time.sleep(server.token_delay * len(words))
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": server.reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)}
+            })
+            return
+
+        # Strumień Server-Sent Events: jeden fragment na słowo, potem [DONE]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send_chunk(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        send_chunk({"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            send_chunk({"content": word if i == 0 else " " + word})
+            time.sleep(server.token_delay)
+        send_chunk({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def create_server(port=8765, first_token_delay=0.5, token_delay=0.02, fail_rate=0.0, reply=DEFAULT_REPLY):
+    """
+    Tworzy serwer (do uruchomienia w wątku w testach lub z wiersza poleceń)
+
+    Args:
+        port (int): Port (0 = dowolny wolny)
+        first_token_delay (float): Opóźnienie przed pierwszym tokenem (sekundy)
+        token_delay (float): Opóźnienie między tokenami (sekundy)
+        fail_rate (float): Odsetek żądań kończonych błędem 500 (0-1)
+        reply (str): Treść odpowiedzi
+
+    Returns:
+        ThreadingHTTPServer: Serwer; adres w server.server_address
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+    server.daemon_threads = True  # Wątki połączeń nie blokują zamknięcia
+    server.first_token_delay = first_token_delay
+    server.token_delay = token_delay
+    server.fail_rate = fail_rate
+    server.reply = reply
+    server.requests = 0  # Liczba obsłużonych żądań
+    server.lock = threading.Lock()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokalny serwer zgodny z OpenAI Chat Completions (testy)")
+    parser.add_argument('--port', type=int, default=8765, help="Port serwera")
+    parser.add_argument('--first-token-delay', type=float, default=0.5, help="Opóźnienie pierwszego tokenu (s)")
+    parser.add_argument('--token-delay', type=float, default=0.02, help="Opóźnienie między tokenami (s)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Odsetek żądań z błędem 500 (0-1)")
+    args = parser.parse_args(argv)
+
+    server = create_server(args.port, args.first_token_delay, args.token_delay, args.fail_rate)
+    print(f"🤖 Fałszywe API OpenAI: http://127.0.0.1:{server.server_address[1]}/v1 (Ctrl+C kończy)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
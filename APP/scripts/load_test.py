@@ -0,0 +1,489 @@
+"""
+Test obciążeniowy - N równoczesnych użytkowników na jednym procesie Streamlit
+
+Użycie (z folderu APP):
+    python -m scripts.load_test [--users 1,4,8] [--flows 3] [--think 2.0] [--llm-delay 0.5]
+    python -m scripts.load_test --url http://127.0.0.1:8501 --server-pid 12345   # istniejący serwer
+    python -m scripts.load_test --scenario simulator --users 1 --flows 20         # koszt reruna symulatora
+
+Skrypt uruchamia `streamlit run app.py` (komentarze AI z lokalnego serwera
+scripts/fake_openai_server.py, bez Langfuse) i łączy się z nim jak przeglądarka -
+przez websocket /_stcore/stream, wysyłając BackMsg z wartościami widżetów.
+Każdy wirtualny użytkownik w pętli: wypełnia formularz w panelu bocznym (rerun po
+każdej zmianie pola, jak w przeglądarce), klika predykcję, czeka (odświeżając
+fragment komentarza AI), uruchamia symulator, pobiera plik Excel i resetuje predykcję.
+
+Poziomy --users są uruchamiane po kolei na tym samym serwerze, po jednej ścieżce
+rozgrzewki (ładuje dane i model). Dla każdego poziomu raport podaje przepustowość
+(ścieżki i reruny na sekundę), percentyle czasów etapów i wzrost RSS serwera;
+pełny wynik trafia do LOAD_TEST_REPORT_DIR jako JSON.
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import json  # Raport
+import os  # Ścieżki i zmienne środowiskowe
+import random  # Dane wirtualnych użytkowników
+import subprocess  # Serwer Streamlit
+import sys  # Interpreter i kod wyjścia
+import threading  # Wirtualni użytkownicy i próbkowanie RSS
+import time  # Pomiar czasu
+from datetime import datetime  # Nazwa raportu
+
+import httpx  # Pobieranie pliku Excel i sprawdzanie gotowości serwera
+from streamlit.proto.BackMsg_pb2 import BackMsg  # Komunikaty klient -> serwer
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # Komunikaty serwer -> klient
+from streamlit.proto.WidgetStates_pb2 import WidgetState  # Wartości widżetów
+
+from config import (  # Ustawienia testu
+    APP_DIR, GENDER_MAPPING, MIN_AGE, MIN_TIME_5KM, LOAD_TEST_PORT, LOAD_TEST_USERS,
+    LOAD_TEST_FLOWS_PER_USER, LOAD_TEST_THINK_SECONDS, LOAD_TEST_RERUN_TIMEOUT, LOAD_TEST_REPORT_DIR
+)
+from scripts.fake_openai_server import create_server  # LLM bez kosztów i sieci
+from utils.metrics import MetricsRegistry  # Histogramy i percentyle etapów
+
+# Klient websocket - pakiet websockets instaluje się razem z serwerem Streamlit (uvicorn)
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+
+# RSS serwera - psutil instaluje się razem z PyCaret; bez niego raport pomija pamięć
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PREDICT_LABEL = "🚀 Przewiduj mój czas!"  # Przycisk predykcji w panelu bocznym
+RESET_LABEL = "🔄 Nowa predykcja"  # Przycisk resetu
+SIMULATOR_FORM = "simulator_form"  # Formularz symulatora
+SIMULATOR_SUBMIT_LABEL = "🚀 Symulacja dla nowych parametrów"  # Przycisk formularza
+RSS_SAMPLE_SECONDS = 0.25  # Odstęp próbkowania RSS serwera
+SERVER_START_TIMEOUT = 90  # Maksymalny czas startu serwera (sekundy)
+
+
+class VirtualUser:
+    """
+    Jeden użytkownik przeglądarki - sesja websocket i wartości widżetów
+    """
+
+    def __init__(self, base_url, number, registry, think_seconds, timeout, seed):
+        self.base_url = base_url
+        self.number = number  # Numer użytkownika (imię w formularzu)
+        self.registry = registry  # Czasy etapów (wspólne dla poziomu)
+        self.think_seconds = think_seconds
+        self.timeout = timeout
+        self.rng = random.Random(seed)  # Powtarzalne dane użytkownika
+        self.widgets = {}  # (form_id, etykieta) -> (typ elementu, proto, ID fragmentu) z ostatniego renderu
+        self.values = {}  # ID widżetu -> WidgetState (przeglądarka wysyła wszystkie przy każdym rerunie)
+        self.auto_reruns = {}  # ID fragmentu -> odstęp odświeżania (st.fragment(run_every=...))
+        self.page_script_hash = ""  # Strona aplikacji (z new_session)
+        self.flows = 0  # Ukończone ścieżki
+        self.reruns = 0  # Wykonane reruny
+        self.errors = []  # Opisy błędów
+
+    def _receive_run(self, ws):
+        """
+        Czyta komunikaty do końca reruna (łącznie z rerunem wywołanym przez st.rerun)
+
+        Returns:
+            int: Liczba wyjątków wyrenderowanych przez skrypt
+        """
+        exceptions = 0
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"rerun dłuższy niż {self.timeout} s")
+            msg = ForwardMsg()
+            msg.ParseFromString(ws.recv(timeout=remaining))
+            kind = msg.WhichOneof('type')
+
+            if kind == 'new_session':  # Początek przebiegu skryptu
+                self.page_script_hash = msg.new_session.page_script_hash
+                if not msg.new_session.fragment_ids_this_run:  # Pełny rerun - strona rysowana od nowa
+                    self.widgets = {}
+                    self.auto_reruns = {}
+            elif kind == 'auto_rerun':
+                self.auto_reruns[msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+            elif kind == 'stop_auto_rerun':
+                for fragment_id in msg.stop_auto_rerun.fragment_ids:
+                    self.auto_reruns.pop(fragment_id, None)
+            elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element_type = msg.delta.new_element.WhichOneof('type')
+                proto = getattr(msg.delta.new_element, element_type)
+                if element_type == 'exception':
+                    exceptions += 1
+                elif 'id' in proto.DESCRIPTOR.fields_by_name and 'label' in proto.DESCRIPTOR.fields_by_name:
+                    key = (getattr(proto, 'form_id', ''), proto.label)
+                    self.widgets[key] = (element_type, proto, msg.delta.fragment_id or None)
+            elif kind == 'script_finished' and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return exceptions
+
+    def _rerun(self, ws, stage, trigger_id=None, fragment_id=None, auto=False):
+        """
+        Wysyła rerun (z wartościami widżetów) i zapisuje jego czas jako etap `stage`
+
+        Args:
+            ws: Połączenie websocket
+            stage (str): Nazwa etapu w raporcie
+            trigger_id (str): ID klikniętego przycisku
+            fragment_id (str): ID fragmentu - rerun tylko fragmentu (widżet we fragmencie lub run_every)
+            auto (bool): Odświeżenie z run_every (nie akcja użytkownika)
+        """
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.page_script_hash = self.page_script_hash
+        for value in self.values.values():
+            state.widget_states.widgets.add().CopyFrom(value)
+        if trigger_id is not None:  # Kliknięcie przycisku - wartość tylko dla tego reruna
+            trigger = state.widget_states.widgets.add()
+            trigger.id = trigger_id
+            trigger.trigger_value = True
+        if fragment_id is not None:  # Przeglądarka wysyła ID fragmentu, w którym jest widżet
+            state.fragment_id = fragment_id
+            state.is_auto_rerun = auto
+
+        start = time.perf_counter()
+        ws.send(msg.SerializeToString())
+        exceptions = self._receive_run(ws)
+        elapsed = time.perf_counter() - start
+        self.registry.observe(stage, elapsed)
+        self.registry.observe('rerun', elapsed)  # Wszystkie reruny razem
+        self.reruns += 1
+        if exceptions:
+            self.errors.append(f"{stage}: wyjątek w skrypcie")
+
+    def _widget(self, label, form_id=''):
+        """Zwraca (typ, proto, ID fragmentu) widżetu z ostatniego renderu"""
+        try:
+            return self.widgets[(form_id, label)]
+        except KeyError:
+            raise RuntimeError(f"brak widżetu '{label}' na stronie") from None
+
+    def _set(self, label, value, form_id=''):
+        """Ustawia wartość widżetu (jak zmiana w przeglądarce)"""
+        element_type, proto, _ = self._widget(label, form_id)
+        state = WidgetState(id=proto.id)
+        if element_type in ('text_input', 'selectbox'):
+            state.string_value = value
+        elif element_type == 'number_input':
+            state.double_value = value
+        elif element_type == 'slider':
+            state.double_array_value.data.append(value)
+        else:
+            raise RuntimeError(f"nieobsługiwany widżet {element_type}")
+        self.values[proto.id] = state
+
+    def _click(self, ws, stage, label, form_id=''):
+        """Klika przycisk (rerun fragmentu, jeśli przycisk jest we fragmencie)"""
+        _, proto, fragment_id = self._widget(label, form_id)
+        self._rerun(ws, stage, trigger_id=proto.id, fragment_id=fragment_id)
+
+    def _think(self, ws):
+        """Przerwa użytkownika - w tym czasie przeglądarka odświeża fragmenty z run_every"""
+        end = time.monotonic() + self.think_seconds
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self.auto_reruns:  # Nic do odświeżania
+                time.sleep(remaining)
+                return
+            fragment_id, interval = next(iter(self.auto_reruns.items()))
+            if interval > remaining:
+                time.sleep(remaining)
+                return
+            time.sleep(interval)
+            self._rerun(ws, 'commentary_poll', fragment_id=fragment_id, auto=True)
+
+    def _predict(self, ws):
+        """Wypełnia formularz w panelu bocznym i klika predykcję"""
+        for label, value in (
+            ("Twoje imię lub nick:", f"Biegacz{self.number}"),
+            ("Płeć:", self.rng.choice(list(GENDER_MAPPING))),
+            ("Wiek:", self.rng.randint(MIN_AGE, 70)),
+            ("Minuty:", self.rng.randint(max(MIN_TIME_5KM, 18), 40)),
+            ("Sekundy:", self.rng.randint(0, 59)),
+        ):
+            self._set(label, value)
+            self._rerun(ws, 'form_input')  # Każda zmiana pola to rerun
+        self._click(ws, 'predict', PREDICT_LABEL)
+
+    def _simulate(self, ws):
+        """Symulator - pola formularza wysyłane razem z przyciskiem (bez rerunów po zmianach)"""
+        self._set("Wiek:", self.rng.randint(MIN_AGE, 70), SIMULATOR_FORM)
+        self._set("Minuty:", self.rng.randint(max(MIN_TIME_5KM, 18), 40), SIMULATOR_FORM)
+        self._click(ws, 'simulator', SIMULATOR_SUBMIT_LABEL, SIMULATOR_FORM)
+
+    def _flow(self, ws, http):
+        """Jedna ścieżka: formularz -> predykcja -> symulator -> Excel -> reset"""
+        self._predict(ws)
+        self._think(ws)
+        self._simulate(ws)
+        self._think(ws)
+
+        download = next((proto for kind, proto, _ in self.widgets.values() if kind == 'download_button'), None)
+        if download is None:
+            raise RuntimeError("brak przycisku pobierania Excel")
+        start = time.perf_counter()
+        response = http.get(self.base_url + download.url)
+        response.raise_for_status()
+        self.registry.observe('download', time.perf_counter() - start)
+        self._think(ws)
+
+        self._click(ws, 'reset', RESET_LABEL)
+        self.flows += 1
+
+    def run(self, flows, scenario='full'):
+        """
+        Sesja użytkownika: pierwsze wczytanie strony i `flows` ścieżek
+
+        Args:
+            flows (int): Liczba ścieżek
+            scenario (str): 'full' (pełna ścieżka) lub 'simulator' (jedna predykcja, potem same
+                symulacje bez przerw - koszt reruna symulatora)
+        """
+        ws_url = "ws" + self.base_url[len("http"):] + "/_stcore/stream"
+        try:
+            with ws_connect(ws_url, subprotocols=["streamlit"], max_size=None) as ws, \
+                    httpx.Client(timeout=self.timeout) as http:
+                self._rerun(ws, 'initial_load')
+                if scenario == 'simulator':
+                    self._predict(ws)
+                for _ in range(flows):
+                    if scenario == 'simulator':
+                        self._simulate(ws)
+                        self.flows += 1
+                    else:
+                        self._flow(ws, http)
+        except Exception as e:  # Błąd kończy sesję (stan strony nieznany) - reszta użytkowników działa dalej
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+
+class RssSampler:
+    """
+    Próbkuje RSS procesu serwera w tle (start, szczyt, koniec)
+    """
+
+    def __init__(self, pid):
+        self.process = psutil.Process(pid) if (psutil is not None and pid) else None
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _rss_mb(self):
+        return self.process.memory_info().rss / 1024 / 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(self._rss_mb())
+            self._stop.wait(RSS_SAMPLE_SECONDS)
+
+    def start(self):
+        if self.process is not None:
+            self._thread.start()
+
+    def stop(self):
+        """
+        Kończy próbkowanie
+
+        Returns:
+            dict: start_mb, peak_mb, end_mb, growth_mb (None bez psutil)
+        """
+        if self.process is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self.samples.append(self._rss_mb())
+        return {
+            'start_mb': round(self.samples[0], 1),
+            'peak_mb': round(max(self.samples), 1),
+            'end_mb': round(self.samples[-1], 1),
+            'growth_mb': round(self.samples[-1] - self.samples[0], 1)
+        }
+
+
+def run_level(base_url, users, flows, think_seconds, ramp_up, timeout, server_pid, scenario='full'):
+    """
+    Uruchamia `users` równoczesnych użytkowników
+
+    Args:
+        base_url (str): Adres serwera (http://host:port)
+        users (int): Liczba użytkowników
+        flows (int): Ścieżki na użytkownika
+        think_seconds (float): Przerwa między akcjami
+        ramp_up (float): Czas, w którym startują kolejni użytkownicy (sekundy)
+        timeout (float): Maksymalny czas reruna
+        server_pid (int): PID serwera (RSS) lub None
+        scenario (str): Scenariusz użytkownika (VirtualUser.run)
+
+    Returns:
+        dict: Wynik poziomu (przepustowość, etapy, RSS, błędy)
+    """
+    registry = MetricsRegistry(window_size=100_000)  # Wszystkie pomiary poziomu w oknie percentyli
+    virtual_users = [
+        VirtualUser(base_url, i + 1, registry, think_seconds, timeout, seed=users * 1000 + i)
+        for i in range(users)
+    ]
+    threads = [threading.Thread(target=user.run, args=(flows, scenario), daemon=True) for user in virtual_users]
+
+    sampler = RssSampler(server_pid)
+    sampler.start()
+    started = time.perf_counter()
+    for i, thread in enumerate(threads):
+        thread.start()
+        if i < users - 1:
+            time.sleep(ramp_up / users)  # Równomierny start użytkowników
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    completed = sum(user.flows for user in virtual_users)
+    reruns = sum(user.reruns for user in virtual_users)
+    errors = [f"użytkownik {user.number}: {e}" for user in virtual_users for e in user.errors]
+    return {
+        'users': users,
+        'wall_seconds': round(wall, 2),
+        'flows_completed': completed,
+        'flows_planned': users * flows,
+        'reruns': reruns,
+        'flows_per_second': round(completed / wall, 3),
+        'reruns_per_second': round(reruns / wall, 2),
+        'stages': registry.summary(),
+        'rss': sampler.stop(),
+        'errors': errors
+    }
+
+
+def start_server(port, llm_url):
+    """
+    Uruchamia `streamlit run app.py` i czeka, aż serwer odpowie
+
+    Args:
+        port (int): Port serwera
+        llm_url (str): Adres fałszywego API OpenAI (None = komentarze AI wyłączone)
+
+    Returns:
+        subprocess.Popen: Proces serwera
+    """
+    env = dict(os.environ)
+    env.update({'LANGFUSE_PUBLIC_KEY': '', 'LANGFUSE_SECRET_KEY': ''})  # Bez telemetrii (load_dotenv nie nadpisuje)
+    if llm_url:
+        env.update({'OPENAI_API_KEY': 'sk-load-test', 'OPENAI_BASE_URL': llm_url})
+    else:
+        env['OPENAI_API_KEY'] = ''
+
+    os.makedirs(LOAD_TEST_REPORT_DIR, exist_ok=True)
+    log = open(os.path.join(LOAD_TEST_REPORT_DIR, "load_test_server.log"), 'w', encoding='utf-8')
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Serwer zakończył się przy starcie (log: {log.name})")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Serwer nie wystartował w {SERVER_START_TIMEOUT} s (log: {log.name})")
+
+
+def _stage(level, name, field):
+    """Wartość etapu z podsumowania poziomu (lub None)"""
+    return next((row[field] for row in level['stages'] if row['stage'] == name), None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test obciążeniowy: równocześni użytkownicy na jednym procesie Streamlit")
+    parser.add_argument('--users', default=",".join(str(u) for u in LOAD_TEST_USERS), help="Poziomy liczby użytkowników, po przecinku")
+    parser.add_argument('--flows', type=int, default=LOAD_TEST_FLOWS_PER_USER, help="Ścieżki na użytkownika")
+    parser.add_argument('--think', type=float, default=LOAD_TEST_THINK_SECONDS, help="Przerwa między akcjami (s)")
+    parser.add_argument('--ramp-up', type=float, default=2.0, help="Czas startu wszystkich użytkowników poziomu (s)")
+    parser.add_argument('--timeout', type=float, default=LOAD_TEST_RERUN_TIMEOUT, help="Maksymalny czas reruna (s)")
+    parser.add_argument('--port', type=int, default=LOAD_TEST_PORT, help="Port uruchamianego serwera")
+    parser.add_argument('--url', default=None, help="Adres działającego serwera (bez uruchamiania własnego)")
+    parser.add_argument('--server-pid', type=int, default=None, help="PID działającego serwera (RSS przy --url)")
+    parser.add_argument('--llm-delay', type=float, default=0.5, help="Opóźnienie pierwszego tokenu fałszywego LLM (s)")
+    parser.add_argument('--no-llm', action='store_true', help="Bez komentarzy AI")
+    parser.add_argument('--scenario', choices=('full', 'simulator'), default='full',
+                        help="full: pełna ścieżka; simulator: predykcja i --flows symulacji (koszt reruna symulatora)")
+    parser.add_argument('--no-warmup', action='store_true', help="Bez rozgrzewki (pierwszy poziom obejmie zimny start)")
+    args = parser.parse_args(argv)
+
+    if ws_connect is None:
+        print("❌ Brak pakietu websockets (pip install websockets)")
+        return 1
+    levels = [int(u) for u in args.users.split(",") if u.strip()]
+
+    llm_server, server = None, None
+    try:
+        if args.url:
+            base_url, server_pid = args.url.rstrip("/"), args.server_pid
+        else:
+            llm_url = None
+            if not args.no_llm:
+                llm_server = create_server(port=0, first_token_delay=args.llm_delay)
+                threading.Thread(target=llm_server.serve_forever, daemon=True).start()
+                llm_url = f"http://127.0.0.1:{llm_server.server_address[1]}/v1"
+            server = start_server(args.port, llm_url)
+            base_url, server_pid = f"http://127.0.0.1:{args.port}", server.pid
+
+        print("=" * 70)
+        print(f"🏋️ TEST OBCIĄŻENIOWY ({args.scenario}): {base_url} · {args.flows} ścieżek/użytkownika · przerwa {args.think} s")
+        print("=" * 70)
+        if not args.no_warmup:  # Dane, model i cache ładowane przy pierwszej sesji - poza pomiarem poziomów
+            warmup = run_level(base_url, 1, 1, 0.0, 0.0, args.timeout, None)
+            print(f"Rozgrzewka: {warmup['flows_completed']}/1 ścieżek w {warmup['wall_seconds']} s")
+        results = []
+        for users in levels:
+            level = run_level(base_url, users, args.flows, args.think, args.ramp_up, args.timeout, server_pid, args.scenario)
+            results.append(level)
+            rss = level['rss']
+            print(f"\n👥 {users} użytkowników: {level['flows_completed']}/{level['flows_planned']} ścieżek w {level['wall_seconds']} s")
+            print(f"  • Przepustowość: {level['flows_per_second']} ścieżek/s · {level['reruns_per_second']} rerunów/s")
+            print(f"  • {'etap':<16} {'liczba':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for row in level['stages']:
+                print(f"  • {row['stage']:<16} {row['count']:>7} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+            if rss:
+                print(f"  • RSS serwera: {rss['start_mb']} -> {rss['end_mb']} MB (szczyt {rss['peak_mb']}, wzrost {rss['growth_mb']:+})")
+            for error in level['errors'][:5]:
+                print(f"  ⚠️ {error}")
+
+        print("\nPodsumowanie (p95 wszystkich rerunów):")
+        for level in results:
+            print(f"  • {level['users']:>3} użytkowników: {_stage(level, 'rerun', 'p95_ms')} ms · {level['reruns_per_second']} rerunów/s")
+
+        report_path = os.path.join(LOAD_TEST_REPORT_DIR, f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json")
+        os.makedirs(LOAD_TEST_REPORT_DIR, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': base_url,
+                'scenario': args.scenario,
+                'flows_per_user': args.flows,
+                'think_seconds': args.think,
+                'llm': None if args.no_llm else {'first_token_delay': args.llm_delay},
+                'levels': results
+            }, f, indent=4, ensure_ascii=False)
+        print(f"Raport: {report_path}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if llm_server is not None:
+            llm_server.shutdown()
+            llm_server.server_close()
+
+    if any(level['errors'] for level in results):
+        print("❌ Część sesji zakończyła się błędem")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
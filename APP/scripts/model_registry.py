@@ -0,0 +1,82 @@
+"""
+Rejestr modeli - lista wersji i zmiana aktywnej wersji (manifest w folderze model/)
+
+Użycie (z folderu APP):
+    python -m scripts.model_registry list
+    python -m scripts.model_registry activate NAZWA_MODELU
+    python -m scripts.model_registry rollback
+
+Działająca aplikacja sprawdza manifest przy każdym przebiegu skryptu: nowa wersja
+ładuje się w tle i zastępuje obecną bez restartu, a wycofanie do poprzedniej
+wersji jest natychmiastowe (jest w pamięci).
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import sys  # Kod wyjścia
+
+from config import MODEL_DIR, MODEL_MANIFEST_FILE  # Folder modeli i manifest
+from utils.model_loader import scan_model_versions, read_manifest, write_manifest  # Rejestr wersji
+
+
+def list_versions():
+    """Wypisuje wersje z folderu model/ z metadanymi i stanem w manifeście"""
+    manifest = read_manifest()
+    versions = scan_model_versions()
+    if not versions:
+        print(f"❌ Brak modeli w {MODEL_DIR}")
+        return 1
+
+    for entry in versions:
+        info = entry['info']
+        marker = "●" if entry['version'] == manifest['active'] else ("↩" if entry['version'] == manifest['previous'] else " ")
+        artifacts = [name for name, present in (('pkl', entry['has_pkl']), ('compiled', entry['has_compiled']),
+                                                ('lookup', entry['has_lookup'])) if present]
+        mae = f"MAE {info['mae_minutes']:.2f} min" if 'mae_minutes' in info else "MAE -"
+        print(f"{marker} {entry['version']}  {info.get('model_type', '?')}  {mae}  [{', '.join(artifacts)}]")
+    print(f"\n● aktywna · ↩ poprzednia (manifest: {MODEL_MANIFEST_FILE})")
+    return 0
+
+
+def activate(version):
+    """Ustawia wersję jako aktywną (obecna staje się poprzednią)"""
+    if version not in {entry['version'] for entry in scan_model_versions()}:
+        print(f"❌ Brak wersji {version} w {MODEL_DIR}")
+        return 1
+    manifest = read_manifest()
+    if version == manifest['active']:
+        print(f"ℹ️ Wersja {version} jest już aktywna")
+        return 0
+    write_manifest(version, manifest['active'])
+    print(f"✓ Aktywna wersja: {version} (poprzednia: {manifest['active']})")
+    return 0
+
+
+def rollback():
+    """Przywraca poprzednią wersję z manifestu"""
+    manifest = read_manifest()
+    if not manifest['previous']:
+        print("❌ Manifest nie zawiera poprzedniej wersji")
+        return 1
+    write_manifest(manifest['previous'], manifest['active'])
+    print(f"✓ Przywrócono wersję: {manifest['previous']} (poprzednia: {manifest['active']})")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rejestr modeli - lista wersji, aktywacja i wycofanie")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="Wersje w folderze model/")
+    activate_parser = commands.add_parser('activate', help="Ustaw aktywną wersję")
+    activate_parser.add_argument('version', help="Nazwa modelu w folderze model/ (bez .pkl)")
+    commands.add_parser('rollback', help="Przywróć poprzednią wersję")
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        return list_versions()
+    if args.command == 'activate':
+        return activate(args.version)
+    return rollback()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Generowanie banku komentarzy AI z wyprzedzeniem - dla wszystkich kluczy z danych historycznych
+
+Użycie (z folderu APP):
+    python -m scripts.pregenerate_commentary [--concurrency 8] [--limit N] [--force] [--dry-run]
+
+Klucze (kategoria, płeć, przedział czasu, przedział "szybszy niż X%") są wyliczane
+z danych historycznych tak samo jak w aplikacji. Dla każdego brakującego klucza
+skrypt wywołuje LLM (najwyżej --concurrency wywołań naraz) i zapisuje komentarz
+w COMMENTARY_BANK_PATH. Przerwany przebieg można wznowić - klucze już zapisane
+są pomijane, a ponowne uruchomienie na kompletnym banku nic nie zmienia.
+
+Test bez kosztów API (lokalny serwer z scripts/fake_openai_server.py):
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-test python -m scripts.pregenerate_commentary
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import sys  # Kod wyjścia
+import time  # Czas generowania
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Ograniczona równoległość wywołań
+
+import numpy as np  # Siatka czasów
+import pandas as pd  # Braki w rankingu (<NA>)
+
+from config import (  # Ustawienia banku
+    AGE_CATEGORIES_MEN, AGE_CATEGORIES_WOMEN, COMMENTARY_TIME_BUCKET_SECONDS,
+    COMMENTARY_BANK_PATH, COMMENTARY_BANK_CONCURRENCY, COMMENTARY_BANK_TIME_STEP_SECONDS,
+    OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS
+)
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, call_with_retries  # Odporność na awarie API
+from utils.commentary_bank import bank_key, open_bank_for_writing, existing_keys, store_commentaries  # Zapis banku
+from utils.data_loader import load_historical_data  # Dane historyczne
+from utils.openai_helper import build_commentary_request, get_openai_client, _commentary_messages  # Prompt jak w aplikacji
+from utils.stats_calculator import get_category_stats, estimate_ranking_batch, format_time_from_seconds  # Statystyki
+
+COMMIT_EVERY = 50  # Zapis do banku co tyle komentarzy (wznawianie po przerwaniu)
+
+
+def enumerate_commentary_requests(df, time_step=COMMENTARY_BANK_TIME_STEP_SECONDS):
+    """
+    Wylicza wszystkie klucze komentarzy osiągalne dla danych historycznych
+
+    Dla każdej kategorii próbkuje czasy co time_step sekund w zakresie czasów
+    historycznych danej płci i liczy ranking jak aplikacja - każdy klucz
+    dostaje prompt zbudowany z pierwszego czasu, który do niego trafia.
+    Predykcje spoza zakresu historycznego (rzadkie) obsługują nadal cache i API.
+
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        time_step (int): Krok próbkowania czasów (sekundy)
+
+    Returns:
+        dict: Klucz cache -> prompt (ze znacznikami imienia i czasu)
+    """
+    requests = {}
+    for gender, categories in (('M', AGE_CATEGORIES_MEN), ('K', AGE_CATEGORIES_WOMEN)):
+        gender_times = df.loc[df['Płeć'] == gender, 'Czas_sekundy'].dropna()
+        start = int(gender_times.min()) // COMMENTARY_TIME_BUCKET_SECONDS * COMMENTARY_TIME_BUCKET_SECONDS
+        times = np.arange(start, int(gender_times.max()) + 1, time_step)  # Czasy od początku przedziału
+
+        for age_category in dict.fromkeys(categories.values()):  # Kategorie w kolejności z config
+            category_stats = get_category_stats(df, age_category, gender)
+            rankings = estimate_ranking_batch(df, times, gender, age_category)  # Jeden przebieg na kategorię
+            for t, position, faster_than in zip(times, rankings['estimated_position'], rankings['faster_than_percent']):
+                ranking_info = {
+                    'estimated_position': None if pd.isna(position) else int(position),  # Jak estimate_ranking
+                    'faster_than_percent': None if pd.isna(faster_than) else float(faster_than)
+                }
+                key, prompt = build_commentary_request(
+                    format_time_from_seconds(int(t)), gender, age_category, category_stats, ranking_info
+                )
+                requests.setdefault(key, prompt)
+    return requests
+
+
+def generate_template(client, breaker, prompt):
+    """
+    Generuje jeden komentarz (wywołanie blokujące w wątku puli)
+
+    Args:
+        client (OpenAI): Klient OpenAI
+        breaker (CircuitBreaker): Obwód chroniący API w tym przebiegu
+        prompt (str): Prompt komentarza
+
+    Returns:
+        str: Komentarz ze znacznikami imienia i czasu
+    """
+    response = call_with_retries(breaker, lambda: client.chat.completions.create(
+        model=OPENAI_MODEL,  # Ten sam model co w aplikacji
+        messages=_commentary_messages(prompt),
+        temperature=OPENAI_TEMPERATURE,
+        max_tokens=OPENAI_MAX_TOKENS
+    ))
+    return response.choices[0].message.content.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generuje bank komentarzy AI dla wszystkich kluczy z danych historycznych")
+    parser.add_argument('--bank', default=COMMENTARY_BANK_PATH, help="Ścieżka pliku banku (SQLite)")
+    parser.add_argument('--concurrency', type=int, default=COMMENTARY_BANK_CONCURRENCY, help="Równoległe wywołania LLM")
+    parser.add_argument('--limit', type=int, default=None, help="Najwyżej tyle nowych komentarzy w tym przebiegu")
+    parser.add_argument('--force', action='store_true', help="Wygeneruj ponownie także klucze obecne w banku")
+    parser.add_argument('--dry-run', action='store_true', help="Tylko policz brakujące klucze")
+    args = parser.parse_args(argv)
+
+    df = load_historical_data()
+    requests = enumerate_commentary_requests(df)
+    connection = open_bank_for_writing(args.bank)
+    done = set() if args.force else existing_keys(connection)  # Wznawianie - pomijamy zapisane klucze
+    pending = [(key, prompt) for key, prompt in requests.items() if bank_key(key) not in done]
+    if args.limit is not None:
+        pending = pending[:args.limit]
+
+    print("=" * 70)
+    print("🤖 BANK KOMENTARZY AI")
+    print("=" * 70)
+    print(f"Klucze z danych: {len(requests)} · w banku: {len(done)} · do wygenerowania: {len(pending)}")
+    if args.dry_run or not pending:
+        connection.close()
+        return 0
+
+    client = get_openai_client()  # Wspólny klient (OPENAI_BASE_URL pozwala użyć lokalnego serwera)
+    if client is None:
+        print("❌ Brak OPENAI_API_KEY")
+        connection.close()
+        return 1
+
+    breaker = CircuitBreaker()  # Trwała awaria API przerywa przebieg zamiast wysyłać kolejne żądania
+    started = time.perf_counter()
+    generated, failed, buffer = 0, 0, []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = {pool.submit(generate_template, client, breaker, prompt): key for key, prompt in pending}
+        for future in as_completed(futures):
+            try:
+                buffer.append((futures[future], future.result()))
+            except CircuitOpenError:  # API niedostępne - reszta przebiegu zostanie pominięta
+                failed += 1
+                continue
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ {bank_key(futures[future])}: {e}")
+                continue
+            if len(buffer) >= COMMIT_EVERY:  # Zapis paczkami - przerwanie traci najwyżej jedną paczkę
+                generated += store_commentaries(connection, buffer, OPENAI_MODEL, replace=args.force)
+                buffer = []
+    generated += store_commentaries(connection, buffer, OPENAI_MODEL, replace=args.force)
+    total = len(existing_keys(connection))
+    connection.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Wygenerowano: {generated} w {elapsed:.1f} s · błędy: {failed} · w banku: {total}/{len(requests)}")
+    print(f"Bank: {args.bank}")
+    if failed:
+        print("❌ Część komentarzy nie powstała - uruchom ponownie, aby uzupełnić bank")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Pomiar zimnego startu aplikacji - każdy pomiar w nowym procesie Pythona
+
+Użycie (z folderu APP):
+    python -m scripts.profile_startup [--runs 3]
+
+Każdy przebieg uruchamia app.py (streamlit AppTest) w świeżym procesie, a app.py
+zapisuje raport utils.startup_profiler do STARTUP_REPORT_PATH. Skrypt zbiera
+raporty, wypisuje mediany i kończy się kodem 1, jeśli przekroczono STARTUP_BUDGET_MS.
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import json  # Odczyt raportów
+import os  # Ścieżki do plików
+import statistics  # Mediana
+import subprocess  # Świeży proces dla każdego pomiaru
+import sys  # Interpreter i kod wyjścia
+
+from config import APP_DIR, STARTUP_REPORT_PATH, STARTUP_BUDGET_MS  # Ustawienia profilowania
+
+# Kod uruchamiany w procesie potomnym - jeden render aplikacji
+_CHILD_CODE = (
+    "from streamlit.testing.v1 import AppTest\n"
+    "AppTest.from_file({app_path!r}, default_timeout=300).run()\n"
+)
+
+
+def run_cold_start(app_path):
+    """
+    Uruchamia jeden zimny start aplikacji w nowym procesie
+
+    Args:
+        app_path (str): Ścieżka do app.py
+
+    Returns:
+        dict: Raport startu
+    """
+    if os.path.exists(STARTUP_REPORT_PATH):
+        os.remove(STARTUP_REPORT_PATH)  # Usuń stary raport - czytamy tylko świeży
+
+    subprocess.run(
+        [sys.executable, "-c", _CHILD_CODE.format(app_path=app_path)],
+        cwd=APP_DIR, check=True, capture_output=True
+    )
+
+    if not os.path.exists(STARTUP_REPORT_PATH):  # Render przerwany (np. st.stop)
+        raise RuntimeError("Aplikacja nie zapisała raportu startu - sprawdź czy pierwszy render kończy się bez błędów")
+    with open(STARTUP_REPORT_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _median_by_key(reports, field):
+    """Mediana czasów dla każdego klucza słownika field we wszystkich raportach"""
+    keys = list(reports[0][field])  # Kolejność z pierwszego raportu
+    return {key: statistics.median(r[field].get(key, 0.0) for r in reports) for key in keys}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mierzy zimny start aplikacji (importy + pierwszy render)")
+    parser.add_argument('--runs', type=int, default=3, help="Liczba pomiarów (każdy w nowym procesie)")
+    args = parser.parse_args(argv)
+
+    app_path = os.path.join(APP_DIR, "app.py")
+    reports = [run_cold_start(app_path) for _ in range(args.runs)]
+
+    total_ms = statistics.median(r['total_ms'] for r in reports)  # Mediana łącznego czasu
+    print("=" * 70)
+    print(f"⏱️ ZIMNY START APLIKACJI (mediana z {args.runs} pomiarów)")
+    print("=" * 70)
+    print("\nImporty modułów aplikacji:")
+    for name, ms in _median_by_key(reports, 'imports_ms').items():
+        print(f"  • {name:<28} {ms:>9.1f} ms")
+    print("\nEtapy pierwszego renderu:")
+    for name, ms in _median_by_key(reports, 'stages_ms').items():
+        print(f"  • {name:<28} {ms:>9.1f} ms")
+    loaded = [name for name, is_loaded in reports[-1]['heavy_modules_loaded'].items() if is_loaded]
+    print(f"\nCiężkie zależności załadowane przy starcie: {', '.join(loaded) or 'brak'}")
+    print(f"\nŁącznie: {total_ms:.1f} ms (budżet: {STARTUP_BUDGET_MS} ms)")
+
+    summary_path = os.path.join(os.path.dirname(STARTUP_REPORT_PATH), "startup_profile_summary.json")
+    with open(summary_path, 'w', encoding='utf-8') as f:  # Zbiorczy raport (mediany)
+        json.dump({
+            'runs': args.runs,
+            'total_ms': total_ms,
+            'budget_ms': STARTUP_BUDGET_MS,
+            'imports_ms': _median_by_key(reports, 'imports_ms'),
+            'stages_ms': _median_by_key(reports, 'stages_ms'),
+            'heavy_modules_loaded': reports[-1]['heavy_modules_loaded']
+        }, f, indent=4, ensure_ascii=False)
+    print(f"Raport: {summary_path}")
+
+    if total_ms > STARTUP_BUDGET_MS:
+        print("❌ Przekroczono budżet zimnego startu")
+        return 1
+    print("✓ Start w budżecie")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
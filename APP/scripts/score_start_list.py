@@ -0,0 +1,272 @@
+"""
+Ocena listy startowej - przewidywane czasy, tempo i szacowane pozycje dla wszystkich zgłoszonych
+
+Użycie (z folderu APP):
+    python -m scripts.score_start_list lista_startowa.csv [--output wyniki.csv] [--workers 4]
+    python -m scripts.score_start_list lista.csv --sep ';' --gender-col plec --year-col rocznik --time-col czas_5km
+
+Wejście: CSV z kolumnami płci ('M' / 'K'), roku urodzenia i deklarowanego czasu 5 km
+(H:MM:SS, MM:SS lub sekundy); pozostałe kolumny (numer, nazwisko) są przepisywane do wyniku
+bez zmian (czytane jako tekst). Kolumny o nazwach kolumn wyników (output_columns) są odrzucane.
+
+Plik jest czytany paczkami (SCORING_CHUNK_ROWS). Każda paczka jest oceniana wektorowo
+(predict_batch + estimate_ranking_batch) w puli procesów, a wyniki są dopisywane do pliku
+w kolejności wejścia. W kolejce czeka najwyżej SCORING_PENDING_PER_WORKER paczek na proces,
+więc pamięć nie zależy od rozmiaru pliku. Każdy wiersz dostaje wersję modelu (manifest).
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import os  # Ścieżki do plików
+import resource  # Szczytowa pamięć procesów
+import sys  # Kod wyjścia
+import time  # Przepustowość
+from collections import deque  # Paczki w kolejce (kolejność wyjścia = kolejność wejścia)
+from concurrent.futures import ProcessPoolExecutor  # Pula procesów
+
+import numpy as np  # Walidacja wierszy
+import pandas as pd  # Paczki CSV
+
+from config import (  # Ustawienia oceny
+    MODEL_DIR, CURRENT_YEAR, MIN_AGE, MAX_AGE, MIN_TIME_5KM, MAX_TIME_5KM, SCORING_CHUNK_ROWS,
+    SCORING_PENDING_PER_WORKER, SCORING_GENDER_COLUMN, SCORING_BIRTH_YEAR_COLUMN, SCORING_TIME_5KM_COLUMN
+)
+from utils.data_loader import load_historical_data, times_to_seconds  # Dane historyczne, parsowanie czasów
+from utils.intervals import get_residual_table  # Przedziały predykcji
+from utils.model_loader import load_model_version, read_manifest  # Aktywna wersja modelu
+from utils.predictor import predict_batch, calculate_age_category_batch  # Predykcja wsadowa
+from utils.stats_calculator import estimate_ranking_batch  # Pozycje w klasyfikacji
+
+_WORKER = {}  # Model i dane procesu roboczego (ustawiane przez _init_worker)
+
+
+def _init_worker(context):
+    """Zapisuje model, dane historyczne i ustawienia w procesie roboczym (raz na proces)"""
+    import warnings  # Ostrzeżenia Streamlit poza aplikacją zaśmiecają wyjście
+    warnings.filterwarnings('ignore')
+    _WORKER.update(context)
+
+
+def validate_rows(chunk, columns, race_year):
+    """
+    Sprawdza wiersze listy startowej
+
+    Args:
+        chunk (pd.DataFrame): Paczka wejścia
+        columns (dict): Nazwy kolumn: gender, year, time
+        race_year (int): Rok biegu (wiek = rok biegu - rocznik)
+
+    Returns:
+        tuple: (płeć, wiek, czas 5 km w sekundach, np.ndarray z opisem błędu lub None dla poprawnych)
+    """
+    genders = chunk[columns['gender']].astype('string').str.strip().str.upper().to_numpy(dtype=object, na_value='')
+    ages = race_year - pd.to_numeric(chunk[columns['year']], errors='coerce').to_numpy(dtype=np.float64)
+
+    raw_times = chunk[columns['time']]
+    times = pd.to_numeric(raw_times, errors='coerce').to_numpy(dtype=np.float64)  # Czas w sekundach
+    text = np.isnan(times)
+    if text.any():  # Czas jako tekst H:MM:SS / MM:SS
+        parsed, _ = times_to_seconds(raw_times[text].astype('string').str.strip())
+        times[text] = parsed.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    errors = np.full(len(chunk), None, dtype=object)
+    checks = [  # Ostatni pasujący błąd zostaje (kolejność: od najmniej do najbardziej podstawowego)
+        (~((times >= MIN_TIME_5KM * 60) & (times <= MAX_TIME_5KM * 60)),
+         f"czas 5 km poza {MIN_TIME_5KM}-{MAX_TIME_5KM} min"),
+        (np.isnan(times), "brak lub niepoprawny czas 5 km"),
+        (~((ages >= MIN_AGE) & (ages <= MAX_AGE)), f"wiek poza {MIN_AGE}-{MAX_AGE} lat"),
+        (np.isnan(ages), "brak lub niepoprawny rocznik"),
+        (~np.isin(genders, ['M', 'K']), "płeć inna niż M/K"),
+    ]
+    for mask, message in checks:
+        errors[mask] = message
+    return genders, ages, times, errors
+
+
+def output_columns(intervals=True):
+    """
+    Kolumny dopisywane do listy startowej (w kolejności)
+
+    Args:
+        intervals (bool): Czy z przedziałem predykcji (czas od-do)
+
+    Returns:
+        list: Nazwy kolumn wyników
+    """
+    output = ['age_category', 'time_seconds', 'time_formatted', 'pace_per_km']
+    if intervals:
+        output += ['time_low_formatted', 'time_high_formatted']  # Przedział predykcji
+    for suffix in ('overall', 'category'):
+        output += [f'position_{suffix}', f'total_{suffix}', f'faster_than_percent_{suffix}']
+    return output + ['model_version', 'error']
+
+
+def score_chunk(chunk, model=None, df_historical=None, residual_table=None, race_year=CURRENT_YEAR,
+                columns=None, model_version=None):
+    """
+    Ocenia paczkę listy startowej (wektorowo, bez API Streamlit)
+
+    Args:
+        chunk (pd.DataFrame): Paczka wejścia
+        model: Wczytany model (predict)
+        df_historical (pd.DataFrame): Dane historyczne (ranking)
+        residual_table (dict): Tabela reszt (przedziały) lub None
+        race_year (int): Rok biegu
+        columns (dict): Nazwy kolumn: gender, year, time
+        model_version (str): Wersja modelu zapisywana przy każdym wierszu
+
+    Returns:
+        tuple: (pd.DataFrame wejście + kolumny wyników, czas oceny w sekundach)
+    """
+    start = time.perf_counter()
+    genders, ages, times, errors = validate_rows(chunk, columns, race_year)
+    valid = np.flatnonzero(pd.isna(errors))
+
+    output = output_columns(residual_table is not None)[:-2]  # Kolumny wyników (model_version i error osobno)
+    integer = {'time_seconds', 'position_overall', 'total_overall', 'position_category', 'total_category'}
+    scores = pd.DataFrame({  # Puste wartości dla wierszy pominiętych
+        name: pd.Series(pd.NA, index=chunk.index, dtype='Int64' if name in integer else
+                        'Float64' if name.startswith('faster_than') else 'string')
+        for name in output
+    })
+
+    if len(valid):
+        valid_ages = ages[valid].astype(np.int64)
+        predicted = predict_batch(model, genders[valid], valid_ages, times[valid].astype(np.int64),
+                                  current_year=race_year, residual_table=residual_table)
+        categories = calculate_age_category_batch(valid_ages, genders[valid])
+        values = {'age_category': categories}
+        values.update({name: predicted[name].to_numpy() for name in output if name in predicted})
+        for suffix, age_categories in (('overall', None), ('category', categories)):  # Klasyfikacja ogólna i kategoria
+            ranking = estimate_ranking_batch(df_historical, predicted['time_seconds'], genders[valid], age_categories)
+            values[f'position_{suffix}'] = ranking['estimated_position'].to_numpy()
+            values[f'total_{suffix}'] = ranking['total_runners'].to_numpy()
+            values[f'faster_than_percent_{suffix}'] = ranking['faster_than_percent'].to_numpy()
+        for name in output:
+            scores.iloc[valid, scores.columns.get_loc(name)] = values[name]
+
+    result = pd.concat([chunk, scores], axis=1)  # Wejście + wyniki
+    result['model_version'] = model_version  # Wersja modelu przy każdym wierszu
+    result['error'] = errors  # Powód pominięcia wiersza (puste = oceniony)
+    return result, time.perf_counter() - start
+
+
+def _score_in_worker(chunk):
+    """Ocena paczki w procesie roboczym (kontekst z _init_worker)"""
+    return score_chunk(chunk, **_WORKER)
+
+
+def peak_memory_mb():
+    """Szczytowa pamięć (RSS) procesu głównego i procesów roboczych w MB"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB na Linuksie
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss  # Największy zakończony proces roboczy
+    return usage / 1024, children / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ocena listy startowej: czasy, tempo i szacowane pozycje")
+    parser.add_argument('input', help="Plik CSV z listą startową")
+    parser.add_argument('--output', default=None, help="Plik wynikowy CSV (domyślnie <wejście>_scored.csv)")
+    parser.add_argument('--sep', default=',', help="Separator CSV (wejście i wyjście)")
+    parser.add_argument('--gender-col', default=SCORING_GENDER_COLUMN, help="Kolumna płci (M/K)")
+    parser.add_argument('--year-col', default=SCORING_BIRTH_YEAR_COLUMN, help="Kolumna roku urodzenia")
+    parser.add_argument('--time-col', default=SCORING_TIME_5KM_COLUMN, help="Kolumna czasu 5 km")
+    parser.add_argument('--race-year', type=int, default=CURRENT_YEAR, help="Rok biegu (do obliczenia wieku)")
+    parser.add_argument('--model', default=None, help="Wersja modelu (domyślnie aktywna z manifestu)")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Folder modeli")
+    parser.add_argument('--chunk-rows', type=int, default=SCORING_CHUNK_ROWS, help="Wiersze w paczce")
+    parser.add_argument('--workers', type=int, default=None, help="Procesy w puli (domyślnie liczba rdzeni)")
+    parser.add_argument('--no-intervals', action='store_true', help="Bez przedziałów predykcji (czas od-do)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"❌ Nie znaleziono pliku: {args.input}")
+        return 1
+    output = args.output or os.path.splitext(args.input)[0] + "_scored.csv"
+    columns = {'gender': args.gender_col, 'year': args.year_col, 'time': args.time_col}
+    workers = args.workers or os.cpu_count() or 1
+
+    print("=" * 70)
+    print("🏁 OCENA LISTY STARTOWEJ")
+    print("=" * 70)
+    setup_start = time.perf_counter()
+    version = args.model or read_manifest(os.path.join(args.model_dir, 'manifest.json'))['active']
+    try:
+        model = load_model_version(version, args.model_dir, notify=print)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    df_historical = load_historical_data()
+    residual_table = None if args.no_intervals else get_residual_table(df_historical, model, version)
+    setup_seconds = time.perf_counter() - setup_start
+    print(f"🤖 Model: {version} · dane historyczne: {len(df_historical):,} wierszy · {setup_seconds:.2f} s")
+
+    context = {
+        'model': model, 'df_historical': df_historical, 'residual_table': residual_table,
+        'race_year': args.race_year, 'columns': columns, 'model_version': version
+    }
+    # Wszystko jako tekst (bez zamiany pustych pól i 'NA' na NaN): pozostałe kolumny trafiają do wyniku
+    # dokładnie tak, jak w wejściu - typy nie zależą od zawartości paczki ('007' zostaje '007')
+    reader = pd.read_csv(args.input, sep=args.sep, chunksize=args.chunk_rows, encoding='utf-8-sig',
+                         dtype=str, keep_default_na=False)
+    reserved = set(output_columns(not args.no_intervals))  # Nazwy kolumn wyników
+    partial = output + ".part"  # Niepełny wynik nie nadpisuje gotowego pliku
+    stats = {'rows': 0, 'scored': 0, 'chunks': 0, 'score_seconds': 0.0, 'read_seconds': 0.0, 'write_seconds': 0.0}
+    errors = {}  # Powód -> liczba wierszy
+    start = time.perf_counter()
+
+    def write(future, f):
+        scored, seconds = future.result()
+        write_start = time.perf_counter()
+        scored.to_csv(f, sep=args.sep, index=False, header=stats['chunks'] == 0)
+        stats['write_seconds'] += time.perf_counter() - write_start
+        stats['score_seconds'] += seconds
+        stats['chunks'] += 1
+        stats['rows'] += len(scored)
+        stats['scored'] += int(scored['error'].isna().sum())
+        for reason, count in scored['error'].value_counts().items():
+            errors[reason] = errors.get(reason, 0) + int(count)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as pool, \
+            open(partial, 'w', encoding='utf-8-sig', newline='') as f:
+        pending = deque()
+        chunks = iter(reader)
+        while True:
+            read_start = time.perf_counter()
+            chunk = next(chunks, None)
+            stats['read_seconds'] += time.perf_counter() - read_start
+            if chunk is None:
+                break
+            missing = [c for c in columns.values() if c not in chunk.columns]
+            clashes = [c for c in chunk.columns if c in reserved]  # Wynik miałby dwie kolumny o tej samej nazwie
+            if missing or clashes:
+                if missing:
+                    print(f"❌ Brak kolumn: {', '.join(missing)} (dostępne: {', '.join(map(str, chunk.columns))})")
+                if clashes:
+                    print(f"❌ Kolumny wejścia o nazwach kolumn wyników: {', '.join(clashes)} (zmień nazwy w pliku)")
+                pool.shutdown(cancel_futures=True)
+                f.close()
+                os.remove(partial)
+                return 1
+            pending.append(pool.submit(_score_in_worker, chunk))
+            if len(pending) >= workers * SCORING_PENDING_PER_WORKER:  # Pełna kolejka - czekaj na najstarszą paczkę
+                write(pending.popleft(), f)
+        while pending:
+            write(pending.popleft(), f)
+    os.replace(partial, output)
+    wall = time.perf_counter() - start
+    parent_mb, worker_mb = peak_memory_mb()
+
+    print(f"\n💾 Zapisano: {output}")
+    print(f"📊 Wiersze: {stats['rows']:,} · ocenione: {stats['scored']:,} · pominięte: {stats['rows'] - stats['scored']:,}")
+    for reason, count in sorted(errors.items(), key=lambda item: -item[1]):
+        print(f"   • {reason}: {count:,}")
+    print(f"⚡ Przepustowość: {stats['rows'] / wall if wall else 0:,.0f} wierszy/s · {wall:.2f} s · "
+          f"{stats['chunks']} paczek × {args.chunk_rows:,} · {workers} procesów")
+    print(f"⏱️ Odczyt {stats['read_seconds']:.2f} s · ocena (suma procesów) {stats['score_seconds']:.2f} s · "
+          f"zapis {stats['write_seconds']:.2f} s · przygotowanie {setup_seconds:.2f} s")
+    print(f"🧠 Szczytowa pamięć: proces główny {parent_mb:.0f} MB · proces roboczy {worker_mb:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
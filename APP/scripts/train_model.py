@@ -0,0 +1,306 @@
+"""
+Trening modelu bez notebooka - porównanie modeli, tuning, finalizacja i zapis
+
+Użycie (z folderu APP):
+    python -m scripts.train_model [--models par,lr,ridge] [--top 5] [--n-iter 10] [--workers 8]
+    python -m scripts.train_model --search hyperband [--eta 3] [--min-budget 0.037]
+
+Kroki jak w notebooku EDA-ML (sekcje 12-17), bez PyCaret setup():
+    1. Macierz cech z plików halfmarathon_wroclaw_*__final.csv (cache Parquet)
+    2. Podział 80/20 (dane przetasowane raz, ziarno TRAINING_SEED)
+    3. Porównanie modeli - walidacja krzyżowa, wszystkie (model, fold) w puli procesów
+    4. Tuning najlepszych modeli - losowe konfiguracje (plus domyślna), też w puli,
+       albo Hyperband (training.search): wiele konfiguracji ocenianych tanio na części
+       danych i foldów, pełna walidacja tylko dla najlepszych; wyniki zadań w pliku JSONL
+       (przerwane wyszukiwanie wznawia się od miejsca przerwania)
+    5. Wybór po MAE na zbiorze testowym, finalizacja na 100% danych
+    6. Zapis <nazwa>.pkl i <nazwa>_info.json (z czasami etapów) w folderze model/
+
+Potem: python -m scripts.build_model_artifacts --model <nazwa>
+       python -m scripts.model_registry activate <nazwa>
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import hashlib  # Klucz pliku wyników wyszukiwania
+import json  # Metadane modelu
+import os  # Ścieżki do plików
+import sys  # Kod wyjścia
+import time  # Czasy etapów
+from contextlib import contextmanager  # Pomiar etapu
+from datetime import datetime  # Nazwa i data treningu
+
+import joblib  # Zapis pipeline (jak pycaret.save_model)
+import numpy as np  # Tasowanie wierszy
+from sklearn.model_selection import ParameterSampler  # Losowe konfiguracje
+
+from config import (  # Ustawienia treningu
+    MODEL_DIR, MODEL_FEATURES, TRAINING_TARGET, TRAINING_SEED, TRAINING_TEST_SIZE, TRAINING_FOLDS,
+    TRAINING_TOP_MODELS, TRAINING_TUNING_ITERATIONS, TRAINING_CACHE_DIR, TRAINING_SEARCH_ETA, TRAINING_SEARCH_MIN_BUDGET
+)
+from training.features import get_training_files, load_feature_matrix, features_version  # Macierz cech
+from training.models import MODEL_CANDIDATES, build_pipeline, make_estimator  # Kandydaci i pipeline
+from training.cv import ParallelCV, TEST_FOLD, summarize  # Równoległa walidacja
+from training.search import TrialStore, hyperband  # Wyszukiwanie Hyperband
+
+
+@contextmanager
+def timed(stages, name):
+    """Zapisuje czas etapu (sekundy) w słowniku stages"""
+    start = time.perf_counter()
+    yield
+    stages[name] = round(time.perf_counter() - start, 3)
+
+
+def split_train_test(matrix, test_size=TRAINING_TEST_SIZE, seed=TRAINING_SEED):
+    """
+    Tasuje wiersze i dzieli je na zbiór treningowy i testowy
+
+    Pliki CSV są posortowane po miejscu - bez tasowania modele uczone online
+    (PassiveAggressive) i foldy walidacji widziałyby tylko fragment rozkładu.
+
+    Args:
+        matrix (pd.DataFrame): Macierz cech z celem
+        test_size (float): Udział zbioru testowego
+        seed (int): Ziarno tasowania
+
+    Returns:
+        tuple: (X_train, y_train, X_test, y_test, przetasowana macierz)
+    """
+    shuffled = matrix.iloc[np.random.default_rng(seed).permutation(len(matrix))].reset_index(drop=True)
+    n_test = int(round(len(shuffled) * test_size))
+    train, test = shuffled.iloc[n_test:], shuffled.iloc[:n_test]
+    return (train[MODEL_FEATURES].reset_index(drop=True), train[TRAINING_TARGET].reset_index(drop=True),
+            test[MODEL_FEATURES].reset_index(drop=True), test[TRAINING_TARGET].reset_index(drop=True), shuffled)
+
+
+def tuning_configs(key, n_iter, seed=TRAINING_SEED):
+    """
+    Konfiguracje tuningu: domyślna + n_iter losowych z przestrzeni kandydata
+
+    Args:
+        key (str): Klucz z MODEL_CANDIDATES
+        n_iter (int): Liczba losowych konfiguracji
+        seed (int): Ziarno losowania
+
+    Returns:
+        list: Słowniki parametrów (bez duplikatów)
+    """
+    configs = [{}]  # Domyślne parametry - tuning nie pogorszy modelu (choose_better z PyCaret)
+    space = MODEL_CANDIDATES[key]['space']
+    if space and n_iter:
+        for params in ParameterSampler(space, n_iter=n_iter, random_state=seed):
+            params = {k: (v.item() if hasattr(v, 'item') else v) for k, v in params.items()}  # Typy JSON
+            if params not in configs:
+                configs.append(params)
+    return configs
+
+
+def search_key(paths, args):
+    """
+    Klucz wyszukiwania - wyniki zadań zależą od plików CSV, ziarna, udziału testu i liczby foldów
+
+    Returns:
+        str: features_version:ziarno:test_size:foldy
+    """
+    return f"{features_version(paths)}:{args.seed}:{args.test_size}:{args.folds}"
+
+
+def trials_path(key):
+    """
+    Domyślny plik wyników wyszukiwania - ten sam klucz oznacza ten sam plik,
+    więc ponowne uruchomienie wznawia wyszukiwanie
+
+    Args:
+        key (str): Klucz wyszukiwania (search_key)
+
+    Returns:
+        str: Ścieżka pliku JSONL w TRAINING_CACHE_DIR
+    """
+    return os.path.join(TRAINING_CACHE_DIR, f"search_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.jsonl")
+
+
+def print_curve(search):
+    """Wypisuje krzywą dokładność vs koszt (najlepsze pełne CV po każdej drabince)"""
+    print(f"\n📈 Dokładność vs koszt ({search['configs']} konfiguracji, {search['tasks']} zadań, "
+          f"{search['cached']} z pliku wyników)")
+    print(f"  {'drabinka':>8} {'pełne CV':>9} {'MAE s':>9} {'koszt CV':>9} {'fit s':>8} {'czas s':>8}")
+    for point in search['curve']:
+        if point['budget'] < 1:  # Punkt krzywej = koniec drabinki (pełna walidacja)
+            continue
+        print(f"  {point['bracket']:>8} {point['configs']:>9} {point['incumbent_mae']:9.1f} "
+              f"{point['full_equivalents']:9.2f} {point['fit_seconds']:8.2f} {point['wall_seconds']:8.1f}")
+
+
+def print_table(title, rows):
+    """Wypisuje ranking konfiguracji"""
+    print(f"\n{title}")
+    print(f"  {'model':10} {'MAE s':>9} {'± s':>7} {'fit s':>8}  parametry")
+    for row in rows:
+        mae = f"{row['mae']:9.1f}" if np.isfinite(row['mae']) else "    błąd "
+        std = f"{row['mae_std']:7.1f}" if row.get('mae_std') is not None else "      -"
+        print(f"  {row['model']:10} {mae} {std} {row['fit_seconds']:8.2f}  {row['error'] or row['params'] or '(domyślne)'}")
+
+
+def train(args):
+    """
+    Pełny trening - zwraca (nazwa modelu, metadane)
+
+    Args:
+        args (argparse.Namespace): Argumenty CLI
+
+    Returns:
+        tuple: (str nazwa, dict metadane)
+    """
+    stages = {}  # Czasy etapów (sekundy)
+    total_start = time.perf_counter()
+    models = args.models.split(',') if args.models else list(MODEL_CANDIDATES)
+    unknown = [m for m in models if m not in MODEL_CANDIDATES]
+    if unknown:
+        raise ValueError(f"Nieznane modele: {', '.join(unknown)} (dostępne: {', '.join(MODEL_CANDIDATES)})")
+
+    with timed(stages, 'load_features'):
+        paths = get_training_files(args.data)
+        matrix, cache_hit = load_feature_matrix(paths, use_cache=not args.no_cache)
+    print(f"📂 Dane: {len(matrix):,} wierszy z {len(paths)} plików ({'cache' if cache_hit else 'CSV'}, "
+          f"{stages['load_features']:.2f} s)")
+
+    with timed(stages, 'split'):
+        X_train, y_train, X_test, y_test, shuffled = split_train_test(matrix, args.test_size, args.seed)
+
+    store = None
+    if args.search == 'hyperband':  # Plik wyników sprawdzany przed startem puli (inny klucz = błąd)
+        key = search_key(paths, args)
+        store = TrialStore(args.trials_file or trials_path(key), key)
+
+    with ParallelCV(X_train, y_train, X_test, y_test, n_folds=args.folds, workers=args.workers) as cv:
+        print(f"⚙️ Pula procesów: {cv.workers} · {args.folds} foldów · {len(models)} modeli")
+
+        # Porównanie modeli (compare_models)
+        with timed(stages, 'compare'):
+            compare = summarize(cv.run([
+                {'model': m, 'params': {}, 'fold': fold} for m in models for fold in range(args.folds)
+            ]))
+        print_table(f"🤖 Porównanie modeli ({stages['compare']:.1f} s)", compare)
+        top = [row for row in compare if np.isfinite(row['mae'])][:args.top]
+
+        # Tuning najlepszych (tune_model)
+        search = None
+        if args.search == 'hyperband':
+            with timed(stages, 'tune'):
+                print(f"\n🔎 Hyperband (eta {args.eta}, budżet od {args.min_budget:.3f}) · wyniki: {store.path} "
+                      f"({store.loaded} zapisanych)")
+                search = hyperband(cv, [row['model'] for row in top], len(X_train), store,
+                                   eta=args.eta, min_budget=args.min_budget, seed=args.seed, log=print)
+                tuned = []
+                for row in top:  # Domyślne parametry zostają, jeśli żadna konfiguracja ich nie pobiła
+                    candidates = [row] + [r for r in search['final'] if r['model'] == row['model']]
+                    tuned.append(min(candidates, key=lambda r: r['mae']))
+            print_curve(search)
+            print_table(f"🔧 Tuning {len(top)} modeli - Hyperband ({stages['tune']:.1f} s)", tuned)
+        else:
+            with timed(stages, 'tune'):
+                tuned = []
+                tasks = [{'model': row['model'], 'params': params, 'fold': fold}
+                         for row in top for params in tuning_configs(row['model'], args.n_iter, args.seed)
+                         for fold in range(args.folds)]
+                results = summarize(cv.run(tasks))
+                for row in top:
+                    tuned.append(next(r for r in results if r['model'] == row['model']))  # Najlepsza konfiguracja modelu
+            print_table(f"🔧 Tuning {len(top)} modeli × {args.n_iter + 1} konfiguracji ({stages['tune']:.1f} s)", tuned)
+
+        # Ocena na zbiorze testowym (predict_model na hold-out)
+        with timed(stages, 'evaluate'):
+            test_results = cv.run([{'model': r['model'], 'params': r['params'], 'fold': TEST_FOLD} for r in tuned])
+        for row, result in zip(tuned, test_results):
+            row['mae_test'] = result['mae']
+
+    best = min(tuned, key=lambda r: r['mae_test'])
+    rank_before = [r['model'] for r in top].index(best['model']) + 1
+    print(f"\n🏆 Wybrany model: {best['model']} · MAE test {best['mae_test']:.1f} s "
+          f"({best['mae_test'] / 60:.2f} min) · MAE CV {best['mae']:.1f} s")
+
+    # Finalizacja na 100% danych (finalize_model)
+    with timed(stages, 'finalize'):
+        pipeline = build_pipeline(make_estimator(best['model'], best['params']))
+        pipeline.fit(shuffled[MODEL_FEATURES], shuffled[TRAINING_TARGET])
+
+    model_name = f"halfmarathon_model_3features_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    info = {
+        'model_type': type(pipeline.steps[-1][1]).__name__,  # Np. PassiveAggressiveRegressor
+        'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),  # Data treningu
+        'dataset_size': len(matrix),  # Liczba rekordów
+        'features': MODEL_FEATURES,  # Lista cech
+        'target': TRAINING_TARGET,  # Zmienna docelowa
+        'mae_cv': best['mae'],  # MAE z walidacji krzyżowej (zbiór treningowy)
+        'mae_test': best['mae_test'],  # MAE na zbiorze testowym
+        'mae_minutes': best['mae_test'] / 60,  # MAE testowe w minutach
+        'params': best['params'],  # Hiperparametry (poza stałymi kandydata)
+        'tuning_applied': bool(best['params']),  # Czy wygrała konfiguracja z tuningu
+        'tuning_iterations': args.n_iter if not search else search['configs'],  # Konfiguracje tuningu
+        'tuning_search': args.search,  # random / hyperband
+        'models_compared': len(models),  # Liczba porównanych modeli
+        'best_model_rank_before_tuning': rank_before,  # Pozycja przed tuningiem
+        'data_files': [os.path.basename(p) for p in paths],  # Pliki źródłowe
+        'feature_cache_hit': cache_hit,  # Macierz cech z cache
+        'workers': cv.workers,  # Procesy w puli
+        'folds': args.folds,  # Foldy walidacji
+        'seed': args.seed,  # Ziarno
+        'leaderboard': [  # Porównanie modeli (domyślne parametry)
+            {'model': r['model'], 'mae_cv': r['mae'], 'fit_seconds': round(r['fit_seconds'], 3)} for r in compare
+        ],
+        'stage_seconds': stages  # Czasy etapów
+    }
+    if search:
+        info['search'] = {  # Raport Hyperband (krzywa MAE vs koszt)
+            'eta': args.eta, 'min_budget': args.min_budget,
+            **{k: search[k] for k in ('configs', 'tasks', 'cached', 'full_equivalents', 'wall_seconds', 'curve')}
+        }
+
+    with timed(stages, 'save'):
+        os.makedirs(args.output_dir, exist_ok=True)
+        model_path = os.path.join(args.output_dir, model_name)
+        joblib.dump(pipeline, model_path + ".pkl")  # Ten sam format co pycaret.save_model
+        info['total_seconds'] = round(time.perf_counter() - total_start, 3)  # Razem z zapisem
+        with open(model_path + "_info.json", 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=4, ensure_ascii=False)
+    return model_name, info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trening modelu (porównanie, tuning i finalizacja w puli procesów)")
+    parser.add_argument('--data', default=None, help="Wzorzec glob plików CSV (domyślnie EDA-ML/data/*__final.csv)")
+    parser.add_argument('--models', default=None, help=f"Modele po przecinku (domyślnie wszystkie: {','.join(MODEL_CANDIDATES)})")
+    parser.add_argument('--top', type=int, default=TRAINING_TOP_MODELS, help="Modele przekazywane do tuningu")
+    parser.add_argument('--n-iter', type=int, default=TRAINING_TUNING_ITERATIONS, help="Losowe konfiguracje na model")
+    parser.add_argument('--search', choices=['random', 'hyperband'], default='random', help="Metoda tuningu")
+    parser.add_argument('--eta', type=int, default=TRAINING_SEARCH_ETA, help="Hyperband: współczynnik odsiewu")
+    parser.add_argument('--min-budget', type=float, default=TRAINING_SEARCH_MIN_BUDGET,
+                        help="Hyperband: najmniejszy budżet (ułamek wierszy i foldów)")
+    parser.add_argument('--trials-file', default=None, help="Hyperband: plik JSONL z wynikami zadań (wznawianie)")
+    parser.add_argument('--folds', type=int, default=TRAINING_FOLDS, help="Foldy walidacji krzyżowej")
+    parser.add_argument('--test-size', type=float, default=TRAINING_TEST_SIZE, help="Udział zbioru testowego")
+    parser.add_argument('--seed', type=int, default=TRAINING_SEED, help="Ziarno tasowania i losowania")
+    parser.add_argument('--workers', type=int, default=None, help="Procesy w puli (domyślnie liczba rdzeni)")
+    parser.add_argument('--output-dir', default=MODEL_DIR, help="Folder na .pkl i _info.json")
+    parser.add_argument('--no-cache', action='store_true', help="Buduj macierz cech z CSV (bez cache)")
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("🎓 TRENING MODELU")
+    print("=" * 70)
+    try:
+        model_name, info = train(args)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"\n💾 Zapisano: {os.path.join(args.output_dir, model_name)}.pkl (+ _info.json)")
+    print("⏱️ Etapy: " + " · ".join(f"{name} {seconds:.2f} s" for name, seconds in info['stage_seconds'].items()))
+    print(f"   Razem: {info['total_seconds']:.1f} s")
+    print(f"\nDalej: python -m scripts.build_model_artifacts --model {model_name}")
+    print(f"       python -m scripts.model_registry activate {model_name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
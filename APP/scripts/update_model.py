@@ -0,0 +1,127 @@
+"""
+Aktualizacja przyrostowa modelu wynikami nowej edycji (bez pełnego treningu)
+
+Użycie (z folderu APP):
+    python -m scripts.update_model ../EDA-ML/data/halfmarathon_wroclaw_2025__final.csv
+    python -m scripts.update_model NOWE.csv --base NAZWA_MODELU --epochs 2 --dry-run
+
+Kroki:
+    1. Model bazowy (domyślnie aktywna wersja z manifestu) - estymator musi mieć partial_fit
+    2. Nowe wiersze paczkami przez preprocessing pipeline -> partial_fit (training.incremental)
+    3. Walidacja: MAE modelu bazowego i zaktualizowanego na odłożonych nowych wierszach
+    4. Promocja tylko, gdy MAE po aktualizacji <= MAE bazowe × INCREMENTAL_MAX_MAE_RATIO:
+       zapis .pkl, _info.json i artefaktów (skompilowany model, tablica predykcji),
+       aktywacja w manifeście (aplikacja podmienia model bez restartu)
+"""
+
+import argparse  # Argumenty wiersza poleceń
+import json  # Metadane modelu
+import os  # Ścieżki do plików
+import sys  # Kod wyjścia
+import time  # Czasy etapów
+from datetime import datetime  # Nazwa i data aktualizacji
+
+import joblib  # Odczyt i zapis pipeline
+
+from config import (  # Ustawienia aktualizacji
+    MODEL_DIR, MODEL_MANIFEST_FILE, TRAINING_SEED, INCREMENTAL_MAX_MAE_RATIO, INCREMENTAL_CHUNK_ROWS
+)
+from utils.model_loader import read_manifest, write_manifest, read_model_info  # Rejestr wersji
+from training.incremental import incremental_update  # partial_fit paczkami
+from scripts.build_model_artifacts import build_compiled_model, build_prediction_table  # Artefakty jak po treningu
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aktualizacja przyrostowa modelu (partial_fit) wynikami nowej edycji")
+    parser.add_argument('files', nargs='+', help="Pliki CSV nowej edycji (format *__final.csv, separator ';')")
+    parser.add_argument('--base', default=None, help="Model bazowy (domyślnie aktywna wersja z manifestu)")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Folder modeli (z manifest.json)")
+    parser.add_argument('--epochs', type=int, default=1, help="Przejścia po nowych danych")
+    parser.add_argument('--chunk-rows', type=int, default=INCREMENTAL_CHUNK_ROWS, help="Wiersze w paczce partial_fit")
+    parser.add_argument('--max-mae-ratio', type=float, default=INCREMENTAL_MAX_MAE_RATIO,
+                        help="Promocja, jeśli MAE po aktualizacji <= MAE bazowe × współczynnik")
+    parser.add_argument('--seed', type=int, default=TRAINING_SEED, help="Ziarno tasowania i walidacji")
+    parser.add_argument('--dry-run', action='store_true', help="Tylko walidacja - bez zapisu i aktywacji")
+    parser.add_argument('--no-activate', action='store_true', help="Zapisz wersję, ale nie zmieniaj manifestu")
+    args = parser.parse_args(argv)
+
+    manifest_path = os.path.join(args.model_dir, os.path.basename(MODEL_MANIFEST_FILE))
+    manifest = read_manifest(manifest_path)
+    base_version = args.base or manifest['active']
+    base_path = os.path.join(args.model_dir, base_version)
+    missing = [path for path in args.files if not os.path.exists(path)]
+    if missing:
+        print(f"❌ Nie znaleziono plików: {', '.join(missing)}")
+        return 1
+    if not os.path.exists(base_path + ".pkl"):  # Skompilowany model nie ma partial_fit
+        print(f"❌ Brak pliku {base_path}.pkl (aktualizacja wymaga pipeline, nie samego artefaktu)")
+        return 1
+
+    print("=" * 70)
+    print(f"🔁 AKTUALIZACJA PRZYROSTOWA: {base_version}")
+    print("=" * 70)
+    base_pipeline = joblib.load(base_path + ".pkl")
+    try:
+        updated, report = incremental_update(base_pipeline, args.files, seed=args.seed, epochs=args.epochs,
+                                             chunk_rows=args.chunk_rows)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"📂 Nowe dane: {report['rows']:,} wierszy do uczenia · {report['holdout_rows']:,} do walidacji "
+          f"· {report['batches']} wywołań partial_fit · {report['seconds']:.2f} s")
+    print(f"📏 MAE walidacji: bazowy {report['mae_base']:.1f} s → po aktualizacji {report['mae_updated']:.1f} s")
+    threshold = report['mae_base'] * args.max_mae_ratio
+    if report['mae_updated'] > threshold:
+        print(f"❌ Bez promocji: MAE {report['mae_updated']:.1f} s > próg {threshold:.1f} s "
+              f"(bazowe × {args.max_mae_ratio})")
+        return 1
+    if args.dry_run:
+        print("✓ Walidacja zaliczona (--dry-run: bez zapisu)")
+        return 0
+
+    stages = {'update': report['seconds']}  # Czasy etapów (sekundy)
+    start = time.perf_counter()
+    model_name = f"halfmarathon_model_3features_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    model_path = os.path.join(args.model_dir, model_name)
+    joblib.dump(updated, model_path + ".pkl")  # Ten sam format co pycaret.save_model
+    stages['save'] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    try:
+        build_compiled_model(updated, model_path)  # Start aplikacji bez PyCaret
+        build_prediction_table(updated, model_path)  # Predykcja = odczyt z tablicy
+    except ValueError as e:  # Model nieliniowy - aplikacja użyje .pkl
+        print(f"⚠️ Artefakty pominięte: {e}")
+    stages['artifacts'] = round(time.perf_counter() - start, 3)
+
+    info = read_model_info(base_version, args.model_dir)  # Metadane bazowe (typ, cechy, cel)
+    for key in ('leaderboard', 'stage_seconds', 'total_seconds', 'mae_cv', 'mae_test'):  # Opisują trening bazowy
+        info.pop(key, None)
+    info.update({
+        'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),  # Data aktualizacji
+        'dataset_size': info.get('dataset_size', 0) + report['rows'],  # Wiersze, które widział model
+        'mae_holdout': report['mae_updated'],  # MAE na walidacji nowej edycji
+        'mae_minutes': report['mae_updated'] / 60,  # MAE walidacji w minutach (model_registry list)
+        'base_version': base_version,  # Wersja, z której powstała aktualizacja
+        'incremental_update': {
+            **report,
+            'files': [os.path.basename(path) for path in args.files],  # Pliki nowej edycji
+            'max_mae_ratio': args.max_mae_ratio  # Próg promocji
+        },
+        'stage_seconds': stages  # Czasy etapów
+    })
+    with open(model_path + "_info.json", 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=4, ensure_ascii=False)
+    print(f"💾 Zapisano: {model_path}.pkl (+ _info.json)")
+
+    if args.no_activate:
+        print(f"Dalej: python -m scripts.model_registry activate {model_name}")
+        return 0
+    write_manifest(model_name, manifest['active'], manifest_path)  # Aplikacja załaduje wersję w tle
+    print(f"✓ Aktywna wersja: {model_name} (poprzednia: {manifest['active']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
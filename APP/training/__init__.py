@@ -0,0 +1,3 @@
+"""
+Trening modelu poza notebookiem - uruchamiany z folderu APP: python -m scripts.train_model
+"""
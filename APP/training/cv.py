@@ -0,0 +1,140 @@
+"""
+Równoległa ocena konfiguracji modeli - pula procesów na wszystkie rdzenie
+
+Zadanie to jedno dopasowanie pipeline: (model, parametry, fold). Dane trafiają
+do procesów raz, przez initializer puli - zadania przesyłają tylko klucz modelu,
+parametry i numer foldu. Fold 'test' oznacza dopasowanie na całym zbiorze
+treningowym i ocenę na zbiorze testowym (hold-out).
+"""
+
+import os  # Liczba rdzeni
+import time  # Czas dopasowania
+from concurrent.futures import ProcessPoolExecutor  # Pula procesów
+
+import numpy as np  # Indeksy foldów
+from sklearn.model_selection import KFold  # Podział na foldy
+
+from training.models import build_pipeline, make_estimator  # Pipeline kandydata
+
+TEST_FOLD = 'test'  # Fold oceny na zbiorze testowym
+
+_WORKER = {}  # Dane procesu roboczego (ustawiane przez _init_worker)
+
+
+def _init_worker(X_train, y_train, X_test, y_test, folds):
+    """Zapisuje dane w procesie roboczym (raz na proces, nie na zadanie)"""
+    import warnings  # Ostrzeżenia zbieżności modeli liniowych zaśmiecają wyjście
+    warnings.filterwarnings('ignore')
+    _WORKER.update(X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, folds=folds)
+
+
+def run_task(task):
+    """
+    Dopasowuje pipeline i liczy MAE (wykonywane w procesie roboczym)
+
+    Args:
+        task (dict): model, params, fold (numer lub TEST_FOLD), opcjonalnie n_rows
+            (dopasowanie na pierwszych n_rows wierszach części treningowej foldu)
+
+    Returns:
+        dict: Zadanie z wynikiem - mae, fit_seconds, n_rows (lub error)
+    """
+    X, y = _WORKER['X_train'], _WORKER['y_train']
+    if task['fold'] == TEST_FOLD:
+        train_idx = np.arange(len(X))
+        X_valid, y_valid = _WORKER['X_test'], _WORKER['y_test']
+    else:
+        train_idx, valid_idx = _WORKER['folds'][task['fold']]
+        X_valid, y_valid = X.iloc[valid_idx], y.iloc[valid_idx]
+    if task.get('n_rows'):
+        train_idx = train_idx[:task['n_rows']]  # Podzbiór danych (wiersze już przetasowane)
+
+    start = time.perf_counter()
+    try:
+        pipeline = build_pipeline(make_estimator(task['model'], task['params']))
+        pipeline.fit(X.iloc[train_idx], y.iloc[train_idx])
+        mae = float(np.mean(np.abs(pipeline.predict(X_valid) - y_valid.to_numpy())))
+        if not np.isfinite(mae):
+            raise ValueError("MAE nie jest skończone")
+    except Exception as e:  # Konfiguracja nie działa na tych danych - pomijamy ją w rankingu
+        return {**task, 'mae': float('inf'), 'fit_seconds': time.perf_counter() - start,
+                'n_rows': len(train_idx), 'error': f"{type(e).__name__}: {e}"}
+    return {**task, 'mae': mae, 'fit_seconds': time.perf_counter() - start, 'n_rows': len(train_idx)}
+
+
+class ParallelCV:
+    """
+    Pula procesów oceniająca zadania (model, parametry, fold) na wspólnych danych
+
+    Użycie:
+        with ParallelCV(X_train, y_train, X_test, y_test, n_folds=5) as cv:
+            results = cv.run(tasks)
+    """
+
+    def __init__(self, X_train, y_train, X_test, y_test, n_folds, workers=None):
+        self.workers = workers or os.cpu_count() or 1  # Domyślnie wszystkie rdzenie
+        self.n_folds = n_folds  # Liczba foldów
+        folds = list(KFold(n_splits=n_folds).split(X_train))  # Wiersze przetasowane przed podziałem
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(X_train, y_train, X_test, y_test, folds)
+        )
+
+    def run(self, tasks):
+        """
+        Wykonuje zadania równolegle
+
+        Args:
+            tasks (list): Zadania dla run_task
+
+        Returns:
+            list: Wyniki w kolejności zadań
+        """
+        return list(self._executor.map(run_task, tasks, chunksize=1))
+
+    def submit(self, task):
+        """Zleca jedno zadanie (Future z wynikiem run_task)"""
+        return self._executor.submit(run_task, task)
+
+    def close(self):
+        """Zamyka pulę procesów"""
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def summarize(results):
+    """
+    Grupuje wyniki foldów w wyniki konfiguracji (średnie MAE)
+
+    Args:
+        results (list): Wyniki run_task
+
+    Returns:
+        list: Słowniki {model, params, mae, mae_std, fit_seconds, folds, error}, od najlepszego MAE
+    """
+    groups = {}
+    for result in results:
+        key = (result['model'], repr(sorted(result['params'].items())))  # Ta sama konfiguracja
+        groups.setdefault(key, []).append(result)
+
+    summary = []
+    for group in groups.values():
+        maes = [r['mae'] for r in group]
+        errors = [r['error'] for r in group if 'error' in r]
+        with np.errstate(over='ignore'):  # Rozbieżna konfiguracja (MAE rzędu 1e200) - std = inf
+            mae_std = float(np.std(maes)) if not errors else None
+        summary.append({
+            'model': group[0]['model'],  # Klucz kandydata
+            'params': group[0]['params'],  # Hiperparametry
+            'mae': float(np.mean(maes)) if not errors else float('inf'),  # Średnie MAE foldów
+            'mae_std': mae_std,  # Rozrzut między foldami
+            'fit_seconds': float(sum(r['fit_seconds'] for r in group)),  # Łączny czas dopasowań
+            'folds': len(group),  # Liczba ocen
+            'error': errors[0] if errors else None  # Pierwszy błąd
+        })
+    return sorted(summary, key=lambda s: s['mae'])
@@ -0,0 +1,131 @@
+"""
+Macierz cech do treningu - te same kroki co notebook EDA-ML (sekcje 4, 10-11)
+
+Pliki halfmarathon_wroclaw_*__final.csv (separator ';') są łączone z kolumną
+'rok' z nazwy pliku, bez duplikatów. Czas końcowy i czas na 5km zamieniane są
+na sekundy, a wiersze bez czasu końcowego usuwane. Gotowa macierz (3 cechy +
+cel) trafia do cache Parquet z kluczem z zawartości plików, więc kolejny
+trening nie parsuje CSV.
+"""
+
+import glob  # Wyszukiwanie plików źródłowych
+import hashlib  # Klucz cache z zawartości plików
+import os  # Ścieżki do plików
+import re  # Rok z nazwy pliku
+
+import pandas as pd  # Dane tabelaryczne
+
+from config import (  # Źródła danych i ustawienia cache
+    EDA_DATA_DIR, EDA_DATA_PATTERN, MODEL_FEATURES, TRAINING_TARGET,
+    TRAINING_CACHE_DIR, TRAINING_FEATURES_SCHEMA
+)
+from utils.data_loader import times_to_seconds  # Wektorowy parser HH:MM:SS
+
+NUMERIC_FEATURES = [f for f in MODEL_FEATURES if f != 'Płeć']  # Cechy liczbowe (imputacja średnią)
+CATEGORICAL_FEATURES = ['Płeć']  # Cechy kategoryczne (najczęstsza wartość + kodowanie)
+
+
+def get_training_files(pattern=None):
+    """
+    Zwraca pliki CSV z wynikami (posortowane - stała kolejność wierszy)
+
+    Args:
+        pattern (str): Wzorzec glob (domyślnie EDA_DATA_DIR/EDA_DATA_PATTERN)
+
+    Returns:
+        list: Ścieżki plików
+    """
+    return sorted(glob.glob(pattern or os.path.join(EDA_DATA_DIR, EDA_DATA_PATTERN)))
+
+
+def features_version(paths):
+    """
+    Klucz cache macierzy cech: schemat i hash SHA-256 zawartości plików
+
+    Args:
+        paths (list): Pliki CSV
+
+    Returns:
+        str: 16-znakowy identyfikator
+    """
+    digest = hashlib.sha256(f"schema:{TRAINING_FEATURES_SCHEMA}".encode('utf-8'))
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:  # Czytaj blokami po 1 MB
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def read_results(paths):
+    """
+    Wczytuje i łączy pliki wyników (kolumna 'rok' z nazwy pliku, bez duplikatów)
+
+    Args:
+        paths (list): Pliki CSV z separatorem ';'
+
+    Returns:
+        pd.DataFrame: Surowe wyniki wszystkich edycji
+    """
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path, sep=';')
+        year = re.search(r'20\d{2}', os.path.basename(path))  # Np. "..._2024__final.csv" -> 2024
+        if year:
+            df['rok'] = int(year.group())
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True).drop_duplicates()  # Ta sama osoba w innym roku to nie duplikat
+
+
+def build_feature_matrix(df):
+    """
+    Buduje macierz cech i cel z surowych wyników
+
+    Args:
+        df (pd.DataFrame): Wyniki z read_results
+
+    Returns:
+        pd.DataFrame: Kolumny MODEL_FEATURES + TRAINING_TARGET (braki w cechach uzupełnia pipeline)
+    """
+    matrix = pd.DataFrame({
+        'Płeć': df['Płeć'],
+        '5 km Czas_sekundy': times_to_seconds(df['5 km Czas'])[0].astype('float64'),  # Czas na 5km (s)
+        'Rocznik': df['Rocznik'].astype('float64'),
+        TRAINING_TARGET: times_to_seconds(df['Czas'])[0].astype('float64')  # Czas końcowy (s)
+    })
+    matrix = matrix.dropna(subset=[TRAINING_TARGET]).reset_index(drop=True)  # Bez czasu końcowego (DNF)
+    return matrix[MODEL_FEATURES + [TRAINING_TARGET]]
+
+
+def load_feature_matrix(paths, cache_dir=TRAINING_CACHE_DIR, use_cache=True):
+    """
+    Zwraca macierz cech - z cache Parquet albo zbudowaną z CSV (i zapisaną do cache)
+
+    Args:
+        paths (list): Pliki CSV z wynikami
+        cache_dir (str): Folder cache
+        use_cache (bool): False - zawsze buduj z CSV (bez odczytu i zapisu cache)
+
+    Returns:
+        tuple: (pd.DataFrame macierz cech, bool czy z cache)
+    """
+    if not paths:
+        raise FileNotFoundError(f"Brak plików {EDA_DATA_PATTERN} w {EDA_DATA_DIR}")
+
+    cache_path = os.path.join(cache_dir, f"features_{features_version(paths)}.parquet")
+    if use_cache and os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path), True
+        except Exception:  # Uszkodzony plik - zbuduj od nowa
+            pass
+
+    matrix = build_feature_matrix(read_results(paths))
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"  # Zapis atomowy
+        matrix.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+        for old_path in glob.glob(os.path.join(cache_dir, "features_*.parquet")):  # Tylko aktualna wersja
+            if old_path != cache_path:
+                os.remove(old_path)
+    return matrix, False
@@ -0,0 +1,141 @@
+"""
+Aktualizacja przyrostowa modelu (partial_fit) wynikami nowej edycji
+
+Nowe pliki CSV są czytane paczkami, zamieniane na macierz cech jak przy pełnym
+treningu i przepuszczane przez kroki preprocessingu wytrenowanego pipeline
+(imputacja, kodowanie, standaryzacja - bez ponownego dopasowania). Estymator
+uczy się tylko na nowych wierszach, więc koszt zależy od rozmiaru nowej edycji,
+a nie od wszystkich lat. Część wierszy trafia do zbioru walidacyjnego, na którym
+porównywane są model bazowy i zaktualizowany.
+"""
+
+import copy  # Kopia pipeline bazowego
+import time  # Czas aktualizacji
+
+import numpy as np  # Tasowanie i MAE
+import pandas as pd  # Paczki CSV
+
+from config import (  # Ustawienia aktualizacji
+    MODEL_FEATURES, TRAINING_TARGET, TRAINING_SEED, INCREMENTAL_CHUNK_ROWS, INCREMENTAL_SHUFFLE_ROWS,
+    INCREMENTAL_HOLDOUT_FRACTION
+)
+from training.features import build_feature_matrix  # Te same cechy co pełny trening
+
+
+def preprocess(pipeline, X):
+    """
+    Przepuszcza dane przez kroki pipeline poza estymatorem (bez dopasowania)
+
+    Args:
+        pipeline: Wytrenowany pipeline PyCaret
+        X (pd.DataFrame): Kolumny MODEL_FEATURES
+
+    Returns:
+        pd.DataFrame: Dane w postaci oczekiwanej przez estymator
+    """
+    for _, step in pipeline.steps[:-1]:
+        X = step.transform(X)
+    return X
+
+
+def stream_batches(paths, split_rng, shuffle_rng, chunk_rows=INCREMENTAL_CHUNK_ROWS,
+                   shuffle_rows=INCREMENTAL_SHUFFLE_ROWS, holdout_fraction=INCREMENTAL_HOLDOUT_FRACTION, holdout=None):
+    """
+    Czyta pliki paczkami i zwraca przetasowane paczki treningowe
+
+    Pliki są posortowane po miejscu, a model uczony online zapamiętuje ostatnie
+    wiersze - dlatego wiersze zbierane są w oknie shuffle_rows i tasowane przed
+    wydaniem. W pamięci jest najwyżej jedno okno.
+
+    Args:
+        paths (list): Pliki CSV (separator ';')
+        split_rng (np.random.Generator): Generator wyboru wierszy walidacyjnych
+        shuffle_rng (np.random.Generator): Generator kolejności wierszy
+        chunk_rows (int): Wiersze w paczce
+        shuffle_rows (int): Rozmiar okna tasowania
+        holdout_fraction (float): Część wierszy do walidacji
+        holdout (list): Lista, do której trafiają wiersze walidacyjne (DataFrame na paczkę CSV)
+
+    Yields:
+        pd.DataFrame: Paczka treningowa (MODEL_FEATURES + cel)
+    """
+    window, window_rows = [], 0
+
+    def drain(window):
+        rows = pd.concat(window, ignore_index=True)
+        rows = rows.iloc[shuffle_rng.permutation(len(rows))]
+        for start in range(0, len(rows), chunk_rows):
+            yield rows.iloc[start:start + chunk_rows]
+
+    for path in paths:
+        for raw in pd.read_csv(path, sep=';', chunksize=chunk_rows):
+            matrix = build_feature_matrix(raw)
+            is_holdout = split_rng.random(len(matrix)) < holdout_fraction
+            if holdout is not None:
+                holdout.append(matrix[is_holdout])
+            window.append(matrix[~is_holdout])
+            window_rows += int((~is_holdout).sum())
+            if window_rows >= shuffle_rows:  # Pełne okno - tasuj i wydaj
+                yield from drain(window)
+                window, window_rows = [], 0
+    if window_rows:
+        yield from drain(window)
+
+
+def holdout_mae(pipeline, holdout):
+    """MAE pipeline na zbiorze walidacyjnym (sekundy)"""
+    predictions = np.asarray(pipeline.predict(holdout[MODEL_FEATURES]), dtype=np.float64)
+    return float(np.mean(np.abs(predictions - holdout[TRAINING_TARGET].to_numpy())))
+
+
+def incremental_update(base_pipeline, paths, seed=TRAINING_SEED, epochs=1, chunk_rows=INCREMENTAL_CHUNK_ROWS,
+                       shuffle_rows=INCREMENTAL_SHUFFLE_ROWS, holdout_fraction=INCREMENTAL_HOLDOUT_FRACTION):
+    """
+    Aktualizuje kopię pipeline nowymi danymi (partial_fit estymatora)
+
+    Args:
+        base_pipeline: Wytrenowany pipeline (estymator z partial_fit)
+        paths (list): Pliki CSV nowej edycji
+        seed (int): Ziarno tasowania i wyboru walidacji
+        epochs (int): Przejścia po nowych danych
+        chunk_rows (int): Wiersze w paczce
+        shuffle_rows (int): Okno tasowania
+        holdout_fraction (float): Część wierszy do walidacji
+
+    Returns:
+        tuple: (pipeline po aktualizacji, dict raport: rows, holdout_rows, batches, mae_base, mae_updated, seconds)
+
+    Raises:
+        ValueError: Jeśli estymator nie obsługuje partial_fit lub brak nowych wierszy
+    """
+    estimator = base_pipeline.steps[-1][1]
+    if not hasattr(estimator, 'partial_fit'):
+        raise ValueError(f"{type(estimator).__name__} nie obsługuje partial_fit - potrzebny pełny trening")
+
+    start = time.perf_counter()
+    updated = copy.deepcopy(base_pipeline)  # Model bazowy zostaje nietknięty
+    model = updated.steps[-1][1]
+    holdout, rows, batches = [], 0, 0
+    for epoch in range(epochs):
+        split_rng = np.random.default_rng(seed)  # Ten sam podział walidacji w każdej epoce
+        shuffle_rng = np.random.default_rng([seed, epoch])  # Inna kolejność wierszy w każdej epoce
+        for batch in stream_batches(paths, split_rng, shuffle_rng, chunk_rows, shuffle_rows, holdout_fraction,
+                                    holdout if epoch == 0 else None):
+            model.partial_fit(preprocess(updated, batch[MODEL_FEATURES]), batch[TRAINING_TARGET].to_numpy())
+            batches += 1
+            if epoch == 0:
+                rows += len(batch)
+    if not rows:
+        raise ValueError("Brak nowych wierszy z czasem końcowym")
+
+    holdout = pd.concat(holdout, ignore_index=True)
+    report = {
+        'rows': rows,  # Wiersze użyte do uczenia
+        'holdout_rows': len(holdout),  # Wiersze walidacyjne
+        'batches': batches,  # Wywołania partial_fit
+        'epochs': epochs,  # Przejścia po danych
+        'mae_base': holdout_mae(base_pipeline, holdout),  # Model przed aktualizacją
+        'mae_updated': holdout_mae(updated, holdout),  # Model po aktualizacji
+        'seconds': round(time.perf_counter() - start, 3)  # Czas aktualizacji i walidacji
+    }
+    return updated, report
@@ -0,0 +1,126 @@
+"""
+Modele kandydujące i pipeline w formacie PyCaret
+
+Lista modeli i przestrzenie hiperparametrów odpowiadają compare_models / tune_model
+z notebooka (domyślny zestaw PyCaret bez modeli wyłączanych przez turbo). Pipeline
+ma te same kroki co setup() z notebooka (imputacja -> kodowanie płci ->
+standaryzacja), więc zapisany .pkl wczytuje pycaret.load_model, a modele liniowe
+kompiluje scripts/build_model_artifacts.py.
+"""
+
+import numpy as np  # Siatki hiperparametrów
+
+from config import TRAINING_SEED  # Ziarno modeli losowych
+from training.features import NUMERIC_FEATURES, CATEGORICAL_FEATURES  # Kolumny kroków pipeline
+
+
+def _grid(start, stop, step):
+    """Siatka wartości jako lista float (parametry zapisywane w JSON)"""
+    return [round(float(v), 6) for v in np.arange(start, stop, step)]
+
+
+_ALPHAS = [0.0001, 0.001, 0.01, 0.1, 0.5, 1, 2, 5, 10, 50, 100]  # Siła regularyzacji
+_PRIORS = [1e-7, 1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1]  # Priory modeli bayesowskich
+_TREE_SPACE = {  # Wspólna przestrzeń lasów losowych
+    'n_estimators': list(range(10, 301, 10)),
+    'max_depth': list(range(1, 12)),
+    'min_samples_split': [2, 5, 7, 9, 10],
+    'min_samples_leaf': [2, 3, 4, 5, 6],
+    'max_features': [1.0, 'sqrt', 'log2']
+}
+
+# Klucz -> klasa (moduł, nazwa), parametry stałe, przestrzeń tuningu
+MODEL_CANDIDATES = {
+    'lr': {'cls': ('sklearn.linear_model', 'LinearRegression'), 'fixed': {},
+           'space': {'fit_intercept': [True, False]}},
+    'lasso': {'cls': ('sklearn.linear_model', 'Lasso'), 'fixed': {'random_state': TRAINING_SEED},
+              'space': {'alpha': _ALPHAS, 'fit_intercept': [True, False]}},
+    'ridge': {'cls': ('sklearn.linear_model', 'Ridge'), 'fixed': {'random_state': TRAINING_SEED},
+              'space': {'alpha': _ALPHAS, 'fit_intercept': [True, False]}},
+    'en': {'cls': ('sklearn.linear_model', 'ElasticNet'), 'fixed': {'random_state': TRAINING_SEED},
+           'space': {'alpha': _ALPHAS, 'l1_ratio': _grid(0.01, 1, 0.05), 'fit_intercept': [True, False]}},
+    'lar': {'cls': ('sklearn.linear_model', 'Lars'), 'fixed': {'random_state': TRAINING_SEED},
+            'space': {'eps': [1e-5, 1e-4, 1e-3, 1e-2, 0.1, 0.5], 'fit_intercept': [True, False]}},
+    'llar': {'cls': ('sklearn.linear_model', 'LassoLars'), 'fixed': {'random_state': TRAINING_SEED},
+             'space': {'alpha': _ALPHAS, 'eps': [1e-5, 1e-4, 1e-3, 1e-2], 'fit_intercept': [True, False]}},
+    'omp': {'cls': ('sklearn.linear_model', 'OrthogonalMatchingPursuit'), 'fixed': {},
+            'space': {'n_nonzero_coefs': [1, 2, 3], 'fit_intercept': [True, False]}},
+    'br': {'cls': ('sklearn.linear_model', 'BayesianRidge'), 'fixed': {},
+           'space': {'alpha_1': _PRIORS, 'alpha_2': _PRIORS, 'lambda_1': _PRIORS, 'lambda_2': _PRIORS}},
+    'par': {'cls': ('sklearn.linear_model', 'PassiveAggressiveRegressor'), 'fixed': {'random_state': TRAINING_SEED},
+            'space': {'C': _grid(0, 10, 0.001), 'epsilon': _grid(0.1, 1, 0.1), 'fit_intercept': [True, False],
+                      'loss': ['epsilon_insensitive', 'squared_epsilon_insensitive'], 'shuffle': [True, False]}},
+    'huber': {'cls': ('sklearn.linear_model', 'HuberRegressor'), 'fixed': {'max_iter': 500},
+              'space': {'epsilon': _grid(1, 2, 0.1), 'alpha': _ALPHAS[:8], 'fit_intercept': [True, False]}},
+    'knn': {'cls': ('sklearn.neighbors', 'KNeighborsRegressor'), 'fixed': {'n_jobs': 1},
+            'space': {'n_neighbors': list(range(1, 51)), 'weights': ['uniform', 'distance'],
+                      'metric': ['minkowski', 'euclidean', 'manhattan']}},
+    'dt': {'cls': ('sklearn.tree', 'DecisionTreeRegressor'), 'fixed': {'random_state': TRAINING_SEED},
+           'space': {'max_depth': list(range(1, 17)), 'min_samples_split': [2, 5, 7, 9, 10],
+                     'min_samples_leaf': [2, 3, 4, 5, 6], 'criterion': ['squared_error', 'absolute_error']}},
+    'rf': {'cls': ('sklearn.ensemble', 'RandomForestRegressor'), 'fixed': {'random_state': TRAINING_SEED, 'n_jobs': 1},
+           'space': {**_TREE_SPACE, 'bootstrap': [True, False]}},
+    'et': {'cls': ('sklearn.ensemble', 'ExtraTreesRegressor'), 'fixed': {'random_state': TRAINING_SEED, 'n_jobs': 1},
+           'space': {**_TREE_SPACE, 'bootstrap': [True, False]}},
+    'ada': {'cls': ('sklearn.ensemble', 'AdaBoostRegressor'), 'fixed': {'random_state': TRAINING_SEED},
+            'space': {'n_estimators': list(range(10, 301, 10)), 'learning_rate': [0.001, 0.01, 0.05, 0.1, 0.3, 0.5, 1],
+                      'loss': ['linear', 'square', 'exponential']}},
+    'gbr': {'cls': ('sklearn.ensemble', 'GradientBoostingRegressor'), 'fixed': {'random_state': TRAINING_SEED},
+            'space': {'n_estimators': list(range(10, 301, 10)), 'learning_rate': [0.001, 0.01, 0.05, 0.1, 0.3, 0.5],
+                      'subsample': _grid(0.2, 1.01, 0.05), 'max_depth': list(range(1, 11)),
+                      'min_samples_leaf': [2, 3, 4, 5, 6]}},
+    'lightgbm': {'cls': ('lightgbm', 'LGBMRegressor'), 'fixed': {'random_state': TRAINING_SEED, 'n_jobs': 1, 'verbose': -1},
+                 'space': {'num_leaves': [2, 4, 6, 8, 10, 20, 30, 40, 50, 60, 100, 150, 200, 256],
+                           'learning_rate': [0.001, 0.01, 0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5],
+                           'n_estimators': list(range(10, 301, 10)), 'min_child_samples': list(range(1, 101, 5)),
+                           'reg_alpha': [0, 0.001, 0.01, 0.1, 1, 5], 'reg_lambda': [0, 0.001, 0.01, 0.1, 1, 5]}},
+    'dummy': {'cls': ('sklearn.dummy', 'DummyRegressor'), 'fixed': {}, 'space': {}},
+}
+
+
+def make_estimator(key, params=None):
+    """
+    Tworzy estymator kandydata z parametrami stałymi i podanymi
+
+    Args:
+        key (str): Klucz z MODEL_CANDIDATES (np. 'par')
+        params (dict): Hiperparametry (nadpisują stałe)
+
+    Returns:
+        Estymator scikit-learn
+    """
+    import importlib  # Import modułu modelu dopiero w procesie, który go trenuje
+    candidate = MODEL_CANDIDATES[key]
+    module_name, class_name = candidate['cls']
+    cls = getattr(importlib.import_module(module_name), class_name)
+    return cls(**{**candidate['fixed'], **(params or {})})
+
+
+def build_pipeline(estimator):
+    """
+    Buduje pipeline z krokami jak setup() PyCaret w notebooku
+
+    Args:
+        estimator: Estymator scikit-learn (ostatni krok)
+
+    Returns:
+        Pipeline: Pipeline PyCaret (wczytywany przez pycaret.load_model)
+    """
+    from category_encoders import OrdinalEncoder  # Kodowanie płci jak w PyCaret
+    from pycaret.internal.pipeline import Pipeline  # Klasa pipeline zapisywana przez PyCaret
+    from pycaret.internal.preprocess.transformers import TransformerWrapper, CleanColumnNames  # Kroki PyCaret
+    from sklearn.impute import SimpleImputer  # Uzupełnianie braków
+    from sklearn.preprocessing import StandardScaler  # normalize=True
+
+    mapping = [{'col': col, 'mapping': {'K': 0, 'M': 1}} for col in CATEGORICAL_FEATURES]  # Kolejność alfabetyczna
+    return Pipeline([
+        ('numerical_imputer', TransformerWrapper(SimpleImputer(), include=NUMERIC_FEATURES)),
+        ('categorical_imputer', TransformerWrapper(SimpleImputer(strategy='most_frequent'), include=CATEGORICAL_FEATURES)),
+        ('ordinal_encoding', TransformerWrapper(
+            OrdinalEncoder(cols=CATEGORICAL_FEATURES, mapping=mapping, handle_missing='return_nan', handle_unknown='value'),
+            include=CATEGORICAL_FEATURES
+        )),
+        ('normalize', TransformerWrapper(StandardScaler())),
+        ('clean_column_names', TransformerWrapper(CleanColumnNames())),
+        ('actual_estimator', estimator)
+    ])
@@ -0,0 +1,233 @@
+"""
+Przeszukiwanie hiperparametrów metodą Hyperband (successive halving)
+
+Konfiguracja (model, parametry) jest najpierw oceniana tanio - na części wierszy
+foldu i na części foldów - a na kolejny szczebel (eta razy większy budżet)
+przechodzi tylko najlepsza 1/eta konfiguracji. Pełną walidację krzyżową
+przechodzą tylko najlepsze. Hyperband uruchamia kilka takich drabinek z różnym
+budżetem startowym (od wielu tanich ocen do kilku pełnych).
+
+Każda ocena (model, parametry, fold, wiersze) to zadanie ParallelCV. Wyniki są
+dopisywane do pliku JSONL zaraz po zakończeniu zadania, więc przerwane
+wyszukiwanie po ponownym uruchomieniu pomija gotowe zadania. Pierwsza linia pliku
+to nagłówek z kluczem danych i podziału - plik z innym kluczem jest odrzucany.
+"""
+
+import json  # Plik wyników zadań
+import math  # Liczba szczebli i konfiguracji
+import os  # Ścieżki do plików
+import time  # Czas wyszukiwania
+from concurrent.futures import as_completed  # Zapis wyników w kolejności zakończenia
+
+import numpy as np  # Losowanie konfiguracji
+from sklearn.model_selection import ParameterSampler  # Losowanie z przestrzeni kandydata
+
+from config import TRAINING_SEED, TRAINING_SEARCH_ETA, TRAINING_SEARCH_MIN_BUDGET, TRAINING_SEARCH_MIN_ROWS
+from training.models import MODEL_CANDIDATES  # Przestrzenie hiperparametrów
+from training.cv import summarize  # Średnie MAE konfiguracji
+
+
+class TrialStore:
+    """
+    Wyniki zadań w pliku JSONL - dopisywane na bieżąco, wczytywane przy wznowieniu
+
+    Użycie:
+        store = TrialStore('data/.cache/training/search_<klucz>.jsonl', search_key)
+        result = store.get(task) or store.append(task, run_task(task))
+    """
+
+    def __init__(self, path=None, search_key=None):
+        """
+        Args:
+            path (str): Plik JSONL (None = tylko w pamięci)
+            search_key (str): Klucz danych i podziału (features_version, ziarno, test, foldy) -
+                zapisywany w nagłówku nowego pliku i porównywany przy wznowieniu
+
+        Raises:
+            ValueError: Jeśli istniejący plik ma inny klucz lub nie ma nagłówka
+        """
+        self.path = path
+        self.search_key = search_key
+        self._results = {}  # Klucz zadania -> wynik
+        if path and os.path.exists(path) and os.path.getsize(path):
+            with open(path, encoding='utf-8') as f:
+                records = []
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:  # Ucięta ostatnia linia po przerwaniu procesu
+                        continue
+            header = records[0] if records and 'search_key' in records[0] else {}
+            if header.get('search_key') != search_key:  # Wyniki z innych danych lub innego podziału
+                raise ValueError(f"Plik wyników {path} pochodzi z innego wyszukiwania "
+                                 f"(klucz {header.get('search_key', 'brak')}, oczekiwany {search_key}) - "
+                                 f"usuń go lub podaj inny --trials-file")
+            self._results = {record['key']: record for record in records[1:]}
+        elif path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:  # Nagłówek przed pierwszym wynikiem
+                f.write(json.dumps({'search_key': search_key}) + '\n')
+        self.loaded = len(self._results)  # Wyniki z poprzednich uruchomień
+
+    @staticmethod
+    def key(task):
+        """Klucz zadania: model, parametry, fold i żądana liczba wierszy"""
+        return json.dumps([task['model'], sorted(task['params'].items()), task['fold'], task.get('n_rows')])
+
+    def get(self, task):
+        """Zapisany wynik zadania (lub None)"""
+        return self._results.get(self.key(task))
+
+    def append(self, task, result):
+        """Zapisuje wynik zadania (w pamięci i na końcu pliku)"""
+        record = {'key': self.key(task), **result}
+        self._results[record['key']] = record
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        return record
+
+
+def sample_configs(models, n, rng):
+    """
+    Losuje konfiguracje: model z listy, parametry z jego przestrzeni
+
+    Args:
+        models (list): Klucze z MODEL_CANDIDATES
+        n (int): Liczba konfiguracji
+        rng (np.random.Generator): Generator losowy
+
+    Returns:
+        list: Słowniki {model, params}
+    """
+    configs = []
+    for _ in range(n):
+        model = models[int(rng.integers(len(models)))]
+        space = MODEL_CANDIDATES[model]['space']
+        params = {}
+        if space:
+            params = next(iter(ParameterSampler(space, n_iter=1, random_state=int(rng.integers(2 ** 31 - 1)))))
+            params = {k: (v.item() if hasattr(v, 'item') else v) for k, v in params.items()}  # Typy JSON
+        configs.append({'model': model, 'params': params})
+    return configs
+
+
+def hyperband_brackets(eta=TRAINING_SEARCH_ETA, min_budget=TRAINING_SEARCH_MIN_BUDGET):
+    """
+    Drabinki Hyperband: od najwięcej konfiguracji z najmniejszym budżetem do kilku pełnych
+
+    Args:
+        eta (int): Współczynnik odsiewu i wzrostu budżetu
+        min_budget (float): Najmniejszy budżet (ułamek pełnej oceny)
+
+    Returns:
+        list: Słowniki {bracket, n_configs, budgets} (budżety szczebli rosnąco, ostatni = 1)
+    """
+    s_max = int(math.floor(math.log(1 / min_budget, eta) + 1e-9))
+    brackets = []
+    for s in range(s_max, -1, -1):
+        brackets.append({
+            'bracket': s,  # Numer drabinki (liczba odsiewów)
+            'n_configs': int(math.ceil((s_max + 1) / (s + 1) * eta ** s)),  # Konfiguracje na pierwszym szczeblu
+            'budgets': [float(eta) ** (i - s) for i in range(s + 1)]  # Budżety kolejnych szczebli
+        })
+    return brackets
+
+
+def budget_tasks(configs, budget, n_folds, fold_rows, min_rows=TRAINING_SEARCH_MIN_ROWS):
+    """
+    Zadania ParallelCV oceniające konfiguracje z danym budżetem
+
+    Budżet dzieli się na foldy (ceil(budżet × n_folds), co najmniej 1) i wiersze
+    części treningowej foldu (budżet × fold_rows) - 1 oznacza pełną walidację krzyżową.
+
+    Returns:
+        tuple: (lista zadań, liczba foldów, żądana liczba wierszy lub None = wszystkie)
+    """
+    folds = max(1, math.ceil(budget * n_folds - 1e-9))
+    n_rows = None if budget >= 1 else min(fold_rows, max(min_rows, int(budget * fold_rows)))
+    tasks = [{'model': c['model'], 'params': c['params'], 'fold': fold, 'n_rows': n_rows}
+             for c in configs for fold in range(folds)]
+    return tasks, folds, n_rows
+
+
+def hyperband(cv, models, train_rows, store, eta=TRAINING_SEARCH_ETA, min_budget=TRAINING_SEARCH_MIN_BUDGET,
+              seed=TRAINING_SEED, log=None):
+    """
+    Wyszukiwanie Hyperband w puli ParallelCV
+
+    Args:
+        cv (ParallelCV): Pula procesów z danymi treningowymi
+        models (list): Klucze modeli z MODEL_CANDIDATES
+        train_rows (int): Wiersze zbioru treningowego (przed podziałem na foldy)
+        store (TrialStore): Wyniki zadań (wznawianie)
+        eta (int): Współczynnik odsiewu
+        min_budget (float): Najmniejszy budżet
+        seed (int): Ziarno losowania konfiguracji
+        log (callable): Funkcja wypisująca postęp (np. print)
+
+    Returns:
+        dict: final (konfiguracje po pełnej walidacji, od najlepszej - format summarize),
+            curve (punkty MAE vs koszt po każdym szczeblu), configs, tasks,
+            cached (zadania z pliku wyników), fit_seconds, full_equivalents, wall_seconds
+    """
+    rng = np.random.default_rng(seed)
+    fold_rows = train_rows - math.ceil(train_rows / cv.n_folds)  # Część treningowa foldu
+    start = time.perf_counter()
+    final, curve = [], []
+    counted = set()  # Zadania wliczone do kosztu (ta sama ocena w kilku drabinkach liczy się raz)
+    submitted = 0  # Zadania wykonane w tym uruchomieniu (reszta z pliku wyników)
+    totals = {'configs': 0, 'tasks': 0, 'fit_seconds': 0.0, 'full_equivalents': 0.0}
+
+    for bracket in hyperband_brackets(eta, min_budget):
+        configs = sample_configs(models, bracket['n_configs'], rng)  # Te same przy wznowieniu (to samo ziarno)
+        totals['configs'] += len(configs)
+        for rung, budget in enumerate(bracket['budgets']):
+            tasks, folds, n_rows = budget_tasks(configs, budget, cv.n_folds, fold_rows)
+            pending = {TrialStore.key(task): task for task in tasks if store.get(task) is None}  # Bez duplikatów
+            futures = {cv.submit(task): task for task in pending.values()}
+            submitted += len(futures)
+            for future in as_completed(futures):
+                store.append(futures[future], future.result())  # Zapis od razu - przerwanie nie traci wyniku
+
+            results = [store.get(task) for task in tasks]
+            for task, result in zip(tasks, results):
+                if TrialStore.key(task) not in counted:
+                    counted.add(TrialStore.key(task))
+                    totals['tasks'] += 1
+                    totals['fit_seconds'] += result['fit_seconds']
+                    totals['full_equivalents'] += (n_rows or fold_rows) / fold_rows / cv.n_folds
+            ranking = summarize(results)  # Średnie MAE z foldów szczebla, od najlepszej
+            if budget >= 1:
+                final.extend(ranking)
+
+            best_final = min((r['mae'] for r in final), default=None)
+            curve.append({
+                'bracket': bracket['bracket'],  # Drabinka
+                'rung': rung,  # Szczebel
+                'budget': round(budget, 4),  # Ułamek pełnej oceny
+                'configs': len(ranking),  # Ocenione konfiguracje
+                'folds': folds,  # Foldy na konfigurację
+                'rows': n_rows or fold_rows,  # Wiersze dopasowania
+                'best_mae': ranking[0]['mae'],  # Najlepsze MAE szczebla (przy tym budżecie)
+                'incumbent_mae': best_final,  # Najlepsze MAE po pełnej walidacji do tej pory
+                'fit_seconds': round(totals['fit_seconds'], 3),  # Skumulowany koszt dopasowań
+                'full_equivalents': round(totals['full_equivalents'], 3),  # Koszt w pełnych ocenach CV
+                'wall_seconds': round(time.perf_counter() - start, 3)  # Czas od startu
+            })
+            if log:
+                point = curve[-1]
+                incumbent = f"{best_final:.1f} s" if best_final is not None else "-"
+                log(f"  drabinka {point['bracket']} szczebel {rung}: {point['configs']:3} konf. × "
+                    f"{folds} foldów × {point['rows']:,} wierszy · najlepsze MAE {point['best_mae']:.1f} s "
+                    f"· pełne CV {incumbent} · {point['wall_seconds']:.1f} s")
+            keep = max(1, int(len(ranking) / eta))  # Na kolejny szczebel przechodzi 1/eta
+            configs = [{'model': r['model'], 'params': r['params']} for r in ranking[:keep]]
+
+    return {
+        'final': sorted(final, key=lambda r: r['mae']),
+        'curve': curve,
+        **totals,
+        'cached': totals['tasks'] - submitted,
+        'wall_seconds': round(time.perf_counter() - start, 3)
+    }
@@ -0,0 +1,251 @@
+"""
+Admission - Kontrola dopuszczania wywołań LLM przy szczytowym ruchu
+
+Każde wywołanie API przechodzi trzy bramki:
+1. Token bucket sesji - jedna sesja nie wygeneruje więcej niż LLM_SESSION_BURST
+   komentarzy naraz i LLM_SESSION_RATE na sekundę w dłuższym okresie (bez czekania).
+2. Globalny token bucket - limit wywołań na sekundę dla całego procesu.
+3. Limit równoległych wywołań (LLM_MAX_CONCURRENT) z kolejką oczekujących.
+
+Bramki 2 i 3 czekają najwyżej LLM_QUEUE_BUDGET_SECONDS łącznie. Jeśli szacowane
+oczekiwanie przekracza budżet, wywołanie jest od razu odrzucane (AdmissionRejected),
+a aplikacja używa komentarza lokalnego. Tokeny pobrane we wcześniejszych bramkach
+wracają wtedy do kubełków (odrzucone wywołanie nie zużywa limitu). Czas oczekiwania
+trafia do histogramu.
+"""
+
+import bisect  # Przedział histogramu
+import threading  # Sesje Streamlit i wątki robocze działają równolegle
+import time  # Pomiar czasu
+from collections import OrderedDict  # Kubełki sesji (LRU)
+from contextlib import contextmanager  # Slot jako menedżer kontekstu
+
+from config import (  # Limity dopuszczania
+    LLM_MAX_CONCURRENT, LLM_GLOBAL_RATE, LLM_GLOBAL_BURST, LLM_SESSION_RATE, LLM_SESSION_BURST,
+    LLM_QUEUE_BUDGET_SECONDS, LLM_MAX_TRACKED_SESSIONS, LLM_WAIT_BUCKETS
+)
+
+
+class AdmissionRejected(Exception):
+    """Wywołanie odrzucone przez kontrolę dopuszczania (reason: powód)"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason  # session_rate / global_rate / queue_budget / queue_timeout
+
+
+class TokenBucket:
+    """
+    Token bucket: rate tokenów na sekundę, najwyżej capacity naraz
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # Tokeny na sekundę
+        self.capacity = capacity  # Maksymalna liczba tokenów (burst)
+        self.tokens = float(capacity)  # Startujemy z pełnym kubełkiem
+        self.updated_at = time.monotonic()  # Ostatnie uzupełnienie
+
+    def _refill(self, now):
+        """Dolicza tokeny za czas od ostatniego uzupełnienia"""
+        elapsed = max(0.0, now - self.updated_at)  # now odczytane przed utworzeniem kubełka daje wartość ujemną
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = max(self.updated_at, now)
+
+    def try_acquire(self, now=None):
+        """
+        Pobiera token, jeśli jest dostępny
+
+        Args:
+            now (float): Bieżący czas time.monotonic() (None = odczytaj)
+
+        Returns:
+            float: 0.0 jeśli pobrano token, inaczej czas do następnego tokenu (sekundy)
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def refund(self):
+        """Zwraca token pobrany przez wywołanie, które ostatecznie nie trafiło do API"""
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+
+class AdmissionController:
+    """
+    Limit równoległych wywołań LLM z kolejką, token bucketami i budżetem oczekiwania
+
+    Kubełki nie mają własnych blokad - cały stan chroni jedna blokada (self._cond),
+    bo operacje na nim trwają mikrosekundy.
+    """
+
+    def __init__(self, max_concurrent=LLM_MAX_CONCURRENT, global_rate=LLM_GLOBAL_RATE, global_burst=LLM_GLOBAL_BURST,
+                 session_rate=LLM_SESSION_RATE, session_burst=LLM_SESSION_BURST,
+                 queue_budget_seconds=LLM_QUEUE_BUDGET_SECONDS, max_sessions=LLM_MAX_TRACKED_SESSIONS,
+                 wait_buckets=LLM_WAIT_BUCKETS):
+        self.max_concurrent = max_concurrent
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.queue_budget_seconds = queue_budget_seconds
+        self.max_sessions = max_sessions
+        self._global_bucket = TokenBucket(global_rate, global_burst)  # Limit procesu
+        self._session_buckets = OrderedDict()  # ID sesji -> TokenBucket (najdawniej używane pierwsze)
+        self._cond = threading.Condition()  # Blokada stanu + budzenie oczekujących
+        self.in_flight = 0  # Trwające wywołania
+        self.waiting = 0  # Wywołania w kolejce
+        self._service_seconds = None  # Średni czas wywołania (EWMA) - do szacowania oczekiwania
+        self.admitted = 0  # Dopuszczone wywołania
+        self.rejected = {'session_rate': 0, 'global_rate': 0, 'queue_budget': 0, 'queue_timeout': 0}  # Odrzucone wg powodu
+        self.wait_buckets = tuple(wait_buckets)  # Górne granice przedziałów histogramu (sekundy)
+        self._wait_counts = [0] * (len(self.wait_buckets) + 1)  # Ostatni przedział = powyżej ostatniej granicy
+        self._wait_sum = 0.0  # Suma czasów oczekiwania
+
+    def _session_bucket(self, session_id):
+        """Kubełek sesji (tworzony przy pierwszym wywołaniu; wywoływane pod blokadą)"""
+        bucket = self._session_buckets.get(session_id)
+        if bucket is None:
+            bucket = TokenBucket(self.session_rate, self.session_burst)
+            self._session_buckets[session_id] = bucket
+            while len(self._session_buckets) > self.max_sessions:  # Nieaktywne sesje - najstarsze usuwane
+                self._session_buckets.popitem(last=False)
+        self._session_buckets.move_to_end(session_id)
+        return bucket
+
+    def _reject(self, reason, message):
+        """Liczy odrzucenie i zwraca wyjątek (wywoływane pod blokadą)"""
+        self.rejected[reason] += 1
+        return AdmissionRejected(reason, message)
+
+    def _estimated_queue_wait(self):
+        """Szacowany czas oczekiwania na slot (wywoływane pod blokadą)"""
+        if self.in_flight < self.max_concurrent or self._service_seconds is None:
+            return 0.0
+        rounds = self.waiting // self.max_concurrent + 1  # Ile "tur" slotów przed nami
+        return rounds * self._service_seconds
+
+    def acquire(self, session_id=None, budget_seconds=None):
+        """
+        Czeka na slot wywołania LLM (najwyżej budget_seconds)
+
+        Args:
+            session_id (str): ID sesji (None = bez limitu sesji)
+            budget_seconds (float): Budżet oczekiwania (None = LLM_QUEUE_BUDGET_SECONDS)
+
+        Returns:
+            float: Czas oczekiwania na slot (sekundy)
+
+        Raises:
+            AdmissionRejected: Limit sesji, limit globalny lub przekroczony budżet kolejki
+                (pobrane tokeny są zwracane)
+        """
+        budget = self.queue_budget_seconds if budget_seconds is None else budget_seconds
+        start = time.monotonic()
+        deadline = start + budget
+
+        with self._cond:
+            # 1. Limit sesji - bez czekania (użytkownik klika zbyt często)
+            session_bucket = None
+            if session_id is not None:
+                session_bucket = self._session_bucket(session_id)
+                wait = session_bucket.try_acquire(start)
+                if wait > 0:
+                    raise self._reject('session_rate', f"Limit komentarzy dla sesji - kolejny za {wait:.0f} s")
+
+            global_taken = False  # Czy pobrano token globalny
+            try:
+                # 2. Limit globalny - czekamy na token, jeśli zdąży w budżecie
+                while True:
+                    now = time.monotonic()
+                    wait = self._global_bucket.try_acquire(now)
+                    if wait == 0.0:
+                        global_taken = True
+                        break
+                    if now + wait > deadline:
+                        raise self._reject('global_rate', "Globalny limit wywołań LLM")
+                    self._cond.wait(wait)
+
+                # 3. Slot równoległego wywołania - od razu odrzuć, jeśli kolejka nie zmieści się w budżecie
+                if time.monotonic() + self._estimated_queue_wait() > deadline:
+                    raise self._reject('queue_budget', "Kolejka wywołań LLM przekracza budżet opóźnienia")
+                self.waiting += 1
+                try:
+                    while self.in_flight >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._reject('queue_timeout', "Przekroczono czas oczekiwania w kolejce LLM")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            except AdmissionRejected:  # Odrzucone wywołanie nie zużywa limitów sesji ani globalnego
+                if session_bucket is not None:
+                    session_bucket.refund()
+                if global_taken:
+                    self._global_bucket.refund()
+                    self._cond.notify_all()  # Token może odblokować czekającego na limit globalny
+                raise
+
+            self.in_flight += 1
+            self.admitted += 1
+            waited = time.monotonic() - start
+            self._wait_counts[bisect.bisect_left(self.wait_buckets, waited)] += 1
+            self._wait_sum += waited
+            return waited
+
+    def release(self, service_seconds=None):
+        """
+        Zwalnia slot po zakończonym wywołaniu
+
+        Args:
+            service_seconds (float): Czas trwania wywołania (do szacowania kolejki)
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if service_seconds is not None:  # Średnia ruchoma czasu wywołania
+                if self._service_seconds is None:
+                    self._service_seconds = service_seconds
+                else:
+                    self._service_seconds = 0.8 * self._service_seconds + 0.2 * service_seconds
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, session_id=None, budget_seconds=None):
+        """
+        Slot wywołania LLM jako menedżer kontekstu (acquire + release z czasem wywołania)
+
+        Args:
+            session_id (str): ID sesji
+            budget_seconds (float): Budżet oczekiwania
+
+        Yields:
+            float: Czas oczekiwania na slot (sekundy)
+
+        Raises:
+            AdmissionRejected: Jak acquire
+        """
+        waited = self.acquire(session_id, budget_seconds)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self):
+        """
+        Zwraca stan kolejki i histogram oczekiwania (do monitoringu)
+
+        Returns:
+            dict: in_flight, waiting, admitted, rejected (wg powodu), wait_histogram
+                  (górna granica -> liczba, '+Inf' dla reszty), mean_wait_seconds
+        """
+        with self._cond:
+            labels = [f"{bound:g}" for bound in self.wait_buckets] + ['+Inf']
+            return {
+                'in_flight': self.in_flight,  # Trwające wywołania
+                'waiting': self.waiting,  # Wywołania w kolejce
+                'admitted': self.admitted,  # Dopuszczone
+                'rejected': dict(self.rejected),  # Odrzucone wg powodu
+                'wait_histogram': dict(zip(labels, self._wait_counts)),  # Liczba wywołań w przedziale
+                'mean_wait_seconds': round(self._wait_sum / self.admitted, 3) if self.admitted else 0.0
+            }
@@ -0,0 +1,211 @@
+"""
+Circuit Breaker - Ochrona aplikacji przed wolnym lub niedostępnym API
+
+Obwód zamknięty: wywołania przechodzą, a ich wynik i opóźnienie trafiają do okna
+ostatnich CIRCUIT_WINDOW_SIZE wywołań. Gdy odsetek błędów lub p95 opóźnienia
+przekroczy próg, obwód się otwiera i przez CIRCUIT_OPEN_SECONDS wywołania są
+od razu odrzucane (aplikacja używa odpowiedzi lokalnej). Potem jedno wywołanie
+próbne (półotwarty): sukces zamyka obwód, błąd otwiera go ponownie.
+
+allow_request() zwraca przepustkę, którą wynik wywołania wraca do record() - o stanie
+półotwartym decyduje tylko wywołanie próbne, a wyniki wywołań rozpoczętych przed
+otwarciem obwodu są pomijane.
+"""
+
+import random  # Losowe rozrzucenie opóźnień ponowień (jitter)
+import threading  # Obwód współdzielony przez sesje (wątki)
+import time  # Pomiar czasu
+from collections import deque  # Okno ostatnich wywołań
+
+import numpy as np  # Percentyl opóźnień
+
+from config import (  # Progi obwodu i ponowień
+    CIRCUIT_WINDOW_SIZE, CIRCUIT_MIN_CALLS, CIRCUIT_ERROR_RATE_THRESHOLD,
+    CIRCUIT_P95_LATENCY_THRESHOLD, CIRCUIT_OPEN_SECONDS,
+    OPENAI_MAX_RETRIES, OPENAI_RETRY_BASE_DELAY, OPENAI_RETRY_MAX_DELAY
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"  # Stany obwodu
+
+
+class CircuitOpenError(Exception):
+    """Wywołanie odrzucone bez kontaktu z API - obwód otwarty"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker liczony na oknie ostatnich wywołań (błędy + p95 opóźnienia)
+    """
+
+    def __init__(self, window_size=CIRCUIT_WINDOW_SIZE, min_calls=CIRCUIT_MIN_CALLS,
+                 error_rate_threshold=CIRCUIT_ERROR_RATE_THRESHOLD,
+                 p95_latency_threshold=CIRCUIT_P95_LATENCY_THRESHOLD, open_seconds=CIRCUIT_OPEN_SECONDS):
+        self.window = deque(maxlen=window_size)  # (opóźnienie, sukces) ostatnich wywołań
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.p95_latency_threshold = p95_latency_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED  # Stan obwodu
+        self.opened_at = None  # Kiedy obwód się otworzył
+        self._probe_in_flight = False  # Czy trwa wywołanie próbne (półotwarty)
+        self._generation = 0  # Numer otwarcia - przepustki sprzed otwarcia są nieaktualne
+        self._lock = threading.Lock()
+        self.rejected = 0  # Wywołania odrzucone przez otwarty obwód
+        self.times_opened = 0  # Ile razy obwód się otworzył
+
+    def allow_request(self):
+        """
+        Sprawdza, czy wywołanie może trafić do API
+
+        Returns:
+            dict: Przepustka dla record() (probe, generation) lub None, gdy obwód odrzuca wywołanie
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN  # Czas minął - dopuść jedno wywołanie próbne
+            if self.state == CLOSED:
+                return {'probe': False, 'generation': self._generation}
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return {'probe': True, 'generation': self._generation}
+            self.rejected += 1
+            return None
+
+    def record(self, permit, latency_seconds, success):
+        """
+        Zapisuje wynik wywołania i ewentualnie zmienia stan obwodu
+
+        Args:
+            permit (dict): Przepustka z allow_request() (każde wywołanie zapisywane raz)
+            latency_seconds (float): Opóźnienie wywołania
+            success (bool): Czy wywołanie się powiodło
+        """
+        with self._lock:
+            if permit['probe']:  # Wynik wywołania próbnego decyduje o stanie
+                self._probe_in_flight = False
+                if self.state != HALF_OPEN:
+                    return
+                if success:
+                    self.state = CLOSED
+                    self.window.clear()  # Nowe okno po powrocie API
+                else:
+                    self._open()
+                return
+            if self.state != CLOSED or permit['generation'] != self._generation:
+                return  # Wywołanie sprzed otwarcia obwodu - jego wynik już nic nie rozstrzyga
+
+            self.window.append((latency_seconds, success))
+            if self.state == CLOSED and len(self.window) >= self.min_calls:
+                error_rate, p95 = self._window_stats()
+                if error_rate > self.error_rate_threshold or p95 > self.p95_latency_threshold:
+                    self._open()
+
+    def _open(self):
+        """Otwiera obwód (wywoływane pod blokadą)"""
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._generation += 1
+
+    def _window_stats(self):
+        """Odsetek błędów i p95 opóźnienia w oknie (wywoływane pod blokadą)"""
+        latencies = np.array([latency for latency, _ in self.window], dtype=np.float64)
+        errors = sum(1 for _, success in self.window if not success)
+        return errors / len(self.window), float(np.percentile(latencies, 95))
+
+    def stats(self):
+        """
+        Zwraca stan obwodu (do monitoringu)
+
+        Returns:
+            dict: state, calls, error_rate (%), p95_seconds, rejected, times_opened
+        """
+        with self._lock:
+            error_rate, p95 = self._window_stats() if self.window else (0.0, 0.0)
+            return {
+                'state': self.state,  # closed / open / half_open
+                'calls': len(self.window),  # Wywołania w oknie
+                'error_rate': round(error_rate * 100, 1),  # Odsetek błędów (%)
+                'p95_seconds': round(p95, 2),  # p95 opóźnienia
+                'rejected': self.rejected,  # Odrzucone przez otwarty obwód
+                'times_opened': self.times_opened  # Liczba otwarć
+            }
+
+
+def is_retryable_error(error):
+    """
+    Czy błąd jest przejściowy (warto ponowić): timeout, połączenie, 429, 5xx
+
+    Args:
+        error (Exception): Błąd z klienta OpenAI/httpx
+
+    Returns:
+        bool: True dla błędów przejściowych
+    """
+    status = getattr(error, 'status_code', None)  # APIStatusError z klienta OpenAI
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError', 'ConnectError', 'ReadTimeout', 'TimeoutException')
+
+
+def backoff_delay(attempt, base_delay=OPENAI_RETRY_BASE_DELAY, max_delay=OPENAI_RETRY_MAX_DELAY):
+    """
+    Opóźnienie przed ponowieniem - wykładnicze z pełnym rozrzutem (full jitter)
+
+    Args:
+        attempt (int): Numer ponowienia (0 = pierwsze)
+        base_delay (float): Bazowe opóźnienie (sekundy)
+        max_delay (float): Maksymalne opóźnienie (sekundy)
+
+    Returns:
+        float: Opóźnienie w sekundach (losowe z [0, min(max, base * 2^attempt)])
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retries(breaker, func, max_retries=OPENAI_MAX_RETRIES, defer_success=False):
+    """
+    Wywołuje func przez circuit breaker, ponawiając błędy przejściowe
+
+    Args:
+        breaker (CircuitBreaker): Obwód chroniący API
+        func (callable): Wywołanie API bez argumentów
+        max_retries (int): Maksymalna liczba ponowień
+        defer_success (bool): Wynik udanego wywołania zapisuje wywołujący (np. strumień,
+            który może się zerwać po nawiązaniu)
+
+    Returns:
+        object: Wynik func lub - z defer_success - (wynik, complete), gdzie complete(success)
+            zapisuje wynik w obwodzie (tylko pierwsze wywołanie complete ma znaczenie)
+
+    Raises:
+        CircuitOpenError: Jeśli obwód jest otwarty
+        Exception: Ostatni błąd func po wyczerpaniu ponowień
+    """
+    for attempt in range(max_retries + 1):
+        permit = breaker.allow_request()
+        if permit is None:  # API uznane za niedostępne - bez czekania
+            raise CircuitOpenError("Obwód otwarty - API chwilowo pomijane")
+
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            breaker.record(permit, time.perf_counter() - start, success=False)
+            if attempt == max_retries or not is_retryable_error(e):
+                raise
+            time.sleep(backoff_delay(attempt))  # Rozrzucone ponowienia nie uderzają w API naraz
+            continue
+        latency = time.perf_counter() - start  # Opóźnienie odpowiedzi (nawiązania strumienia)
+        if not defer_success:
+            breaker.record(permit, latency, success=True)
+            return result
+
+        recorded = False
+
+        def complete(success):
+            nonlocal recorded
+            if not recorded:  # Jeden wynik na wywołanie
+                recorded = True
+                breaker.record(permit, latency, success)
+        return result, complete
@@ -0,0 +1,158 @@
+"""
+Commentary Bank - Bank komentarzy AI wygenerowanych z wyprzedzeniem
+
+Prompt komentarza zależy tylko od klucza (kategoria, płeć, przedział czasu,
+przedział "szybszy niż X%"), a wszystkie klucze wynikają z danych historycznych.
+scripts/pregenerate_commentary.py generuje komentarze dla wszystkich kluczy
+i zapisuje je w pliku SQLite (tabela WITHOUT ROWID - wiersze ułożone według
+klucza głównego), a aplikacja odczytuje je jednym wyszukiwaniem w indeksie.
+"""
+
+import os  # Sprawdzenie pliku banku
+import sqlite3  # Plik banku z indeksem
+import threading  # Połączenie współdzielone przez sesje (wątki)
+import time  # Czas zapisu wpisu
+
+BANK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commentary (
+    key TEXT PRIMARY KEY,           -- Klucz cache (kategoria|płeć|przedział czasu|przedział procentowy)
+    age_category TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    time_bucket INTEGER NOT NULL,
+    percent_bucket INTEGER NOT NULL,
+    template TEXT NOT NULL,         -- Komentarz ze znacznikami imienia i czasu
+    model TEXT NOT NULL,            -- Model, który wygenerował komentarz
+    created_at REAL NOT NULL        -- Czas zapisu (unix)
+) WITHOUT ROWID;
+"""
+
+
+def bank_key(key):
+    """
+    Klucz banku z klucza cache komentarzy (ten sam format co w CommentaryCache)
+
+    Args:
+        key (tuple): Klucz z commentary_cache_key
+
+    Returns:
+        str: Klucz tekstowy
+    """
+    return "|".join(str(part) for part in key)
+
+
+def open_bank_for_writing(path):
+    """
+    Otwiera (lub tworzy) bank do zapisu
+
+    Args:
+        path (str): Ścieżka pliku SQLite
+
+    Returns:
+        sqlite3.Connection: Połączenie z utworzonym schematem
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")  # Aplikacja może czytać w trakcie generowania
+    connection.executescript(BANK_SCHEMA)
+    return connection
+
+
+def existing_keys(connection):
+    """
+    Zwraca klucze już zapisane w banku (wznawianie przerwanego generowania)
+
+    Args:
+        connection (sqlite3.Connection): Połączenie z bankiem
+
+    Returns:
+        set: Klucze tekstowe
+    """
+    return {row[0] for row in connection.execute("SELECT key FROM commentary")}
+
+
+def store_commentaries(connection, rows, model, replace=False):
+    """
+    Zapisuje komentarze w banku (jedna transakcja)
+
+    Args:
+        connection (sqlite3.Connection): Połączenie z bankiem
+        rows (list): Pary (klucz cache, komentarz)
+        model (str): Model, który wygenerował komentarze
+        replace (bool): Nadpisz istniejące wpisy (domyślnie zostają - zapis idempotentny)
+
+    Returns:
+        int: Liczba zapisanych wierszy
+    """
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    now = time.time()
+    with connection:  # Transakcja - przerwanie nie zostawia połowy paczki
+        cursor = connection.executemany(
+            f"{verb} INTO commentary VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(bank_key(key), key[0], key[1], int(key[2]), int(key[3]), template, model, now)
+             for key, template in rows]
+        )
+    return cursor.rowcount
+
+
+class CommentaryBank:
+    """
+    Odczyt komentarzy z banku (tylko do odczytu, jedno połączenie na proces)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # mode=ro - aplikacja nigdy nie modyfikuje banku; check_same_thread=False - odczyt z wątków sesji
+        self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()  # Jedno połączenie - odczyty po kolei (trwają mikrosekundy)
+        self.hits = 0  # Trafienia
+        self.misses = 0  # Chybienia
+        with self._lock:
+            self.size = self._connection.execute("SELECT COUNT(*) FROM commentary").fetchone()[0]
+
+    def get(self, key):
+        """
+        Zwraca komentarz z banku
+
+        Args:
+            key (tuple): Klucz z commentary_cache_key
+
+        Returns:
+            str: Szablon komentarza lub None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT template FROM commentary WHERE key = ?", (bank_key(key),)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def stats(self):
+        """
+        Zwraca liczniki banku (do monitoringu)
+
+        Returns:
+            dict: size, hits, misses
+        """
+        with self._lock:
+            return {'size': self.size, 'hits': self.hits, 'misses': self.misses}
+
+
+def load_commentary_bank(path):
+    """
+    Otwiera bank komentarzy, jeśli plik istnieje
+
+    Args:
+        path (str): Ścieżka pliku SQLite
+
+    Returns:
+        CommentaryBank: Bank lub None (brak pliku lub uszkodzony plik)
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return CommentaryBank(path)
+    except sqlite3.Error:  # Bank jest opcjonalny - komentarze nadal z cache/API
+        return None
@@ -0,0 +1,240 @@
+"""
+Compiled Model - Skompilowany model liniowy (czysty NumPy, bez PyCaret)
+
+Eksport zamienia wytrenowany pipeline PyCaret (imputacja -> kodowanie płci ->
+standaryzacja -> model liniowy) na listę operacji zapisaną w JSON. CompiledModel
+odtwarza predykcje z tego pliku bez importowania PyCaret ani scikit-learn.
+"""
+
+import json  # Zapis/odczyt artefaktu
+import numpy as np  # Obliczenia predykcji
+
+COMPILED_FORMAT_VERSION = 1  # Wersja formatu artefaktu
+
+
+def _step_transformer(step):
+    """
+    Zwraca właściwy transformer i listę kolumn dla kroku pipeline
+
+    PyCaret opakowuje transformery w TransformerWrapper (atrybuty transformer/include).
+
+    Args:
+        step: Krok pipeline (TransformerWrapper lub transformer scikit-learn)
+
+    Returns:
+        tuple: (transformer, kolumny lub None jeśli krok dotyczy wszystkich kolumn)
+    """
+    transformer = getattr(step, 'transformer', step)  # Rozpakuj TransformerWrapper
+    include = getattr(step, 'include', None)  # Kolumny kroku (None = wszystkie)
+    if include is None and hasattr(transformer, 'feature_names_in_'):
+        include = list(transformer.feature_names_in_)
+    return transformer, (list(include) if include is not None else None)
+
+
+def export_compiled_model(pipeline):
+    """
+    Kompiluje wytrenowany pipeline do przenośnego słownika (parametry + współczynniki)
+
+    Args:
+        pipeline: Pipeline PyCaret/scikit-learn z liniowym estymatorem na końcu
+
+    Returns:
+        dict: Artefakt gotowy do zapisu w JSON
+
+    Raises:
+        ValueError: Jeśli pipeline zawiera nieobsługiwany krok lub model nieliniowy
+    """
+    operations = []  # Lista operacji w kolejności pipeline
+
+    for name, step in pipeline.steps[:-1]:  # Wszystkie kroki poza estymatorem
+        transformer, columns = _step_transformer(step)
+        kind = type(transformer).__name__  # Nazwa klasy transformera
+
+        if kind == 'SimpleImputer':  # Uzupełnianie braków
+            fill = [v.item() if hasattr(v, 'item') else v for v in transformer.statistics_]
+            operations.append({'op': 'impute', 'values': dict(zip(columns, fill))})
+        elif kind == 'OrdinalEncoder' and hasattr(transformer, 'mapping'):  # category_encoders
+            mappings, missing = {}, {}
+            for entry in transformer.mapping:  # Jedna mapa na kolumnę
+                codes = entry['mapping']  # pd.Series: kategoria -> kod
+                mappings[entry['col']] = {
+                    str(cat): int(code) for cat, code in codes.items() if isinstance(cat, str)
+                }
+                for cat, code in codes.items():  # Kod braku (NaN/None) - np. płeć nieznana
+                    if not isinstance(cat, str) and cat != cat:
+                        missing[entry['col']] = int(code)
+            unknown = -1 if transformer.handle_unknown == 'value' else None  # Kod nieznanej kategorii
+            operations.append({'op': 'ordinal', 'mappings': mappings, 'unknown': unknown, 'missing': missing})
+        elif kind == 'StandardScaler':  # Standaryzacja
+            n = len(columns)
+            mean = transformer.mean_ if transformer.with_mean else np.zeros(n)
+            scale = transformer.scale_ if transformer.with_std else np.ones(n)
+            operations.append({
+                'op': 'scale', 'columns': columns,
+                'mean': [float(v) for v in mean], 'scale': [float(v) for v in scale]
+            })
+        elif kind == 'CleanColumnNames':  # Zmienia tylko nazwy kolumn - pomijamy
+            continue
+        else:
+            raise ValueError(f"Nieobsługiwany krok pipeline '{name}' ({kind})")
+
+    estimator = pipeline.steps[-1][1]  # Model na końcu pipeline
+    is_linear = (
+        type(estimator).__module__.startswith('sklearn.linear_model') and
+        hasattr(estimator, 'coef_') and np.ndim(estimator.coef_) == 1
+    )
+    if not is_linear:  # Kompilujemy tylko modele liniowe
+        raise ValueError(f"Model {type(estimator).__name__} nie jest liniowy - kompilacja niemożliwa")
+
+    operations.append({
+        'op': 'linear',
+        'columns': list(estimator.feature_names_in_),  # Kolejność cech w modelu
+        'coef': [float(v) for v in estimator.coef_],  # Współczynniki
+        'intercept': float(np.ravel(estimator.intercept_)[0])  # Wyraz wolny
+    })
+
+    return {
+        'format_version': COMPILED_FORMAT_VERSION,  # Wersja formatu
+        'estimator': type(estimator).__name__,  # Np. PassiveAggressiveRegressor
+        'estimator_params': {k: v for k, v in estimator.get_params().items()
+                             if isinstance(v, (int, float, str, bool, type(None)))},
+        'operations': operations  # Kroki predykcji
+    }
+
+
+class CompiledModel:
+    """
+    Model liniowy odtworzony z artefaktu JSON - predykcja w czystym NumPy
+
+    Udostępnia metodę predict(df) jak pipeline scikit-learn, więc może zastąpić
+    go w predict_time / predict_batch.
+    """
+
+    def __init__(self, artifact):
+        if artifact.get('format_version') != COMPILED_FORMAT_VERSION:  # Zgodność formatu
+            raise ValueError(f"Nieobsługiwana wersja artefaktu: {artifact.get('format_version')}")
+        self.artifact = artifact  # Surowy artefakt
+        self.estimator_name = artifact['estimator']  # Nazwa oryginalnego modelu
+        self.operations = artifact['operations']  # Kroki predykcji
+
+        # Przygotuj tablice NumPy raz (a nie przy każdej predykcji)
+        self._scales = [
+            (op['columns'], np.asarray(op['mean']), np.asarray(op['scale']))
+            for op in self.operations if op['op'] == 'scale'
+        ]
+        linear = self.operations[-1]  # Ostatnia operacja to model liniowy
+        self._linear_columns = linear['columns']
+        self._coef = np.asarray(linear['coef'], dtype=np.float64)
+        self._intercept = linear['intercept']
+
+    def predict(self, data):
+        """
+        Przewiduje wartości dla danych wejściowych
+
+        Args:
+            data (pd.DataFrame lub dict): Kolumny cech (np. 'Płeć', '5 km Czas_sekundy', 'Rocznik')
+
+        Returns:
+            np.ndarray: Predykcje (float64)
+        """
+        columns = {name: np.asarray(data[name]) for name in self._input_columns()}  # Kolumna -> tablica
+        scales = iter(self._scales)
+
+        for op in self.operations[:-1]:
+            if op['op'] == 'impute':  # Uzupełnij braki wartościami z treningu
+                for name, fill in op['values'].items():
+                    values = columns[name]
+                    missing = _isnan(values)
+                    if missing.any():
+                        values = values.copy()
+                        values[missing] = fill
+                    columns[name] = values
+            elif op['op'] == 'ordinal':  # Kategoria -> kod liczbowy
+                for name, mapping in op['mappings'].items():
+                    values = columns[name].astype(object)
+                    codes = np.full(len(values), np.nan if op['unknown'] is None else op['unknown'], dtype=np.float64)
+                    for category, code in mapping.items():
+                        codes[values == category] = code
+                    if name in op.get('missing', {}):  # Brak wartości ma własny kod (nowsze artefakty)
+                        codes[_ismissing(values)] = op['missing'][name]
+                    columns[name] = codes
+            elif op['op'] == 'scale':  # (x - średnia) / odchylenie
+                names, mean, scale = next(scales)
+                for i, name in enumerate(names):
+                    columns[name] = (columns[name].astype(np.float64) - mean[i]) / scale[i]
+
+        features = np.column_stack([columns[name].astype(np.float64) for name in self._linear_columns])
+        return features @ self._coef + self._intercept  # Model liniowy
+
+    def _input_columns(self):
+        """Zwraca nazwy kolumn wejściowych (w kolejności cech modelu)"""
+        return self._linear_columns
+
+
+def _isnan(values):
+    """
+    Maska wartości NaN dla tablicy liczbowej lub tekstowej
+
+    Jak SimpleImputer(missing_values=np.nan): None w kolumnie tekstowej nie jest
+    uzupełniany - trafia do enkodera jako brak (kod braku).
+    """
+    if values.dtype.kind in 'fc':  # Liczby zmiennoprzecinkowe
+        return np.isnan(values)
+    if values.dtype.kind == 'O':  # Obiekty (NaN != NaN)
+        return np.asarray(values != values, dtype=bool)
+    return np.zeros(len(values), dtype=bool)  # Liczby całkowite - brak braków
+
+
+def _ismissing(values):
+    """Maska braków (None lub NaN) w kolumnie tekstowej - jak category_encoders"""
+    return np.asarray((values == None) | (values != values), dtype=bool)  # noqa: E711
+
+
+def save_compiled_model(artifact, path):
+    """
+    Zapisuje artefakt skompilowanego modelu do pliku JSON
+
+    Args:
+        artifact (dict): Wynik export_compiled_model
+        path (str): Ścieżka do pliku
+    """
+    with open(path, 'w', encoding='utf-8') as f:  # Otwórz plik do zapisu
+        json.dump(artifact, f, indent=4, ensure_ascii=False)  # Czytelny JSON z polskimi znakami
+
+
+def load_compiled_model(path):
+    """
+    Wczytuje skompilowany model z pliku JSON
+
+    Args:
+        path (str): Ścieżka do pliku
+
+    Returns:
+        CompiledModel: Model gotowy do predykcji
+    """
+    with open(path, encoding='utf-8') as f:  # Otwórz plik
+        return CompiledModel(json.load(f))
+
+
+def verify_compiled_model(pipeline, compiled, probe, tolerance):
+    """
+    Porównuje predykcje skompilowanego modelu z oryginalnym pipeline
+
+    Args:
+        pipeline: Oryginalny pipeline (model.predict)
+        compiled (CompiledModel): Skompilowany model
+        probe (pd.DataFrame): Dane testowe
+        tolerance (float): Maksymalna dopuszczalna różnica (sekundy)
+
+    Returns:
+        float: Maksymalna różnica bezwzględna
+
+    Raises:
+        ValueError: Jeśli różnica przekracza tolerancję
+    """
+    expected = np.asarray(pipeline.predict(probe), dtype=np.float64)  # Oryginał
+    actual = compiled.predict(probe)  # Wersja skompilowana
+    max_diff = float(np.max(np.abs(expected - actual)))  # Największa różnica
+    if max_diff > tolerance:
+        raise ValueError(f"Skompilowany model różni się od oryginału o {max_diff:.6f} s (> {tolerance})")
+    return max_diff
@@ -1,9 +1,39 @@
 """
 Moduł do ładowania danych historycznych z CSV
 """
+import glob  # Wyszukiwanie plików źródłowych EDA-ML
+import hashlib  # Hash zawartości plików (klucz cache)
+import os  # Operacje na plikach
+import numpy as np  # Wektorowe parsowanie czasów
 import pandas as pd  # Import biblioteki pandas do pracy z danymi
 import streamlit as st  # Import streamlit do cache'owania
-from config import DATA_FILE  # Import ścieżki do pliku z konfiguracją
+from config import (  # Import ścieżek i ustawień cache z konfiguracji
+    DATA_FILE, EDA_DATA_DIR, EDA_DATA_PATTERN, DATA_CACHE_DIR, DATA_CACHE_SCHEMA
+)
+from utils.stats_calculator import frame_fingerprint  # Odcisk wierszy dla wersji danych
+
+# Parquet wymaga pyarrow - bez niego dane są zawsze parsowane z CSV
+try:
+    import pyarrow  # noqa: F401 - silnik Parquet dla pandas
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CACHE_FILE_PREFIX = "historical_"  # Prefiks plików cache w DATA_CACHE_DIR
+
+# Kolumny z czasami (międzyczasy + czas końcowy) - każda dostaje kolumnę '<nazwa>_sekundy'
+TIME_COLUMNS = ['5 km Czas', '10 km Czas', '15 km Czas', '20 km Czas', 'Czas']
+
+# Formaty o stałej szerokości: długość tekstu -> pozycje cyfr (godziny, minuty, sekundy)
+_FIXED_TIME_FORMATS = {
+    8: ((0, 1), (3, 4), (6, 7)),  # HH:MM:SS
+    7: ((0,), (2, 3), (5, 6)),  # H:MM:SS
+    5: ((), (0, 1), (3, 4)),  # MM:SS
+    4: ((), (0,), (2, 3)),  # M:SS
+}
+
+# Pozostałe formaty (spacje, >2 cyfry godzin) - wolniejsza ścieżka przez regex
+_TIME_REGEX = r'^\s*(?:(\d+):)?(\d+):(\d+)\s*$'
 
 
 def time_to_seconds(time_str):
@@ -36,42 +66,283 @@ def time_to_seconds(time_str):
         else:
             return None  # Niepoprawny format
             
-    except:  # Jeśli błąd konwersji
+    except (ValueError, TypeError):  # Jeśli błąd konwersji
         return None  # Zwróć None
 
 
+def _encode_ascii(values, width):
+    """
+    Koduje teksty jako macierz bajtów ASCII o stałej szerokości (krótsze dopełnione zerami)
+    
+    Args:
+        values (np.ndarray): Tablica tekstów (dtype object)
+        width (int): Szerokość macierzy (dłuższe teksty są obcinane)
+        
+    Returns:
+        np.ndarray: Macierz uint8 (len(values) x width) lub None jeśli są znaki spoza ASCII
+    """
+    try:
+        raw = values.astype(f'S{width}')  # Teksty -> bajty o stałej szerokości
+    except UnicodeEncodeError:  # Znaki spoza ASCII - nie pasuje do żadnego formatu
+        return None
+    return raw.view(np.uint8).reshape(-1, width)
+
+
+def _parse_fixed_width(codes, length):
+    """
+    Parsuje teksty o jednej długości (np. 'HH:MM:SS') arytmetyką na bajtach
+    
+    Args:
+        codes (np.ndarray): Macierz bajtów ASCII (n x length)
+        length (int): Długość tekstu (klucz _FIXED_TIME_FORMATS)
+        
+    Returns:
+        tuple: (sekundy jako np.ndarray int32, maska poprawnych wartości)
+    """
+    digits = codes[:, :length].astype(np.int32) - ord('0')  # Znak -> cyfra
+    hours_pos, minutes_pos, seconds_pos = _FIXED_TIME_FORMATS[length]  # Pozycje cyfr
+    digit_pos = list(hours_pos + minutes_pos + seconds_pos)
+    colon_pos = [i for i in range(length) if i not in digit_pos]  # Pozostałe pozycje to dwukropki
+    
+    # Poprawny format: dwukropki na swoich miejscach i same cyfry poza nimi
+    valid = (digits[:, colon_pos] == ord(':') - ord('0')).all(axis=1)
+    valid &= ((digits[:, digit_pos] >= 0) & (digits[:, digit_pos] <= 9)).all(axis=1)
+    
+    def number(positions):  # Liczba złożona z cyfr na podanych pozycjach
+        value = np.zeros(len(digits), dtype=np.int32)
+        for pos in positions:
+            value = value * 10 + digits[:, pos]
+        return value
+    
+    hours, minutes, seconds = number(hours_pos), number(minutes_pos), number(seconds_pos)
+    total = hours * 3600 + minutes * 60 + seconds  # Sekundy
+    return np.where(valid, total, 0).astype(np.int32), valid
+
+
+def times_to_seconds(values):
+    """
+    Wektorowo konwertuje całą kolumnę czasów HH:MM:SS / MM:SS na sekundy
+    
+    Teksty w typowych formatach parsowane są arytmetyką na macierzy bajtów,
+    pozostałe - jednym wyrażeniem regularnym. Brakujące wartości (NaN) dają
+    <NA>, a niepoprawne (np. 'DNF') są zliczane zamiast cicho ignorowane.
+    
+    Args:
+        values (pd.Series lub array-like): Czasy jako tekst
+        
+    Returns:
+        tuple: (pd.Series typu Int32 z sekundami, liczba niepoprawnych wartości)
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)  # Ujednolicenie wejścia
+    raw = series.to_numpy(dtype=object)  # Surowe wartości
+    present_idx = np.flatnonzero(pd.notna(raw))  # Pomijamy NaN / None (to nie są błędy formatu)
+    texts = raw[present_idx]  # Niepuste wartości
+    
+    seconds = np.zeros(len(raw), dtype=np.int32)  # Wynik
+    parsed = np.zeros(len(raw), dtype=bool)  # Czy wartość została sparsowana
+    pending = np.ones(len(texts), dtype=bool)  # Jeszcze niesparsowane (indeksy w `texts`)
+    
+    # Szybka ścieżka - jedna macierz bajtów o szerokości o 1 większej niż najdłuższy format,
+    # więc liczba niezerowych bajtów to długość tekstu (dłuższe teksty trafiają do regex)
+    width = max(_FIXED_TIME_FORMATS) + 1
+    codes = _encode_ascii(texts, width)
+    if codes is not None:
+        lengths = np.count_nonzero(codes, axis=1)  # Długości tekstów
+        for length in _FIXED_TIME_FORMATS:
+            sel = np.flatnonzero(lengths == length)  # Teksty tej długości
+            if len(sel) == 0:
+                continue
+            values_sec, valid = _parse_fixed_width(codes[sel], length)
+            seconds[present_idx[sel[valid]]] = values_sec[valid]
+            parsed[present_idx[sel[valid]]] = True
+            pending[sel[valid]] = False
+    
+    # Wolna ścieżka - regex dla nietypowych zapisów (spacje, >2 cyfry godzin, znaki spoza ASCII)
+    rest = np.flatnonzero(pending)
+    if len(rest) > 0:
+        parts = pd.Series(texts[rest], dtype=object).astype(str).str.extract(_TIME_REGEX)  # Godziny, minuty, sekundy
+        ok = parts[[1, 2]].notna().all(axis=1).to_numpy()  # Minuty i sekundy muszą istnieć
+        nums = parts.apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        total = nums[:, 0] * 3600 + nums[:, 1] * 60 + nums[:, 2]
+        seconds[present_idx[rest[ok]]] = total[ok].astype(np.int32)
+        parsed[present_idx[rest[ok]]] = True
+    
+    result = pd.Series(pd.arrays.IntegerArray(seconds, ~parsed), index=series.index, name=series.name)  # Int32 z <NA>
+    malformed = int(len(texts) - parsed.sum())  # Niepuste, ale niesparsowane
+    return result, malformed
+
+
+def convert_time_columns(df, columns=TIME_COLUMNS):
+    """
+    Konwertuje wszystkie kolumny z czasami na sekundy w jednym przebiegu
+    
+    Dla każdej kolumny 'X' (np. '10 km Czas') dodaje 'X_sekundy' (Int32),
+    o ile taka kolumna jeszcze nie istnieje.
+    
+    Args:
+        df (pd.DataFrame): Dane z kolumnami tekstowymi czasów
+        columns (list): Kolumny do konwersji (domyślnie TIME_COLUMNS)
+        
+    Returns:
+        dict: Liczba niepoprawnych wartości dla każdej przekonwertowanej kolumny
+    """
+    malformed = {}  # Kolumna -> liczba błędów
+    for col in columns:
+        target = f"{col}_sekundy"  # Np. 'Czas' -> 'Czas_sekundy'
+        if col in df.columns and target not in df.columns:  # Konwertuj tylko brakujące
+            df[target], malformed[col] = times_to_seconds(df[col])
+    return malformed  # Zwróć liczniki błędów
+
+
+def get_source_files():
+    """
+    Zwraca listę plików, od których zależą dane historyczne
+    
+    Returns:
+        list: Ścieżka DATA_FILE oraz pliki *__final.csv z EDA-ML (jeśli istnieją)
+    """
+    eda_files = sorted(glob.glob(os.path.join(EDA_DATA_DIR, EDA_DATA_PATTERN)))  # Surowe dane z notebooka
+    return [DATA_FILE] + eda_files  # Plik aplikacji zawsze pierwszy
+
+
+def _file_fingerprint(path):
+    """
+    Oblicza odcisk pliku: nazwa, rozmiar, mtime i hash SHA-256 zawartości
+    
+    Args:
+        path (str): Ścieżka do pliku
+        
+    Returns:
+        str: Odcisk pliku
+    """
+    stat = os.stat(path)  # Rozmiar i czas modyfikacji
+    digest = hashlib.sha256()  # Hash zawartości
+    with open(path, 'rb') as f:  # Czytaj blokami po 1 MB
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}:{digest.hexdigest()}"
+
+
+def compute_data_version():
+    """
+    Oblicza wersję danych - klucz cache zależny od zawartości i mtime plików źródłowych
+    
+    Returns:
+        str: 16-znakowy identyfikator wersji danych
+    """
+    parts = [f"schema:{DATA_CACHE_SCHEMA}"]  # Zmiana schematu unieważnia cache
+    for path in get_source_files():  # DATA_FILE + pliki EDA-ML
+        if os.path.exists(path):  # Brakujące pliki pomijamy (DATA_FILE zgłosi błąd przy wczytaniu)
+            parts.append(_file_fingerprint(path))
+    return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()[:16]  # Krótki klucz
+
+
+def _cache_path(data_version):
+    """Zwraca ścieżkę pliku Parquet dla danej wersji danych"""
+    return os.path.join(DATA_CACHE_DIR, f"{CACHE_FILE_PREFIX}{data_version}.parquet")
+
+
+def _read_columnar_cache(data_version):
+    """
+    Wczytuje dane z cache Parquet (kolumny już przeliczone i otypowane)
+    
+    Args:
+        data_version (str): Wersja danych (klucz cache)
+        
+    Returns:
+        pd.DataFrame: Dane z cache lub None jeśli cache nie istnieje / jest uszkodzony
+    """
+    if not PARQUET_AVAILABLE:  # Brak pyarrow - brak cache
+        return None
+    
+    path = _cache_path(data_version)  # Plik dla tej wersji
+    if not os.path.exists(path):  # Cache jeszcze nie zbudowany
+        return None
+    
+    try:
+        return pd.read_parquet(path)  # Odczyt kolumnowy - bez parsowania tekstu
+    except Exception:  # Uszkodzony plik - zbuduj cache od nowa
+        return None
+
+
+def _write_columnar_cache(df, data_version):
+    """
+    Zapisuje przygotowane dane do cache Parquet i usuwa nieaktualne wersje
+    
+    Args:
+        df (pd.DataFrame): Przygotowane dane historyczne
+        data_version (str): Wersja danych (klucz cache)
+    """
+    if not PARQUET_AVAILABLE:  # Brak pyarrow - nie zapisujemy
+        return
+    
+    try:
+        os.makedirs(DATA_CACHE_DIR, exist_ok=True)  # Utwórz folder cache
+        path = _cache_path(data_version)  # Docelowy plik
+        tmp_path = f"{path}.{os.getpid()}.tmp"  # Plik tymczasowy (zapis atomowy)
+        df.to_parquet(tmp_path, index=False)  # Zapis kolumnowy
+        os.replace(tmp_path, path)  # Atomowa podmiana - inne procesy nie widzą połowy pliku
+        
+        # Usuń cache poprzednich wersji danych
+        for old_path in glob.glob(os.path.join(DATA_CACHE_DIR, f"{CACHE_FILE_PREFIX}*.parquet")):
+            if old_path != path:  # Zostaw tylko aktualną wersję
+                os.remove(old_path)
+    except Exception as e:  # Cache jest opcjonalny - aplikacja działa dalej
+        st.warning(f"⚠️ Nie udało się zapisać cache danych: {e}")
+
+
+def prepare_historical_data(df):
+    """
+    Wylicza kolumny pochodne (Rok, sekundy, imię i nazwisko) z surowego CSV
+    
+    Args:
+        df (pd.DataFrame): Dane wczytane z CSV
+        
+    Returns:
+        pd.DataFrame: Dane z dodatkowymi kolumnami
+    """
+    # Dodaj kolumnę 'Rok' jeśli istnieje 'rok' (małymi literami)
+    if 'rok' in df.columns and 'Rok' not in df.columns:  # Jeśli jest 'rok' ale nie ma 'Rok'
+        df['Rok'] = df['rok']  # Skopiuj wartości
+    
+    # Obsługa starej nazwy '5km_sekundy' - ma pierwszeństwo przed parsowaniem '5 km Czas'
+    if '5 km Czas_sekundy' not in df.columns and '5km_sekundy' in df.columns:  # Jeśli jest stara nazwa
+        df['5 km Czas_sekundy'] = df['5km_sekundy']  # Skopiuj wartości
+    
+    # Konwertuj 'Czas' i wszystkie międzyczasy (HH:MM:SS) na sekundy jednym przebiegiem
+    df.attrs['malformed_times'] = convert_time_columns(df)  # Liczniki niepoprawnych wartości
+    
+    # Dodaj 'Imię i nazwisko' jeśli istnieją kolumny 'Imię' i 'Nazwisko'
+    if 'Imię' in df.columns and 'Nazwisko' in df.columns and 'Imię i nazwisko' not in df.columns:
+        df['Imię i nazwisko'] = df['Imię'].fillna('') + ' ' + df['Nazwisko'].fillna('')  # Połącz imię i nazwisko
+        df['Imię i nazwisko'] = df['Imię i nazwisko'].str.strip()  # Usuń spacje na końcach
+    
+    return df  # Zwróć DataFrame
+
+
 @st.cache_data  # Dekorator - dane będą załadowane tylko raz i cache'owane
 def load_historical_data():
     """
     Ładuje dane historyczne z półmaratonu 2023 i 2024
     
+    Przy pierwszym uruchomieniu parsuje CSV i zapisuje wynik do cache Parquet
+    (klucz: hash i mtime DATA_FILE oraz plików EDA-ML). Kolejne procesy
+    wczytują gotowe, otypowane kolumny bezpośrednio z cache.
+    
     Returns:
         pd.DataFrame: DataFrame z danymi historycznymi
     """
     try:
-        df = pd.read_csv(DATA_FILE, encoding='utf-8-sig')  # Wczytaj CSV z polskimi znakami
-        
-        # Dodaj kolumnę 'Rok' jeśli istnieje 'rok' (małymi literami)
-        if 'rok' in df.columns and 'Rok' not in df.columns:  # Jeśli jest 'rok' ale nie ma 'Rok'
-            df['Rok'] = df['rok']  # Skopiuj wartości
-        
-        # Konwertuj kolumnę 'Czas' (HH:MM:SS) na sekundy jeśli nie ma 'Czas_sekundy'
-        if 'Czas' in df.columns and 'Czas_sekundy' not in df.columns:  # Jeśli jest 'Czas' ale nie ma 'Czas_sekundy'
-            df['Czas_sekundy'] = df['Czas'].apply(time_to_seconds)  # Konwersja na sekundy
-        
-        # Konwertuj kolumnę '5 km Czas' na sekundy jeśli nie ma '5 km Czas_sekundy'
-        # Obsługuje zarówno starą nazwę '5km_sekundy' jak i nową '5 km Czas_sekundy'
-        if '5 km Czas_sekundy' not in df.columns:  # Jeśli nie ma nowej kolumny
-            if '5km_sekundy' in df.columns:  # Jeśli jest stara nazwa
-                df['5 km Czas_sekundy'] = df['5km_sekundy']  # Skopiuj wartości
-            elif '5 km Czas' in df.columns:  # Jeśli jest tylko tekstowa kolumna
-                df['5 km Czas_sekundy'] = df['5 km Czas'].apply(time_to_seconds)  # Konwersja
+        data_version = compute_data_version()  # Klucz cache z plików źródłowych
+        df = _read_columnar_cache(data_version)  # Spróbuj wczytać gotowe dane
         
-        # Dodaj 'Imię i nazwisko' jeśli istnieją kolumny 'Imię' i 'Nazwisko'
-        if 'Imię' in df.columns and 'Nazwisko' in df.columns and 'Imię i nazwisko' not in df.columns:
-            df['Imię i nazwisko'] = df['Imię'].fillna('') + ' ' + df['Nazwisko'].fillna('')  # Połącz imię i nazwisko
-            df['Imię i nazwisko'] = df['Imię i nazwisko'].str.strip()  # Usuń spacje na końcach
+        if df is None:  # Brak cache - parsuj CSV
+            df = pd.read_csv(DATA_FILE, encoding='utf-8-sig')  # Wczytaj CSV z polskimi znakami
+            df = prepare_historical_data(df)  # Wylicz kolumny pochodne
+            _write_columnar_cache(df, data_version)  # Zapisz cache dla kolejnych procesów
         
+        df.attrs['data_version'] = data_version  # Wersja danych (klucz dla cache wyżej w stosie)
+        df.attrs['data_fingerprint'] = frame_fingerprint(df)  # Wersja dotyczy tylko tych wierszy
         return df  # Zwróć DataFrame
     except FileNotFoundError:  # Jeśli plik nie istnieje
         st.error(f"❌ Nie znaleziono pliku z danymi: {DATA_FILE}")  # Wyświetl błąd
@@ -95,6 +366,7 @@ def get_data_summary(df):
         'total_records': len(df),  # Całkowita liczba rekordów
         'years': sorted(df['Rok'].unique()) if 'Rok' in df.columns else [],  # Lata (wielka litera)
         'columns': list(df.columns),  # Lista kolumn
-        'records_by_year': df.groupby('Rok').size().to_dict() if 'Rok' in df.columns else {}  # Liczba rekordów per rok
+        'records_by_year': df.groupby('Rok').size().to_dict() if 'Rok' in df.columns else {},  # Liczba rekordów per rok
+        'malformed_times': df.attrs.get('malformed_times', {})  # Niepoprawne czasy per kolumna
     }
     return summary  # Zwróć słownik z podsumowaniem
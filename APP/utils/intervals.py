@@ -0,0 +1,149 @@
+"""
+Intervals - Przedziały predykcji z kwantyli reszt modelu
+
+Dla wyników historycznych liczymy resztę = czas rzeczywisty - predykcja modelu
+i zapamiętujemy jej kwantyle (INTERVAL_QUANTILES) w grupach
+(płeć, kategoria wiekowa, przedział czasu 5km). Przedział dla nowej predykcji
+to predykcja + kwantyle reszt z najbardziej szczegółowej grupy, która ma
+co najmniej INTERVAL_MIN_SAMPLES wyników (potem płeć + czas 5km, sama płeć, całość).
+"""
+
+import numpy as np  # Operacje wektorowe
+import pandas as pd  # Grupowanie reszt
+
+from config import MODEL_FEATURES, INTERVAL_QUANTILES, INTERVAL_BUCKET_SECONDS, INTERVAL_MIN_SAMPLES  # Ustawienia
+from utils.stats_calculator import get_versioned  # Cache struktur per wersja danych
+
+# Poziomy grupowania reszt - od najbardziej szczegółowego
+INTERVAL_LEVELS = [
+    ('Płeć', 'Kategoria wiekowa', 'bucket'),  # Płeć + kategoria + czas 5km
+    ('Płeć', 'bucket'),  # Płeć + czas 5km
+    ('Płeć',),  # Sama płeć
+]
+
+
+def _time_bucket(times_5km_seconds):
+    """Numer przedziału czasu 5km (float - NaN dla braków)"""
+    return np.floor(np.asarray(times_5km_seconds, dtype=np.float64) / INTERVAL_BUCKET_SECONDS)
+
+
+def build_residual_table(df, model):
+    """
+    Buduje tabelę kwantyli reszt modelu na danych historycznych
+
+    Args:
+        df (pd.DataFrame): Dane historyczne (cechy modelu, 'Kategoria wiekowa', 'Czas_sekundy')
+        model: Model z metodą predict(df)
+
+    Returns:
+        dict: Tabela reszt
+            - 'levels' (list): [{'columns': kolumny, 'offsets': {klucz: (dolna, górna)}}]
+            - 'overall' (tuple): Kwantyle reszt dla wszystkich wyników
+            - 'quantiles' (tuple): Użyte kwantyle
+            - 'n_samples' (int): Liczba wyników użytych do budowy
+            - 'coverage' (float): Odsetek wyników historycznych wewnątrz swojego przedziału (%)
+    """
+    data = df[MODEL_FEATURES + ['Kategoria wiekowa', 'Czas_sekundy']].dropna()  # Tylko kompletne wiersze
+    predicted = np.trunc(np.asarray(model.predict(data[MODEL_FEATURES]), dtype=np.float64))  # Jak int() w predict_time
+
+    residuals = pd.DataFrame({
+        'Płeć': data['Płeć'].to_numpy(),
+        'Kategoria wiekowa': data['Kategoria wiekowa'].to_numpy(),
+        'bucket': _time_bucket(data['5 km Czas_sekundy']),  # Przedział czasu 5km
+        'residual': data['Czas_sekundy'].to_numpy(dtype=np.float64) - predicted  # Rzeczywisty - przewidywany
+    })
+
+    low_q, high_q = INTERVAL_QUANTILES
+    levels = []
+    for columns in INTERVAL_LEVELS:
+        grouped = residuals.groupby(list(columns))['residual']
+        quantiles = grouped.quantile([low_q, high_q]).unstack()  # Wiersz = grupa, kolumny = kwantyle
+        quantiles = quantiles[grouped.size() >= INTERVAL_MIN_SAMPLES]  # Tylko liczne grupy
+        offsets = {
+            (key if isinstance(key, tuple) else (key,)): (float(row[low_q]), float(row[high_q]))
+            for key, row in quantiles.iterrows()
+        }
+        levels.append({'columns': columns, 'offsets': offsets})
+
+    table = {
+        'levels': levels,
+        'overall': tuple(float(v) for v in residuals['residual'].quantile([low_q, high_q])),  # Ostatni fallback
+        'quantiles': INTERVAL_QUANTILES,
+        'n_samples': len(residuals),
+    }
+
+    # Pokrycie na danych historycznych (kontrola kalibracji przedziałów)
+    low, high = interval_offsets(table, residuals['Płeć'], residuals['Kategoria wiekowa'], data['5 km Czas_sekundy'])
+    inside = (residuals['residual'] >= low) & (residuals['residual'] <= high)
+    table['coverage'] = round(float(inside.mean()) * 100, 1)
+    return table
+
+
+def get_residual_table(df, model, model_version):
+    """
+    Zwraca tabelę reszt dla danych i modelu (budowaną raz na wersję danych i wersję modelu)
+
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        model: Wczytany model
+        model_version (str): Wersja modelu z rejestru (klucz cache - id() obiektu może
+            zostać użyte ponownie po podmianie modelu)
+
+    Returns:
+        dict: Tabela reszt (build_residual_table)
+    """
+    return get_versioned(df, f"residual_table_{model_version}", lambda data: build_residual_table(data, model))
+
+
+def _resolve_offsets(table, gender, age_category, bucket):
+    """Kwantyle reszt z najbardziej szczegółowej dostępnej grupy"""
+    values = {'Płeć': gender, 'Kategoria wiekowa': age_category, 'bucket': bucket}
+    for level in table['levels']:
+        offsets = level['offsets'].get(tuple(values[c] for c in level['columns']))
+        if offsets is not None:
+            return offsets
+    return table['overall']
+
+
+def interval_offset(table, gender, age_category, time_5km_seconds):
+    """
+    Zwraca przesunięcia przedziału dla jednej predykcji
+
+    Args:
+        table (dict): Tabela reszt
+        gender (str): Płeć ('M' lub 'K')
+        age_category (str): Kategoria wiekowa (np. 'M30')
+        time_5km_seconds (int): Czas na 5km w sekundach
+
+    Returns:
+        tuple: (dolne, górne) przesunięcie w sekundach względem predykcji
+    """
+    return _resolve_offsets(table, gender, age_category, float(_time_bucket(time_5km_seconds)))
+
+
+def interval_offsets(table, genders, age_categories, times_5km_seconds):
+    """
+    Wektorowo zwraca przesunięcia przedziałów dla wielu predykcji
+
+    Każda unikalna kombinacja (płeć, kategoria, przedział 5km) jest rozwiązywana raz.
+
+    Args:
+        table (dict): Tabela reszt
+        genders (array-like): Płcie
+        age_categories (array-like): Kategorie wiekowe
+        times_5km_seconds (array-like): Czasy na 5km w sekundach
+
+    Returns:
+        tuple: (np.ndarray dolnych, np.ndarray górnych przesunięć w sekundach)
+    """
+    keys = pd.DataFrame({
+        'Płeć': np.asarray(genders, dtype=object),
+        'Kategoria wiekowa': np.asarray(age_categories, dtype=object),
+        'bucket': _time_bucket(times_5km_seconds),
+    })
+    codes = keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy()  # Numer kombinacji
+    unique_keys = keys.drop_duplicates()  # Ta sama kolejność co ngroup(sort=False)
+    resolved = np.array(
+        [_resolve_offsets(table, *key) for key in unique_keys.itertuples(index=False)], dtype=np.float64
+    ).reshape(-1, 2)
+    return resolved[codes, 0], resolved[codes, 1]
@@ -1,43 +1,258 @@
 """
 Langfuse Helper - Moduł do monitorowania wywołań LLM za pomocą Langfuse
+
+Zdarzenia telemetrii trafiają do ograniczonej kolejki w pamięci, a wątek w tle
+(TelemetryExporter) wysyła je paczkami do API ingestion Langfuse - gdy paczka
+osiągnie TELEMETRY_BATCH_SIZE albo minie TELEMETRY_FLUSH_SECONDS. Przy wolnym
+backendzie kolejka usuwa najstarsze zdarzenia, więc wątek obsługujący
+użytkownika nigdy nie czeka na wysyłkę telemetrii.
 """
 
-import streamlit as st  # Framework Streamlit
-from langfuse import Langfuse  # Biblioteka Langfuse
+import atexit  # Dosłanie kolejki przy zamknięciu procesu
 import os  # Operacje systemowe
-from datetime import datetime  # Data i czas
+import threading  # Wątek eksportera
+import time  # Progi czasowe paczek
+import uuid  # Identyfikatory zdarzeń
+from collections import deque  # Ograniczona kolejka zdarzeń
+from datetime import datetime, timezone  # Data i czas
+
+import streamlit as st  # Framework Streamlit
+
+from config import (  # Ustawienia telemetrii
+    LANGFUSE_TRACE_NAME, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS,
+    TELEMETRY_QUEUE_SIZE, TELEMETRY_BATCH_SIZE, TELEMETRY_FLUSH_SECONDS, TELEMETRY_HTTP_TIMEOUT
+)
+from utils.circuit_breaker import backoff_delay  # Odstęp po nieudanej wysyłce
+
+INGESTION_PATH = "/api/public/ingestion"  # Endpoint wsadowy Langfuse
+
+
+def _utc_now():
+    """Znacznik czasu w formacie ISO 8601 (UTC) wymaganym przez API ingestion"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+class TelemetryExporter:
+    """
+    Kolejka zdarzeń Langfuse opróżniana paczkami przez wątek w tle
+
+    enqueue() tylko dopisuje zdarzenie do kolejki (bez I/O). Pełna kolejka
+    usuwa najstarsze zdarzenie (licznik dropped). Paczki odrzucone przez
+    przeciążony backend (429/5xx, błąd sieci) wracają na początek kolejki
+    w miarę wolnego miejsca; pozostałe błędy kończą paczkę (failed).
+    """
+
+    def __init__(self, host, public_key, secret_key, max_queue=TELEMETRY_QUEUE_SIZE,
+                 batch_size=TELEMETRY_BATCH_SIZE, flush_seconds=TELEMETRY_FLUSH_SECONDS,
+                 timeout=TELEMETRY_HTTP_TIMEOUT):
+        self.url = host.rstrip('/') + INGESTION_PATH  # Adres API ingestion
+        self._auth = (public_key, secret_key)  # Basic auth: klucz publiczny + prywatny
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.timeout = timeout
+        self._queue = deque()  # Zdarzenia czekające na wysyłkę
+        self._cond = threading.Condition()  # Blokada kolejki + budzenie wątku
+        self._thread = None  # Wątek startuje przy pierwszym zdarzeniu
+        self._stopping = False  # Zamknięcie eksportera
+        self._flushing = False  # flush() - wysyłaj bez czekania na próg czasu
+        self._in_flight = 0  # Zdarzenia w trakcie wysyłki
+        self._failures = 0  # Kolejne nieudane wysyłki (do odstępu)
+        self.enqueued = 0  # Zdarzenia przyjęte do kolejki
+        self.sent = 0  # Zdarzenia przyjęte przez Langfuse
+        self.dropped = 0  # Zdarzenia usunięte (pełna kolejka)
+        self.failed = 0  # Zdarzenia odrzucone przez Langfuse lub po błędzie nieprzejściowym
+        self.batches = 0  # Wysłane paczki
+        self.last_error = None  # Ostatni błąd wysyłki (do monitoringu)
+
+    def enqueue(self, event):
+        """
+        Dodaje zdarzenie do kolejki - nie blokuje (poza krótką blokadą kolejki)
+
+        Args:
+            event (dict): Zdarzenie API ingestion (id, type, timestamp, body)
+        """
+        with self._cond:
+            if self._stopping:
+                return
+            if len(self._queue) >= self.max_queue:  # Pełna kolejka - usuń najstarsze
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(event)
+            self.enqueued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="langfuse-exporter", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:  # Pełna paczka - obudź wątek od razu
+                self._cond.notify_all()
+
+    def _run(self):
+        """Pętla wątku: czeka na pełną paczkę lub próg czasu, wysyła, powtarza"""
+        import httpx  # Zależność pakietów openai i langfuse - import dopiero w wątku w tle
+
+        with httpx.Client(auth=self._auth, timeout=self.timeout) as http:  # Jedno połączenie keep-alive
+            while True:
+                with self._cond:
+                    deadline = time.monotonic() + self.flush_seconds  # Próg czasu dla bieżącej paczki
+                    while not (self._stopping or self._flushing) and len(self._queue) < self.batch_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    if not self._queue:
+                        self._flushing = False
+                        if self._stopping:
+                            return
+                        continue
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    self._in_flight = len(batch)
+
+                retry = self._send(http, batch)
+
+                with self._cond:
+                    self._in_flight = 0
+                    if retry:  # Backend przeciążony - zwróć paczkę, ale nie kosztem nowszych zdarzeń
+                        free = self.max_queue - len(self._queue)
+                        self._queue.extendleft(reversed(batch[len(batch) - free:] if free > 0 else []))
+                        self.dropped += max(0, len(batch) - max(free, 0))
+                    self._cond.notify_all()  # Budzi flush()
+                    stopping = self._stopping
+
+                if retry and not stopping:  # Odstęp przed kolejną próbą
+                    time.sleep(backoff_delay(self._failures - 1, self.flush_seconds, 30.0))
+
+    def _send(self, http, batch):
+        """
+        Wysyła jedną paczkę do Langfuse
+
+        Args:
+            http (httpx.Client): Klient HTTP wątku eksportera
+            batch (list): Zdarzenia
+
+        Returns:
+            bool: True jeśli paczkę warto ponowić (429/5xx, błąd sieci)
+        """
+        try:
+            response = http.post(self.url, json={"batch": batch})
+        except Exception as e:  # Błąd sieci / timeout
+            return self._record_failure(f"{type(e).__name__}: {e}", retry=True)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            return self._record_failure(f"HTTP {response.status_code}", retry=True)
+        if response.status_code >= 400:  # Np. złe klucze - ponawianie nic nie da
+            with self._cond:
+                self.failed += len(batch)
+            return self._record_failure(f"HTTP {response.status_code}", retry=False)
+
+        try:  # 207: część zdarzeń mogła zostać odrzucona
+            rejected = len(response.json().get("errors", []))
+        except ValueError:
+            rejected = 0
+        with self._cond:
+            self._failures = 0
+            self.batches += 1
+            self.sent += len(batch) - rejected
+            self.failed += rejected
+        return False
+
+    def _record_failure(self, message, retry):
+        """Zapisuje nieudaną wysyłkę"""
+        with self._cond:
+            self._failures += 1
+            self.last_error = message
+        return retry
+
+    def flush(self, timeout=5.0):
+        """
+        Czeka, aż kolejka zostanie wysłana (testy, zamknięcie procesu - nie ścieżka żądania)
+
+        Args:
+            timeout (float): Maksymalny czas oczekiwania (sekundy)
+
+        Returns:
+            bool: True jeśli kolejka jest pusta
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flushing = True  # Nie czekaj na próg czasu paczki
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout=2.0):
+        """
+        Zatrzymuje wątek po wysłaniu zaległych zdarzeń
+
+        Args:
+            timeout (float): Maksymalny czas na dosłanie kolejki (sekundy)
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Zwraca liczniki eksportera (do monitoringu)
+
+        Returns:
+            dict: queue_depth, enqueued, sent, dropped, failed, batches, last_error
+        """
+        with self._cond:
+            return {
+                'queue_depth': len(self._queue),  # Zdarzenia czekające w kolejce
+                'enqueued': self.enqueued,  # Przyjęte do kolejki
+                'sent': self.sent,  # Przyjęte przez Langfuse
+                'dropped': self.dropped,  # Usunięte przez pełną kolejkę
+                'failed': self.failed,  # Odrzucone przez Langfuse
+                'batches': self.batches,  # Wysłane paczki
+                'last_error': self.last_error  # Ostatni błąd wysyłki
+            }
+
+
+_EXPORTER = None  # Eksporter współdzielony przez wszystkie sesje procesu
+_EXPORTER_LOCK = threading.Lock()  # Jednorazowe tworzenie eksportera
+
+
+def get_telemetry_exporter():
+    """
+    Zwraca eksporter telemetrii współdzielony przez sesje (tworzony przy pierwszym użyciu)
+
+    Returns:
+        TelemetryExporter: Eksporter lub None jeśli brak kluczy Langfuse
+    """
+    global _EXPORTER
+    if _EXPORTER is None:
+        with _EXPORTER_LOCK:
+            if _EXPORTER is None and check_langfuse_availability():
+                _EXPORTER = TelemetryExporter(
+                    host=os.getenv("LANGFUSE_BASE_URL", "https://cloud.langfuse.com"),  # Host (domyślnie cloud)
+                    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),  # Klucz publiczny
+                    secret_key=os.getenv("LANGFUSE_SECRET_KEY")  # Klucz prywatny
+                )
+                atexit.register(_EXPORTER.close)  # Dosłanie kolejki przy zamknięciu procesu
+    return _EXPORTER
 
 
 def initialize_langfuse_client():
     """
-    Inicjalizuje klienta Langfuse
+    Inicjalizuje eksporter telemetrii Langfuse
     
     Returns:
-        Langfuse: Klient Langfuse lub None jeśli błąd
+        TelemetryExporter: Eksporter współdzielony przez sesje lub None jeśli brak kluczy
     """
-    # Pobierz dane uwierzytelniające z zmiennych środowiskowych
-    secret_key = os.getenv("LANGFUSE_SECRET_KEY")  # Klucz prywatny
-    public_key = os.getenv("LANGFUSE_PUBLIC_KEY")  # Klucz publiczny
-    host = os.getenv("LANGFUSE_BASE_URL", "https://cloud.langfuse.com")  # Host (domyślnie cloud)
+    exporter = get_telemetry_exporter()  # Wspólny eksporter procesu
     
     # Walidacja kluczy
-    if not secret_key or not public_key:  # Jeśli brak któregoś klucza
+    if exporter is None:  # Jeśli brak któregoś klucza
         st.info("ℹ️ Langfuse nie jest skonfigurowane - monitorowanie LLM wyłączone")  # Info
         return None  # Zwróć None
     
-    try:
-        # Utwórz klienta Langfuse
-        client = Langfuse(
-            secret_key=secret_key,  # Klucz prywatny
-            public_key=public_key,  # Klucz publiczny
-            host=host  # Host Langfuse
-        )
-        
-        return client  # Zwróć klienta
-        
-    except Exception as e:  # Jeśli błąd inicjalizacji
-        st.warning(f"⚠️ Błąd inicjalizacji Langfuse: {e}")  # Ostrzeżenie
-        return None  # Zwróć None
+    return exporter  # Zwróć eksporter
 
 
 def create_trace(client, user_name, session_id=None):
@@ -45,12 +260,12 @@ def create_trace(client, user_name, session_id=None):
     Tworzy nowy trace (ślad sesji) w Langfuse
     
     Args:
-        client (Langfuse): Klient Langfuse
+        client (TelemetryExporter): Eksporter telemetrii (initialize_langfuse_client)
         user_name (str): Imię użytkownika
         session_id (str, optional): ID sesji (jeśli None - wygeneruj z timestamp)
         
     Returns:
-        dict: Słownik z informacjami o trace (name, user_id, session_id) lub None jeśli błąd
+        dict: Słownik z informacjami o trace (id, name, user_id, session_id) lub None jeśli błąd
     """
     # Sprawdź czy klient jest dostępny
     if client is None:  # Jeśli brak klienta
@@ -62,11 +277,12 @@ def create_trace(client, user_name, session_id=None):
         if session_id is None:  # Jeśli brak ID
             session_id = f"session_{user_name}_{timestamp}"  # ID sesji
         
-        # W Langfuse 2.x nie używamy client.trace() bezpośrednio
-        # Zamiast tego zwracamy dict z parametrami trace które będą użyte w generation()
+        # Trace trafia do Langfuse razem z pierwszą generacją (jedno zdarzenie trace-create)
         trace_info = {
-            "client": client,  # Zapisz referencję do klienta
-            "name": "halfmarathon_prediction",  # Nazwa trace
+            "client": client,  # Zapisz referencję do eksportera
+            "id": str(uuid.uuid4()),  # ID trace - wspólne dla wszystkich generacji sesji
+            "created": False,  # Czy trace-create jest już w kolejce
+            "name": LANGFUSE_TRACE_NAME,  # Nazwa trace
             "user_id": user_name,  # ID użytkownika
             "session_id": session_id,  # ID sesji
             "metadata": {
@@ -102,14 +318,14 @@ def log_generation(
         metadata (dict, optional): Dodatkowe metadane
         
     Returns:
-        generation: Obiekt generation lub None jeśli błąd
+        dict: Dane generation (dopisane do kolejki) lub None jeśli błąd
     """
     # Sprawdź czy trace jest dostępny
     if trace is None:  # Jeśli brak trace
         return None  # Zwróć None
     
     try:
-        # Pobierz klienta z trace_info
+        # Pobierz eksporter z trace_info
         client = trace.get("client")
         if client is None:
             return None
@@ -126,34 +342,47 @@ def log_generation(
         combined_metadata = {**trace.get("metadata", {}), **metadata}
         combined_metadata['logged_at'] = datetime.now().isoformat()  # Czas logowania
         
-        # W Langfuse 2.x używamy trace() który zwraca obiekt trace
-        # a potem wywołujemy generation() na tym obiekcie
-        trace_obj = client.trace(
-            name=trace.get("name"),
-            user_id=trace.get("user_id"),
-            session_id=trace.get("session_id"),
-            metadata=trace.get("metadata", {})
-        )
-        
-        # Teraz wywołaj generation na obiekcie trace
-        generation = trace_obj.generation(
-            name="ai_commentary_generation",  # Nazwa generowania
-            model=model,  # Model
-            model_parameters={
-                "temperature": 0.7,  # Temperatura (z config)
-                "max_tokens": 300  # Max tokens (z config)
+        # Trace tworzony raz na sesję (zamiast nowego trace przy każdej generacji)
+        if not trace.get("created"):
+            client.enqueue({
+                "id": str(uuid.uuid4()),  # ID zdarzenia
+                "type": "trace-create",  # Utworzenie trace
+                "timestamp": _utc_now(),
+                "body": {
+                    "id": trace["id"],  # ID trace
+                    "name": trace.get("name"),
+                    "userId": trace.get("user_id"),
+                    "sessionId": trace.get("session_id"),
+                    "metadata": trace.get("metadata", {})
+                }
+            })
+            trace["created"] = True
+        
+        # Generacja dopisana do kolejki - wysyłka w tle
+        generation = {
+            "id": str(uuid.uuid4()),  # ID generacji
+            "traceId": trace["id"],  # Trace sesji
+            "name": "ai_commentary_generation",  # Nazwa generowania
+            "model": model,  # Model
+            "modelParameters": {
+                "temperature": OPENAI_TEMPERATURE,  # Temperatura (z config)
+                "max_tokens": OPENAI_MAX_TOKENS  # Max tokens (z config)
             },
-            input=prompt,  # Prompt wejściowy
-            output=completion,  # Wygenerowana odpowiedź
-            usage=usage,  # Zużycie tokenów
-            metadata=combined_metadata  # Metadane
-        )
+            "input": prompt,  # Prompt wejściowy
+            "output": completion,  # Wygenerowana odpowiedź
+            "usage": usage,  # Zużycie tokenów
+            "metadata": combined_metadata,  # Metadane
+            "endTime": _utc_now()  # Czas zakończenia
+        }
+        client.enqueue({
+            "id": str(uuid.uuid4()),  # ID zdarzenia
+            "type": "generation-create",  # Utworzenie generacji
+            "timestamp": _utc_now(),
+            "body": generation
+        })
         
         return generation  # Zwróć generation
         
-    except AttributeError as e:  # Jeśli brak metody
-        st.warning(f"⚠️ Problem z API Langfuse: {e}. Sprawdź dokumentację dla wersji 2.x")
-        return None
     except Exception as e:  # Jeśli błąd
         st.warning(f"⚠️ Nie udało się zalogować generation w Langfuse: {e}")  # Ostrzeżenie
         return None  # Zwróć None
@@ -161,7 +390,7 @@ def log_generation(
 
 def finalize_trace(trace, status="success", output=None):
     """
-    Finalizuje trace (zamyka sesję) - w Langfuse 2.x to jest opcjonalne
+    Finalizuje trace (zamyka sesję) - aktualizacja trace trafia do kolejki, bez flush()
     
     Args:
         trace: Słownik z informacjami o trace
@@ -176,13 +405,27 @@ def finalize_trace(trace, status="success", output=None):
         return False  # Zwróć False
     
     try:
-        # W Langfuse 2.x finalizacja trace jest automatyczna
-        # Możemy opcjonalnie użyć client.flush() aby wymusić wysłanie danych
         client = trace.get("client")
-        if client:
-            client.flush()  # Wyślij wszystkie zgromadzone dane
+        if client is None:
+            return False
+        
+        # trace-create z tym samym ID aktualizuje istniejący trace (upsert)
+        client.enqueue({
+            "id": str(uuid.uuid4()),  # ID zdarzenia
+            "type": "trace-create",
+            "timestamp": _utc_now(),
+            "body": {
+                "id": trace["id"],  # ID trace
+                "name": trace.get("name"),
+                "userId": trace.get("user_id"),
+                "sessionId": trace.get("session_id"),
+                "output": output,  # Końcowy output sesji
+                "metadata": {**trace.get("metadata", {}), "status": status}  # Status sesji
+            }
+        })
+        trace["created"] = True
         
-        return True  # Sukces
+        return True  # Sukces - wysyłka w tle
         
     except Exception as e:  # Jeśli błąd
         st.warning(f"⚠️ Nie udało się sfinalizować trace w Langfuse: {e}")  # Ostrzeżenie
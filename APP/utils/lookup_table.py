@@ -0,0 +1,178 @@
+"""
+Lookup Table - Tablica wszystkich możliwych predykcji modelu
+
+Dziedzina wejść aplikacji jest mała i dyskretna: 2 płcie x roczniki x czasy 5km
+(co sekundę od MIN_TIME_5KM do MAX_TIME_5KM). Tablica int32 z predykcjami dla całej
+siatki jest budowana raz (scripts/build_model_artifacts.py), zapisywana obok .pkl
+i wczytywana przez np.load(mmap_mode='r') - predykcja to odczyt z tablicy.
+Wejścia spoza siatki liczy oryginalny model (fallback).
+"""
+
+import hashlib  # Odcisk pliku modelu
+import json  # Opis tablicy
+import numpy as np  # Tablica predykcji
+import pandas as pd  # Siatka wejść dla modelu
+
+from config import CURRENT_YEAR, MIN_AGE, MAX_AGE, MIN_TIME_5KM, MAX_TIME_5KM, LOOKUP_YEAR_MARGIN  # Zakresy siatki
+
+LOOKUP_FORMAT_VERSION = 1  # Wersja formatu tablicy
+LOOKUP_GENDERS = ('K', 'M')  # Kolejność płci na pierwszej osi tablicy
+
+
+def model_fingerprint(path):
+    """
+    Zwraca odcisk pliku modelu (tablica jest ważna tylko dla tego samego modelu)
+
+    Args:
+        path (str): Ścieżka do pliku .pkl
+
+    Returns:
+        str: 16 znaków sha256 zawartości pliku
+    """
+    with open(path, 'rb') as f:  # Model ma kilka KB - czytamy w całości
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def lookup_grid(current_year=CURRENT_YEAR, year_margin=LOOKUP_YEAR_MARGIN):
+    """
+    Zwraca zakresy osi tablicy
+
+    Args:
+        current_year (int): Rok budowy tablicy
+        year_margin (int): Ile kolejnych lat tablica ma obejmować najmłodszych zawodników
+
+    Returns:
+        dict: rocznik_min, rocznik_max, time_min, time_max (włącznie)
+    """
+    return {
+        'rocznik_min': current_year - MAX_AGE,  # Najstarszy zawodnik
+        'rocznik_max': current_year - MIN_AGE + year_margin,  # Najmłodszy (+ zapas na kolejne lata)
+        'time_min': MIN_TIME_5KM * 60,  # Najszybszy czas 5km (sekundy)
+        'time_max': MAX_TIME_5KM * 60,  # Najwolniejszy czas 5km (sekundy)
+    }
+
+
+def build_lookup_table(model, source_fingerprint, current_year=CURRENT_YEAR, year_margin=LOOKUP_YEAR_MARGIN):
+    """
+    Liczy predykcje modelu dla całej siatki wejść
+
+    Args:
+        model: Model z metodą predict(df) (PyCaret lub CompiledModel)
+        source_fingerprint (str): Odcisk pliku modelu (model_fingerprint)
+        current_year (int): Rok budowy tablicy
+        year_margin (int): Zapas roczników
+
+    Returns:
+        tuple: (np.ndarray int32 [płeć, rocznik, czas 5km], dict z opisem tablicy)
+    """
+    grid = lookup_grid(current_year, year_margin)
+    roczniki = np.arange(grid['rocznik_min'], grid['rocznik_max'] + 1)  # Oś roczników
+    times = np.arange(grid['time_min'], grid['time_max'] + 1)  # Oś czasów (co sekundę)
+    table = np.empty((len(LOOKUP_GENDERS), len(roczniki), len(times)), dtype=np.int32)
+
+    rocznik_grid, time_grid = np.meshgrid(roczniki, times, indexing='ij')  # Wszystkie pary (rocznik, czas)
+    for g, gender in enumerate(LOOKUP_GENDERS):  # Jedno wywołanie modelu na płeć
+        df_input = pd.DataFrame({
+            'Płeć': np.full(rocznik_grid.size, gender, dtype=object),  # 'K' / 'M'
+            '5 km Czas_sekundy': time_grid.ravel(),  # Czas w sekundach
+            'Rocznik': rocznik_grid.ravel(),  # Rok urodzenia
+        })
+        prediction = np.asarray(model.predict(df_input), dtype=np.float64)
+        table[g] = np.trunc(prediction).reshape(rocznik_grid.shape)  # Obcięcie jak int() w predict_time
+
+    meta = {
+        'format_version': LOOKUP_FORMAT_VERSION,  # Wersja formatu
+        'source_fingerprint': source_fingerprint,  # Z jakiego modelu zbudowano tablicę
+        'built_year': current_year,  # Rok budowy
+        'genders': list(LOOKUP_GENDERS),  # Oś 0
+        **grid  # Osie 1 i 2
+    }
+    return table, meta
+
+
+def save_lookup_table(table, meta, table_path, meta_path):
+    """
+    Zapisuje tablicę (.npy) i jej opis (.json)
+
+    Args:
+        table (np.ndarray): Tablica predykcji
+        meta (dict): Opis tablicy
+        table_path (str): Ścieżka pliku .npy
+        meta_path (str): Ścieżka pliku .json
+    """
+    np.save(table_path, table)  # Format .npy pozwala na memory-mapping
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=4)
+
+
+class LookupTableModel:
+    """
+    Model odczytujący predykcje z tablicy, z oryginalnym modelem jako fallback
+
+    Ma metodę predict(df) jak pipeline scikit-learn, więc działa z predict_time
+    i predict_batch bez zmian w kodzie wywołującym.
+    """
+
+    def __init__(self, table, meta, fallback):
+        self.table = table  # Tablica [płeć, rocznik, czas] (memory-mapped)
+        self.meta = meta  # Opis osi
+        self.fallback = fallback  # Model dla wejść spoza siatki
+        self.estimator_name = getattr(fallback, 'estimator_name', type(fallback).__name__)  # Nazwa modelu źródłowego
+        self._rocznik_min = meta['rocznik_min']
+        self._time_min = meta['time_min']
+
+    def predict(self, data):
+        """
+        Przewiduje czasy - odczyt z tablicy, fallback dla wejść spoza siatki
+
+        Args:
+            data (pd.DataFrame): Kolumny 'Płeć', '5 km Czas_sekundy', 'Rocznik'
+
+        Returns:
+            np.ndarray: Predykcje (float64, już obcięte do pełnych sekund dla wejść z siatki)
+        """
+        genders = np.asarray(data['Płeć'], dtype=object)
+        rocznik = np.asarray(data['Rocznik'], dtype=np.float64) - self._rocznik_min  # Indeks osi roczników
+        times = np.asarray(data['5 km Czas_sekundy'], dtype=np.float64) - self._time_min  # Indeks osi czasów
+
+        gender_idx = np.full(len(genders), -1, dtype=np.int64)  # -1 = płeć spoza tablicy
+        for g, gender in enumerate(self.meta['genders']):
+            gender_idx[genders == gender] = g
+
+        _, n_rocznik, n_times = self.table.shape
+        inside = (  # NaN nie spełnia żadnego porównania -> trafia do fallback
+            (gender_idx >= 0) &
+            (rocznik >= 0) & (rocznik < n_rocznik) & (rocznik == np.floor(rocznik)) &
+            (times >= 0) & (times < n_times) & (times == np.floor(times))
+        )
+
+        result = np.empty(len(genders), dtype=np.float64)
+        result[inside] = self.table[
+            gender_idx[inside], rocznik[inside].astype(np.int64), times[inside].astype(np.int64)
+        ]
+        if not inside.all():  # Wejścia spoza siatki - oryginalny model
+            result[~inside] = self.fallback.predict(data.loc[~inside])
+        return result
+
+
+def load_lookup_table(table_path, meta_path, fallback, expected_fingerprint=None):
+    """
+    Wczytuje tablicę predykcji (memory-mapped) i opakowuje model
+
+    Args:
+        table_path (str): Ścieżka pliku .npy
+        meta_path (str): Ścieżka pliku .json
+        fallback: Model dla wejść spoza siatki
+        expected_fingerprint (str): Odcisk aktualnego pliku modelu (None = bez sprawdzania)
+
+    Returns:
+        LookupTableModel: Model lub None, jeśli tablica nie pasuje do modelu
+    """
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format_version') != LOOKUP_FORMAT_VERSION:  # Stary format
+        return None
+    if expected_fingerprint is not None and meta.get('source_fingerprint') != expected_fingerprint:  # Inny model
+        return None
+    table = np.load(table_path, mmap_mode='r')  # Strony pliku ładowane na żądanie
+    return LookupTableModel(table, meta, fallback)
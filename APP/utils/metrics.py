@@ -0,0 +1,198 @@
+"""
+Metrics - Czasy etapów obsługi predykcji (histogramy + eksport Prometheus)
+
+Każdy etap (wczytanie danych, model, predykcja, ranking, komentarz AI...) jest
+mierzony przez stage_timer i trafia do histogramu z przedziałami
+METRICS_LATENCY_BUCKETS. Percentyle p50/p95/p99 liczone są z okna ostatnich
+METRICS_WINDOW_SIZE pomiarów etapu. Rejestr jest jeden na proces (wspólny dla
+sesji); export_prometheus zapisuje go w formacie tekstowym Prometheus
+(np. do odczytu przez node_exporter textfile collector).
+"""
+
+import bisect  # Przedział histogramu
+import os  # Zapis pliku metryk
+import threading  # Sesje Streamlit i wątki robocze działają równolegle
+import time  # Pomiar czasu
+from collections import deque  # Okno ostatnich pomiarów
+from contextlib import contextmanager  # Timer jako menedżer kontekstu
+
+import numpy as np  # Percentyle
+
+from config import METRICS_LATENCY_BUCKETS, METRICS_WINDOW_SIZE, METRICS_PROMETHEUS_PATH, METRICS_EXPORT_SECONDS  # Ustawienia
+
+METRIC_PREFIX = "halfmarathon"  # Prefiks nazw metryk Prometheus
+
+
+class LatencyHistogram:
+    """
+    Histogram czasów jednego etapu (przedziały skumulowane jak w Prometheus) + okno ostatnich pomiarów
+    """
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS, window_size=METRICS_WINDOW_SIZE):
+        self.buckets = tuple(buckets)  # Górne granice przedziałów (sekundy)
+        self.counts = [0] * (len(self.buckets) + 1)  # Ostatni przedział = +Inf
+        self.total = 0.0  # Suma czasów
+        self.count = 0  # Liczba pomiarów
+        self.window = deque(maxlen=window_size)  # Ostatnie pomiary (do percentyli)
+
+    def observe(self, seconds):
+        """Dodaje pomiar (wywoływane pod blokadą rejestru)"""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.window.append(seconds)
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """Percentyle z okna ostatnich pomiarów (sekundy; wywoływane pod blokadą rejestru)"""
+        if not self.window:
+            return {q: None for q in quantiles}
+        values = np.percentile(np.fromiter(self.window, dtype=np.float64), quantiles)
+        return dict(zip(quantiles, (float(v) for v in values)))
+
+
+class MetricsRegistry:
+    """
+    Rejestr histogramów etapów (jeden na proces)
+    """
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS, window_size=METRICS_WINDOW_SIZE):
+        self.buckets = buckets
+        self.window_size = window_size
+        self._stages = {}  # Etap -> LatencyHistogram (kolejność pierwszego pomiaru)
+        self._lock = threading.Lock()
+        self._last_export = 0.0  # Czas ostatniego zapisu pliku Prometheus
+
+    def observe(self, stage, seconds):
+        """
+        Zapisuje czas etapu
+
+        Args:
+            stage (str): Nazwa etapu (np. 'predict_time')
+            seconds (float): Czas trwania
+        """
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = LatencyHistogram(self.buckets, self.window_size)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Mierzy czas bloku kodu (także zakończonego wyjątkiem)
+
+        Użycie:
+            with stage_timer('predict_time'):
+                prediction_result = predict_time(model, df_input)
+
+        Args:
+            stage (str): Nazwa etapu
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def summary(self):
+        """
+        Zwraca podsumowanie etapów (do panelu administratora)
+
+        Returns:
+            list: Słowniki stage, count, mean_ms, p50_ms, p95_ms, p99_ms
+        """
+        rows = []
+        with self._lock:
+            for stage, histogram in self._stages.items():
+                p = histogram.percentiles()
+                rows.append({
+                    'stage': stage,  # Etap
+                    'count': histogram.count,  # Liczba pomiarów
+                    'mean_ms': round(histogram.total / histogram.count * 1000, 1),  # Średnia (ms)
+                    'p50_ms': round(p[50] * 1000, 1),  # Mediana z okna (ms)
+                    'p95_ms': round(p[95] * 1000, 1),
+                    'p99_ms': round(p[99] * 1000, 1)
+                })
+        return rows
+
+    def render_prometheus(self, gauges=None, counters=None):
+        """
+        Zwraca metryki w formacie tekstowym Prometheus
+
+        Args:
+            gauges (dict, optional): Dodatkowe wartości chwilowe nazwa -> liczba
+                (np. wywołania LLM w toku, wpisy cache)
+            counters (dict, optional): Liczniki rosnące od startu procesu nazwa -> liczba
+                (np. trafienia cache) - typ counter z sufiksem _total (rate()/increase()
+                poprawnie obsługują restart)
+
+        Returns:
+            str: Treść w formacie text/plain; version=0.0.4
+        """
+        name = f"{METRIC_PREFIX}_stage_latency_seconds"
+        lines = [
+            f"# HELP {name} Czas etapu obsługi predykcji",
+            f"# TYPE {name} histogram"
+        ]
+        with self._lock:
+            for stage, histogram in self._stages.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+        for gauge, value in (gauges or {}).items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{gauge} gauge")
+            lines.append(f"{METRIC_PREFIX}_{gauge} {value}")
+        for counter, value in (counters or {}).items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{counter}_total counter")
+            lines.append(f"{METRIC_PREFIX}_{counter}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path=METRICS_PROMETHEUS_PATH, gauges=None, counters=None,
+                          min_interval=METRICS_EXPORT_SECONDS):
+        """
+        Zapisuje metryki do pliku (atomowo; najwyżej raz na min_interval sekund)
+
+        Args:
+            path (str): Ścieżka pliku .prom
+            gauges (dict, optional): Dodatkowe wartości chwilowe (render_prometheus)
+            counters (dict, optional): Liczniki rosnące (render_prometheus)
+            min_interval (float): Minimalny odstęp między zapisami (sekundy)
+
+        Returns:
+            bool: True jeśli plik został zapisany
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_export < min_interval:  # Zapis przy każdym rerunie byłby zbędnym I/O
+                return False
+            self._last_export = now
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"  # Plik tymczasowy (collector nie czyta połowy pliku)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render_prometheus(gauges, counters))
+            os.replace(tmp_path, path)  # Atomowa podmiana
+        except OSError:  # Metryki są opcjonalne - aplikacja działa dalej
+            return False
+        return True
+
+
+METRICS = MetricsRegistry()  # Rejestr procesu (wspólny dla sesji i wątków roboczych)
+
+
+def stage_timer(stage):
+    """
+    Mierzy czas etapu w rejestrze procesu
+
+    Args:
+        stage (str): Nazwa etapu
+
+    Returns:
+        contextmanager: Timer (MetricsRegistry.timer)
+    """
+    return METRICS.timer(stage)
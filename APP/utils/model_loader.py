@@ -1,47 +1,350 @@
 """
 Model Loader - Moduł do ładowania modelu z lokalnego folderu
+
+Rejestr wersji: folder model/ zawiera artefakty (<nazwa>.pkl, skompilowany model,
+tablica predykcji, metadane <nazwa>_info.json), a manifest.json wskazuje wersję
+aktywną i poprzednią. Zmiana manifestu podmienia model bez restartu aplikacji.
 """
 
-import streamlit as st  # Framework Streamlit
+import json  # Manifest i metadane wersji
 import os  # Operacje systemowe
-from pycaret.regression import load_model  # PyCaret do ładowania modelu
+import threading  # Ładowanie nowej wersji w tle
 
-@st.cache_resource  # Cache'uj model - wczytaj tylko raz
-def load_model_from_local():
+import streamlit as st  # Framework Streamlit
+from config import (  # Ustawienia modelu
+    MODEL_DIR, MODEL_NAME, COMPILED_MODEL_SUFFIX, USE_COMPILED_MODEL,
+    LOOKUP_TABLE_SUFFIX, LOOKUP_META_SUFFIX, USE_LOOKUP_TABLE,
+    MODEL_MANIFEST_FILE, MODEL_INFO_SUFFIX
+)
+from utils.compiled_model import load_compiled_model  # Model w czystym NumPy (bez PyCaret)
+from utils.lookup_table import load_lookup_table, model_fingerprint  # Tablica wszystkich predykcji
+
+
+def load_model_version(version, model_dir=MODEL_DIR, notify=st.warning):
     """
-    Ładuje model ML z lokalnego folderu model/
+    Ładuje jedną wersję modelu z folderu model/ (bez komunikatów - działa też w wątku w tle)
     
+    Args:
+        version (str): Nazwa artefaktu (bez rozszerzenia .pkl)
+        model_dir (str): Folder z modelami
+        notify (callable): Funkcja dla ostrzeżeń (np. niepasująca tablica predykcji)
+        
     Returns:
-        model: Wczytany model PyCaret/scikit-learn
+        model: Skompilowany model, pipeline PyCaret lub LookupTableModel
         
     Raises:
-        Exception: Jeśli nie udało się wczytać modelu
+        FileNotFoundError: Jeśli brak artefaktów tej wersji
     """
-    try:
-        # Określ ścieżkę do modelu
-        current_dir = os.path.dirname(os.path.dirname(__file__))  # Folder APP
-        model_path = os.path.join(current_dir, "model", "halfmarathon_model_3features_20260115_224149")
-        
-        # Sprawdź czy plik istnieje
-        if not os.path.exists(model_path + ".pkl"):
-            st.error(f"❌ Nie znaleziono pliku modelu: {model_path}.pkl")
-            st.info("💡 Upewnij się, że plik modelu znajduje się w folderze APP/model/")
-            st.stop()
-        
-        # Wyświetl status ładowania
-        with st.spinner("⏳ Ładowanie modelu z lokalnego folderu..."):
-            # Załaduj model przez PyCaret (bez rozszerzenia .pkl)
-            model = load_model(model_path)
+    model_path = os.path.join(model_dir, version)  # Ścieżka bez rozszerzenia
+    
+    # Skompilowany model (JSON + NumPy) - nie wymaga importu PyCaret
+    compiled_path = model_path + COMPILED_MODEL_SUFFIX
+    if USE_COMPILED_MODEL and os.path.exists(compiled_path):
+        model = load_compiled_model(compiled_path)  # Wczytaj parametry i współczynniki
+        return attach_lookup_table(model, model_path, notify)  # Tablica predykcji (jeśli zbudowana)
+    
+    if not os.path.exists(model_path + ".pkl"):
+        raise FileNotFoundError(f"Nie znaleziono pliku modelu: {model_path}.pkl")
+    
+    # Import PyCaret dopiero tutaj - trwa kilka sekund i zajmuje setki MB
+    from pycaret.regression import load_model  # PyCaret do ładowania modelu
+    model = load_model(model_path, verbose=False)  # Bez rozszerzenia .pkl
+    return attach_lookup_table(model, model_path, notify)  # Tablica predykcji (jeśli zbudowana)
+
+
+def read_model_info(version, model_dir=MODEL_DIR):
+    """
+    Wczytuje metadane wersji (<nazwa>_info.json z notebooka treningowego)
+    
+    Args:
+        version (str): Nazwa artefaktu
+        model_dir (str): Folder z modelami
+        
+    Returns:
+        dict: Metadane (pusty słownik, jeśli brak pliku)
+    """
+    info_path = os.path.join(model_dir, version + MODEL_INFO_SUFFIX)
+    if not os.path.exists(info_path):
+        return {}
+    with open(info_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def scan_model_versions(model_dir=MODEL_DIR):
+    """
+    Wyszukuje wersje modelu w folderze (plik .pkl lub skompilowany model)
+    
+    Args:
+        model_dir (str): Folder z modelami
+        
+    Returns:
+        list: Słowniki {version, info, has_pkl, has_compiled, has_lookup}, najnowsze na początku
+    """
+    names = set()
+    for file_name in os.listdir(model_dir):
+        if file_name.endswith(".pkl"):
+            names.add(file_name[:-len(".pkl")])
+        elif file_name.endswith(COMPILED_MODEL_SUFFIX):
+            names.add(file_name[:-len(COMPILED_MODEL_SUFFIX)])
+    
+    versions = []
+    for name in sorted(names, reverse=True):  # Nazwy kończą się datą treningu
+        path = os.path.join(model_dir, name)
+        versions.append({
+            'version': name,  # Nazwa artefaktu
+            'info': read_model_info(name, model_dir),  # Metadane z treningu
+            'has_pkl': os.path.exists(path + ".pkl"),  # Pipeline PyCaret
+            'has_compiled': os.path.exists(path + COMPILED_MODEL_SUFFIX),  # Model NumPy
+            'has_lookup': os.path.exists(path + LOOKUP_TABLE_SUFFIX)  # Tablica predykcji
+        })
+    return versions
+
+
+def read_manifest(manifest_path=MODEL_MANIFEST_FILE):
+    """
+    Wczytuje manifest z aktywną i poprzednią wersją
+    
+    Args:
+        manifest_path (str): Ścieżka manifestu
+        
+    Returns:
+        dict: {'active': nazwa, 'previous': nazwa lub None} - bez pliku aktywny jest MODEL_NAME
+    """
+    if not os.path.exists(manifest_path):
+        return {'active': MODEL_NAME, 'previous': None}
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if not isinstance(manifest.get('active'), str) or not manifest['active']:
+        raise ValueError(f"Manifest {manifest_path} nie wskazuje aktywnej wersji ('active')")
+    return {'active': manifest['active'], 'previous': manifest.get('previous')}
+
+
+def write_manifest(active, previous, manifest_path=MODEL_MANIFEST_FILE):
+    """
+    Zapisuje manifest atomowo (plik tymczasowy + os.replace)
+    
+    Args:
+        active (str): Wersja aktywna
+        previous (str): Wersja poprzednia (do wycofania) lub None
+        manifest_path (str): Ścieżka manifestu
+    """
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"  # Aplikacja nigdy nie czyta niepełnego pliku
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'active': active, 'previous': previous}, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def validate_model(model):
+    """
+    Sprawdza nowy model jedną predykcją przed podmianą
+    
+    Args:
+        model: Wczytany model
+        
+    Raises:
+        ValueError: Jeśli predykcja nie jest dodatnim czasem
+    """
+    from utils.predictor import predict_batch  # Import lokalny - predictor nie zależy od model_loader
+    seconds = predict_batch(model, genders=['M'], ages=[30], times_5km_seconds=[25 * 60])['time_seconds'].iloc[0]
+    if not seconds > 0:
+        raise ValueError(f"Model zwrócił niepoprawny czas: {seconds}")
+
+
+class ModelRegistry:
+    """
+    Rejestr wersji modelu z podmianą bez przestoju
+    
+    Aktywną wersję wskazuje manifest. Zmiana manifestu (refresh) ładuje nową wersję
+    w wątku w tle - do czasu podmiany predykcje liczy dotychczasowy model. Podmiana
+    to jedno przypisanie (current() zawsze zwraca spójną parę wersja/model), a
+    poprzednia wersja zostaje w pamięci, więc wycofanie jest natychmiastowe.
+    """
+    
+    def __init__(self, model_dir=MODEL_DIR, manifest_path=MODEL_MANIFEST_FILE):
+        self.model_dir = model_dir  # Folder z artefaktami
+        self.manifest_path = manifest_path  # Manifest z aktywną wersją
+        self._lock = threading.Lock()  # Zmiany stanu (odczyt current() bez blokady)
+        self._manifest_stamp = None  # (mtime, rozmiar) ostatnio wczytanego manifestu
+        self._previous = None  # Poprzednia wersja (gotowa do wycofania)
+        self._loading = None  # Wersja ładowana w tle
+        self.last_error = None  # Ostatni błąd ładowania
+        self.warnings = []  # Ostrzeżenia z ładowania (np. tablica predykcji)
+        self.swaps = 0  # Liczba podmian
+        
+        manifest = self._read_manifest()
+        self._active = self._load(manifest['active'])  # Pierwsza wersja - ładowanie synchroniczne
+        if manifest['previous'] and manifest['previous'] != manifest['active']:
+            try:
+                self._previous = self._load(manifest['previous'])  # Rozgrzana do wycofania
+            except Exception as e:  # Brak poprzedniej wersji nie blokuje startu
+                self.last_error = f"{manifest['previous']}: {e}"
+    
+    def _read_manifest(self):
+        """Wczytuje manifest i zapamiętuje jego znacznik"""
+        self._manifest_stamp = self._stamp()
+        return read_manifest(self.manifest_path)
+    
+    def _stamp(self):
+        """Znacznik zmiany manifestu (None, jeśli brak pliku)"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _load(self, version):
+        """Ładuje wersję i jej metadane"""
+        model = load_model_version(version, self.model_dir, notify=self.warnings.append)
+        return {'version': version, 'model': model, 'info': read_model_info(version, self.model_dir)}
+    
+    def _swap(self, loaded):
+        """Podmienia aktywną wersję (wywoływane pod blokadą)"""
+        self._previous, self._active = self._active, loaded  # Odczyt current() widzi starą albo nową wersję
+        self.swaps += 1
+        self.last_error = None
+    
+    def current(self):
+        """
+        Zwraca aktywną wersję (jeden odczyt - spójna para wersja/model na cały przebieg skryptu)
+        
+        Returns:
+            dict: {'version', 'model', 'info'}
+        """
+        return self._active
+    
+    def refresh(self):
+        """
+        Sprawdza manifest i w razie zmiany przełącza wersję
+        
+        Poprzednia wersja jest podmieniana od razu (jest w pamięci), inna ładuje się w tle.
+        Wywołanie bez zmiany manifestu to tylko os.stat.
+        """
+        stamp = self._stamp()
+        if stamp is None or stamp == self._manifest_stamp:  # Bez manifestu lub bez zmian
+            return
+        try:
+            target = self._read_manifest()['active']
+        except (OSError, ValueError) as e:  # Uszkodzony manifest - zostaje obecna wersja
+            self.last_error = f"Manifest: {e}"
+            return
+        
+        with self._lock:
+            if target == self._active['version'] or target == self._loading:
+                return
+            if self._previous is not None and target == self._previous['version']:  # Wycofanie
+                self._swap(self._previous)
+                return
+            self._loading = target
+        threading.Thread(target=self._load_in_background, args=(target,), daemon=True,
+                         name=f"model-load-{target}").start()
+    
+    def _load_in_background(self, version):
+        """Ładuje i sprawdza wersję w tle, potem podmienia ją atomowo"""
+        try:
+            loaded = self._load(version)
+            validate_model(loaded['model'])  # Błędny model nie trafia do użytkowników
+        except Exception as e:
+            with self._lock:
+                self.last_error = f"{version}: {e}"
+                if self._loading == version:
+                    self._loading = None
+            return
+        with self._lock:
+            if self._loading != version:  # Manifest zmienił się w trakcie ładowania
+                return
+            self._swap(loaded)
+            self._loading = None
+    
+    def activate(self, version):
+        """
+        Ustawia wersję jako aktywną (manifest) i uruchamia jej ładowanie
+        
+        Args:
+            version (str): Nazwa artefaktu w folderze model/
             
-        # Oblicz rozmiar pliku
-        file_size_mb = os.path.getsize(model_path + ".pkl") / 1024 / 1024
-        st.success(f"✅ Model załadowany pomyślnie z lokalnego folderu! (rozmiar: {file_size_mb:.2f} MB)")
+        Raises:
+            ValueError: Jeśli wersji nie ma w folderze
+        """
+        if version not in {v['version'] for v in scan_model_versions(self.model_dir)}:
+            raise ValueError(f"Brak wersji {version} w {self.model_dir}")
+        write_manifest(version, self._active['version'], self.manifest_path)
+        self.refresh()
+    
+    def rollback(self):
+        """
+        Przywraca poprzednią wersję (natychmiast - jest w pamięci)
         
+        Raises:
+            ValueError: Jeśli brak poprzedniej wersji
+        """
+        previous = self._previous
+        if previous is None:
+            raise ValueError("Brak poprzedniej wersji do przywrócenia")
+        write_manifest(previous['version'], self._active['version'], self.manifest_path)
+        self.refresh()
+    
+    def status(self):
+        """
+        Zwraca stan rejestru (do panelu i monitoringu)
+        
+        Returns:
+            dict: active, previous, loading, error, swaps
+        """
+        previous = self._previous
+        return {
+            'active': self._active['version'],  # Wersja obsługująca predykcje
+            'previous': previous['version'] if previous else None,  # Gotowa do wycofania
+            'loading': self._loading,  # Wersja ładowana w tle
+            'error': self.last_error,  # Ostatni błąd ładowania
+            'swaps': self.swaps  # Liczba podmian
+        }
+
+
+@st.cache_resource  # Jeden rejestr na proces - przetrwa zmianę wersji modelu
+def get_model_registry():
+    """
+    Zwraca rejestr modeli procesu (pierwsze wywołanie ładuje aktywną wersję)
+    
+    Returns:
+        ModelRegistry: Rejestr z wersją z manifestu
+    """
+    return ModelRegistry()
+
+
+def load_model_from_local():
+    """
+    Zwraca aktywny model z rejestru (wersja z manifestu w folderze model/)
+    
+    Returns:
+        model: Wczytany model PyCaret/scikit-learn
+    """
+    return get_model_registry().current()['model']
+
+
+def attach_lookup_table(model, model_path, notify=st.warning):
+    """
+    Opakowuje model tablicą wszystkich predykcji, jeśli jest zbudowana dla tego modelu
+    
+    Args:
+        model: Wczytany model (fallback dla wejść spoza tablicy)
+        model_path (str): Ścieżka modelu (bez rozszerzenia)
+        notify (callable): Funkcja dla ostrzeżenia o niepasującej tablicy
+        
+    Returns:
+        model: LookupTableModel lub niezmieniony model
+    """
+    table_path = model_path + LOOKUP_TABLE_SUFFIX  # Tablica int32
+    meta_path = model_path + LOOKUP_META_SUFFIX  # Opis osi
+    if not USE_LOOKUP_TABLE or not os.path.exists(table_path) or not os.path.exists(meta_path):
+        return model  # Brak tablicy - predykcje liczy model
+    
+    # Tablica musi pochodzić z aktualnego pliku .pkl (po treningu trzeba ją przebudować)
+    fingerprint = model_fingerprint(model_path + ".pkl") if os.path.exists(model_path + ".pkl") else None
+    lookup_model = load_lookup_table(table_path, meta_path, model, fingerprint)
+    if lookup_model is None:  # Tablica z innego modelu
+        notify("⚠️ Tablica predykcji nie pasuje do modelu - uruchom scripts/build_model_artifacts.py")
         return model
-                
-    except Exception as e:  # Inny błąd
-        st.error(f"❌ Nieoczekiwany błąd podczas ładowania modelu: {e}")
-        st.stop()
+    return lookup_model
 
 
 def get_model_info(model):
@@ -57,9 +360,19 @@ def get_model_info(model):
     try:
         info = {}  # Pusty słownik
         
+        # Tablica predykcji - opisz model źródłowy
+        if hasattr(model, 'fallback'):  # LookupTableModel
+            info['is_lookup_table'] = True  # Predykcja = odczyt z tablicy
+            model = model.fallback  # Dalsze informacje o modelu źródłowym
+        
         # Pobierz nazwę klasy modelu
         info['model_name'] = type(model).__name__  # Nazwa klasy
         
+        # Skompilowany model - podaj nazwę oryginalnego estymatora
+        if hasattr(model, 'estimator_name'):  # CompiledModel
+            info['model_name'] = model.estimator_name  # Np. PassiveAggressiveRegressor
+            info['is_compiled'] = True  # Predykcja w czystym NumPy
+        
         # Pobierz moduł
         info['model_module'] = type(model).__module__  # Moduł (sklearn, pycaret itp.)
         
@@ -3,23 +3,66 @@ OpenAI Helper - Moduł do generowania komentarzy AI za pomocą GPT-4
 """
 
 import streamlit as st  # Framework Streamlit
+import atexit  # Zapis cache komentarzy przy zamknięciu procesu
+import json  # Zapis cache komentarzy
 import os  # Operacje systemowe
-from config import OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS  # Stałe z config
+import threading  # Blokada cache (sesje Streamlit działają w wątkach)
+import time  # TTL wpisów cache
+from collections import OrderedDict  # Kolejność LRU
+from config import (  # Stałe z config
+    OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS,
+    OPENAI_TIMEOUT_SECONDS, OPENAI_CONNECT_TIMEOUT_SECONDS, OPENAI_MAX_CONNECTIONS,
+    COMMENTARY_CACHE_PATH, COMMENTARY_CACHE_SIZE, COMMENTARY_CACHE_TTL_SECONDS, COMMENTARY_CACHE_SAVE_SECONDS,
+    COMMENTARY_TIME_BUCKET_SECONDS, COMMENTARY_PERCENTILE_BUCKET,
+    COMMENTARY_NAME_PLACEHOLDER, COMMENTARY_TIME_PLACEHOLDER, COMMENTARY_BANK_PATH
+)
+from utils.circuit_breaker import CircuitBreaker, call_with_retries  # Odporność na awarie API
+from utils.admission import AdmissionController, AdmissionRejected  # Limity wywołań przy szczytowym ruchu
+from utils.commentary_bank import load_commentary_bank  # Komentarze wygenerowane z wyprzedzeniem
+from utils.metrics import METRICS, stage_timer  # Czasy etapów
+from utils.langfuse_helper import get_telemetry_exporter, create_trace, log_generation, finalize_trace  # Telemetria w tle
 
-# Spróbuj użyć Langfuse OpenAI wrapper dla automatycznego logowania
-# Jeśli Langfuse nie jest dostępny, użyj standardowego OpenAI
-try:
-    from langfuse.openai import OpenAI  # Langfuse wrapper dla OpenAI
-    LANGFUSE_AVAILABLE = True
-except ImportError:
-    from openai import OpenAI  # Standardowy OpenAI client
-    LANGFUSE_AVAILABLE = False
+# Wspólny klient (pula połączeń keep-alive), circuit breaker i kontrola dopuszczania - jeden na proces
+_CLIENT = None  # Tworzony przy pierwszym użyciu
+_CLIENT_LOCK = threading.Lock()  # Sesje Streamlit i wątki robocze działają równolegle
+OPENAI_CIRCUIT = CircuitBreaker()  # Obwód chroniący API OpenAI
+OPENAI_ADMISSION = AdmissionController()  # Limit równoległych wywołań + token buckety sesji i globalny
+
+
+def _create_openai_client(api_key):
+    """Tworzy klienta OpenAI z pulą połączeń i limitami czasu (ponowienia obsługuje call_with_retries)"""
+    from openai import OpenAI  # Leniwy import (~1 s) - telemetria Langfuse idzie przez eksporter, nie wrapper
+    from openai import DefaultHttpxClient  # Klient httpx z ustawieniami domyślnymi OpenAI
+    import httpx  # Limity czasu i puli (zależność pakietu openai)
+    
+    timeout = httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS)
+    http_client = DefaultHttpxClient(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS)
+    )
+    return OpenAI(api_key=api_key, http_client=http_client, timeout=timeout, max_retries=0)
+
+
+def get_openai_client():
+    """
+    Zwraca wspólny klient OpenAI (jeden na proces, bez wywołań Streamlit)
+    
+    Returns:
+        OpenAI: Klient lub None jeśli brak OPENAI_API_KEY
+    """
+    global _CLIENT
+    api_key = os.getenv("OPENAI_API_KEY")  # Klucz API
+    if not api_key:
+        return None
+    with _CLIENT_LOCK:
+        if _CLIENT is None:  # Pierwsze użycie w procesie
+            _CLIENT = _create_openai_client(api_key)
+        return _CLIENT
 
 
 def initialize_openai_client():
     """
     Inicjalizuje klienta OpenAI z API key
-    Automatycznie używa Langfuse wrapper jeśli dostępny
     
     Returns:
         OpenAI: Klient OpenAI lub None jeśli błąd
@@ -33,12 +76,12 @@ def initialize_openai_client():
         return None  # Zwróć None
     
     try:
-        # Utwórz klienta OpenAI (z Langfuse wrapper jeśli dostępny)
-        client = OpenAI(api_key=api_key)  # Inicjalizacja klienta
+        # Wspólny klient OpenAI
+        client = get_openai_client()  # Tworzony raz na proces, pula połączeń keep-alive
         
         # Informuj o statusie Langfuse
-        if LANGFUSE_AVAILABLE and os.getenv("LANGFUSE_SECRET_KEY") and os.getenv("LANGFUSE_PUBLIC_KEY"):
-            st.sidebar.info("📊 Langfuse: monitoring aktywny (OpenAI wrapper)")
+        if get_telemetry_exporter() is not None:
+            st.sidebar.info("📊 Langfuse: monitoring aktywny (eksport w tle)")
         
         return client  # Zwróć klienta
         
@@ -47,99 +90,592 @@ def initialize_openai_client():
         return None  # Zwróć None
 
 
-def generate_commentary(
-    client,
-    user_name,
-    predicted_time_formatted,
-    gender,
-    age,
-    age_category,
-    category_stats,
-    ranking_info
-):
+class CommentaryCache:
+    """
+    Cache komentarzy AI (LRU + TTL) zapisywany do pliku JSON
+    
+    Kluczem są wejścia sprowadzone do przedziałów (kategoria, płeć, przedział czasu,
+    przedział "szybszy niż X%"), więc jeden komentarz obsługuje wielu użytkowników.
+    Imię i dokładny czas są wstawiane dopiero przy wyświetlaniu (render_commentary).
+    
+    Plik jest zapisywany najwyżej raz na save_interval sekund (zmiany z tego okresu
+    trafiają do jednego zapisu) i przy zamknięciu procesu (flush). Zapisy są szeregowane,
+    a licznik zmian pomija migawkę starszą od już zapisanej.
+    """
+    
+    def __init__(self, path=COMMENTARY_CACHE_PATH, max_size=COMMENTARY_CACHE_SIZE, ttl_seconds=COMMENTARY_CACHE_TTL_SECONDS,
+                 save_interval=COMMENTARY_CACHE_SAVE_SECONDS):
+        self.path = path  # Plik JSON (None = tylko w pamięci)
+        self.max_size = max_size  # Limit wpisów
+        self.ttl_seconds = ttl_seconds  # Czas życia wpisu
+        self.save_interval = save_interval  # Minimalny odstęp między zapisami pliku
+        self._entries = OrderedDict()  # Klucz -> (czas zapisu, komentarz); kolejność = ostatnie użycie
+        self._lock = threading.Lock()  # Sesje Streamlit działają w wątkach
+        self._save_lock = threading.Lock()  # Jeden zapis pliku naraz (kolejność migawek)
+        self._generation = 0  # Licznik zmian wpisów
+        self._saved_generation = 0  # Zmiana zawarta w ostatnio zapisanym pliku
+        self._last_save = 0.0  # Czas ostatniego zapisu (time.monotonic)
+        self.hits = 0  # Trafienia
+        self.misses = 0  # Chybienia (w tym wpisy przeterminowane)
+        self.evictions = 0  # Wpisy usunięte przez limit rozmiaru
+        self.expirations = 0  # Wpisy usunięte przez TTL
+        self._load()
+    
+    @staticmethod
+    def _serialize_key(key):
+        """Klucz krotki -> tekst (klucze JSON muszą być tekstem)"""
+        return "|".join(str(part) for part in key)
+    
+    def get(self, key):
+        """
+        Zwraca komentarz z cache
+        
+        Args:
+            key (tuple): Klucz z commentary_cache_key
+            
+        Returns:
+            str: Szablon komentarza lub None (brak lub przeterminowany)
+        """
+        key = self._serialize_key(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:  # Przeterminowany
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)  # Ostatnio użyty
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, commentary):
+        """
+        Zapisuje komentarz w cache (i w pliku)
+        
+        Args:
+            key (tuple): Klucz z commentary_cache_key
+            commentary (str): Szablon komentarza (ze znacznikami imienia i czasu)
+        """
+        with self._lock:
+            self._entries[self._serialize_key(key)] = (time.time(), commentary)
+            self._entries.move_to_end(self._serialize_key(key))
+            while len(self._entries) > self.max_size:  # Usuń najdawniej używane
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._generation += 1
+        if time.monotonic() - self._last_save >= self.save_interval:  # Reszta zmian trafi do kolejnego zapisu
+            self.flush()
+    
+    def flush(self):
+        """Zapisuje wpisy do pliku, jeśli zmieniły się od ostatniego zapisu"""
+        with self._save_lock:  # Migawka pobierana w kolejności zapisów - starsza nie nadpisze nowszej
+            with self._lock:
+                if self._generation == self._saved_generation:  # Zmiany już zapisane (np. przez inny wątek)
+                    return
+                generation = self._generation
+                snapshot = list(self._entries.items())  # Kopia do zapisu poza blokadą wpisów
+            self._last_save = time.monotonic()
+            if self._save(snapshot):
+                self._saved_generation = generation
+    
+    def stats(self):
+        """
+        Zwraca liczniki cache (do monitoringu)
+        
+        Returns:
+            dict: hits, misses, hit_rate (%), size, evictions, expirations
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,  # Trafienia
+                'misses': self.misses,  # Chybienia
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,  # Skuteczność (%)
+                'size': len(self._entries),  # Liczba wpisów
+                'evictions': self.evictions,  # Usunięte przez limit
+                'expirations': self.expirations  # Usunięte przez TTL
+            }
+    
+    def _load(self):
+        """Wczytuje wpisy z pliku (pomija przeterminowane)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f)  # Lista [klucz, czas zapisu, komentarz] od najdawniej użytych
+        except (OSError, ValueError):  # Uszkodzony plik - zaczynamy od pustego cache
+            return
+        now = time.time()
+        for key, created_at, commentary in stored[-self.max_size:]:
+            if now - created_at <= self.ttl_seconds:
+                self._entries[key] = (created_at, commentary)
+    
+    def _save(self, snapshot):
+        """Zapisuje wpisy do pliku (atomowo - tmp + os.replace; wywoływane pod _save_lock)"""
+        if not self.path:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Plik tymczasowy
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump([[key, created_at, text] for key, (created_at, text) in snapshot], f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)  # Atomowa podmiana
+        except OSError:  # Cache jest opcjonalny - komentarz i tak zostaje w pamięci
+            return False
+        return True
+
+
+@st.cache_resource  # Jeden cache na proces (wspólny dla wszystkich sesji)
+def get_commentary_cache():
+    """
+    Zwraca wspólny cache komentarzy AI
+    
+    Returns:
+        CommentaryCache: Cache wczytany z COMMENTARY_CACHE_PATH
+    """
+    cache = CommentaryCache()
+    atexit.register(cache.flush)  # Zmiany sprzed ostatniego zapisu trafiają do pliku przy zamknięciu
+    return cache
+
+
+@st.cache_resource(max_entries=1)  # Jedno połączenie z bankiem na proces (na wersję pliku)
+def _open_commentary_bank(mtime):
+    """Otwiera bank dla danej wersji pliku (mtime tylko jako klucz cache)"""
+    return load_commentary_bank(COMMENTARY_BANK_PATH)
+
+
+def get_commentary_bank():
     """
-    Generuje komentarz AI na temat wyniku użytkownika
+    Zwraca bank komentarzy wygenerowanych z wyprzedzeniem (scripts/pregenerate_commentary.py)
+    
+    Brak pliku nie jest zapamiętywany - bank wygenerowany po starcie aplikacji zostanie
+    otwarty przy kolejnym wywołaniu, a podmieniony plik (nowy mtime) otwarty ponownie.
+    
+    Returns:
+        CommentaryBank: Bank lub None, jeśli plik COMMENTARY_BANK_PATH nie istnieje
+    """
+    try:
+        mtime = os.path.getmtime(COMMENTARY_BANK_PATH)  # Jeden stat na wywołanie
+    except OSError:  # Brak pliku - bez cache
+        return None
+    return _open_commentary_bank(mtime)
+
+
+def _stored_commentary(cache, key):
+    """Komentarz z banku, a gdy go brak - z cache (bez wywołania API)"""
+    bank = get_commentary_bank()
+    template = bank.get(key) if bank is not None else None  # Odczyt z indeksu SQLite
+    return template if template is not None else cache.get(key)
+
+
+def commentary_cache_key(age_category, gender, predicted_time_seconds, faster_than_percent):
+    """
+    Buduje klucz cache z wejść sprowadzonych do przedziałów
     
     Args:
-        client (OpenAI): Klient OpenAI
+        age_category (str): Kategoria wiekowa (np. 'M30')
+        gender (str): Płeć ('M' lub 'K')
+        predicted_time_seconds (int): Przewidywany czas w sekundach
+        faster_than_percent (float): Procent wolniejszych zawodników (None jeśli brak danych)
+        
+    Returns:
+        tuple: (kategoria, płeć, przedział czasu, przedział procentowy)
+    """
+    time_bucket = int(predicted_time_seconds // COMMENTARY_TIME_BUCKET_SECONDS)  # Np. 5 min
+    if faster_than_percent is None:  # Brak danych rankingowych
+        percent_bucket = -1
+    else:  # 100% trafia do ostatniego przedziału
+        percent_bucket = min(int(faster_than_percent // COMMENTARY_PERCENTILE_BUCKET), 100 // COMMENTARY_PERCENTILE_BUCKET - 1)
+    return (age_category, gender, time_bucket, percent_bucket)
+
+
+def render_commentary(template, user_name, predicted_time_formatted):
+    """
+    Wstawia imię i przewidywany czas do komentarza z cache
+    
+    Args:
+        template (str): Komentarz ze znacznikami COMMENTARY_NAME_PLACEHOLDER / COMMENTARY_TIME_PLACEHOLDER
         user_name (str): Imię użytkownika
         predicted_time_formatted (str): Przewidywany czas (H:MM:SS)
+        
+    Returns:
+        str: Komentarz dla użytkownika
+    """
+    return (template
+            .replace(COMMENTARY_NAME_PLACEHOLDER, user_name)
+            .replace(COMMENTARY_TIME_PLACEHOLDER, predicted_time_formatted))
+
+
+def _format_bucket_time(seconds):
+    """Sekundy -> H:MM (granice przedziałów czasu w prompcie)"""
+    return f"{int(seconds) // 3600}:{(int(seconds) % 3600) // 60:02d}"
+
+
+def build_commentary_request(predicted_time_formatted, gender, age_category, category_stats, ranking_info):
+    """
+    Buduje klucz cache i prompt komentarza (bez danych konkretnego użytkownika)
+    
+    Args:
+        predicted_time_formatted (str): Przewidywany czas (H:MM:SS)
         gender (str): Płeć ('M' lub 'K')
-        age (int): Wiek
         age_category (str): Kategoria wiekowa (np. 'M35')
         category_stats (dict): Statystyki kategorii (mean, median, min, max)
-        ranking_info (dict): Informacje o pozycji (estimated_position, percentile)
+        ranking_info (dict): Informacje o pozycji (estimated_position, faster_than_percent)
         
     Returns:
-        str: Wygenerowany komentarz AI lub None jeśli błąd
+        tuple: (klucz cache, prompt ze znacznikami imienia i czasu)
     """
-    # Sprawdź czy klient jest dostępny
-    if client is None:  # Jeśli brak klienta
-        return None  # Zwróć None
+    # Klucz cache z wejść sprowadzonych do przedziałów
+    hours, minutes, seconds = (int(part) for part in predicted_time_formatted.split(':'))
+    predicted_time_seconds = hours * 3600 + minutes * 60 + seconds  # H:MM:SS -> sekundy
+    has_ranking = ranking_info['estimated_position'] is not None  # Czy są dane rankingowe
+    key = commentary_cache_key(
+        age_category, gender, predicted_time_seconds,
+        ranking_info['faster_than_percent'] if has_ranking else None
+    )
     
     # Przygotuj płeć po polsku
     gender_pl = "mężczyzna" if gender == 'M' else "kobieta"  # Polskie oznaczenie
     
     # Przygotuj statystyki kategorii
-    if category_stats['count'] > 0:  # Jeśli są dane w kategorii
+    if category_stats.get('mean') is not None:  # Są czasy w kategorii (count liczy też niesklasyfikowanych)
         mean_time = f"{category_stats['mean']//3600}:{(category_stats['mean']%3600)//60:02d}:{category_stats['mean']%60:02d}"
         median_time = f"{category_stats['median']//3600}:{(category_stats['median']%3600)//60:02d}:{category_stats['median']%60:02d}"
         stats_text = f"Średni czas w kategorii {age_category}: {mean_time}, mediana: {median_time}"
     else:  # Brak danych
         stats_text = f"Brak danych historycznych dla kategorii {age_category}"
     
-    # Przygotuj informacje o pozycji
-    if ranking_info['estimated_position'] is not None:  # Jeśli są dane rankingowe
-        ranking_text = f"Szacowana pozycja: {ranking_info['estimated_position']}/{ranking_info['total_runners']} (percentyl: {ranking_info['percentile']})"
-        faster_text = f"Byłbyś szybszy niż {ranking_info['faster_than_percent']}% zawodników w tej kategorii"
+    # Przedział czasu z klucza cache (komentarz musi pasować do całego przedziału)
+    time_bucket, percent_bucket = key[2], key[3]
+    bucket_start = time_bucket * COMMENTARY_TIME_BUCKET_SECONDS
+    time_range = f"{_format_bucket_time(bucket_start)}-{_format_bucket_time(bucket_start + COMMENTARY_TIME_BUCKET_SECONDS)}"
+    
+    # Przygotuj informacje o pozycji (przedział zamiast dokładnej pozycji)
+    if has_ranking:  # Jeśli są dane rankingowe
+        percent_low = percent_bucket * COMMENTARY_PERCENTILE_BUCKET
+        ranking_text = f"Wynik w kategorii: szybszy niż {percent_low}-{percent_low + COMMENTARY_PERCENTILE_BUCKET}% zawodników"
     else:  # Brak danych
         ranking_text = "Brak danych rankingowych"
-        faster_text = ""
     
-    # Stwórz prompt dla GPT
+    # Stwórz prompt dla GPT (bez imienia i dokładnego czasu - znaczniki uzupełniane przy wyświetlaniu)
     prompt = f"""
     Jesteś ekspertem od biegania i trenerem. Przeanalizuj poniższe wyniki przewidywanego czasu w półmaratonie i napisz krótki, motywujący komentarz (2-3 zdania) w języku polskim.
     
     Dane zawodnika:
-    - Imię: {user_name}
+    - Imię: {COMMENTARY_NAME_PLACEHOLDER}
     - Płeć: {gender_pl}
-    - Wiek: {age} lat
     - Kategoria wiekowa: {age_category}
-    - Przewidywany czas: {predicted_time_formatted}
+    - Przewidywany czas: {COMMENTARY_TIME_PLACEHOLDER} (między {time_range})
     
     Kontekst statystyczny:
     - {stats_text}
     - {ranking_text}
-    - {faster_text}
     
     Komentarz powinien:
     1. Ocenić wynik (świetny/dobry/przeciętny/wymaga pracy)
     2. Porównać do średniej w kategorii
     3. Dać motywującą wskazówkę lub gratulacje
     
+    Imię i przewidywany czas wpisz dokładnie jako znaczniki {COMMENTARY_NAME_PLACEHOLDER} i {COMMENTARY_TIME_PLACEHOLDER}.
+    Nie podawaj innych dokładnych czasów zawodnika ani wieku.
     Bądź entuzjastyczny ale realistyczny. Nie używaj emoji.
     """
+    return key, prompt
+
+
+def fallback_commentary(key, category_stats):
+    """
+    Deterministyczny komentarz lokalny (gdy API jest niedostępne lub obwód otwarty)
+    
+    Args:
+        key (tuple): Klucz z commentary_cache_key (kategoria, płeć, przedział czasu, przedział procentowy)
+        category_stats (dict): Statystyki kategorii (count, mean)
+        
+    Returns:
+        str: Komentarz ze znacznikami imienia i czasu (jak odpowiedź API)
+    """
+    age_category, _, _, percent_bucket = key
+    name, time_text = COMMENTARY_NAME_PLACEHOLDER, COMMENTARY_TIME_PLACEHOLDER
+    
+    # Ocena na podstawie przedziału "szybszy niż X%"
+    percent_low = percent_bucket * COMMENTARY_PERCENTILE_BUCKET
+    if percent_bucket < 0:  # Brak danych rankingowych
+        assessment = f"{name}, przewidywany czas {time_text} to dobry punkt wyjścia do planowania startu."
+    elif percent_low >= 80:
+        assessment = f"{name}, czas {time_text} to świetny wynik - szybszy niż co najmniej {percent_low}% zawodników w kategorii {age_category}."
+    elif percent_low >= 50:
+        assessment = f"{name}, czas {time_text} to dobry wynik - lepszy niż ponad połowa zawodników w kategorii {age_category}."
+    elif percent_low >= 20:
+        assessment = f"{name}, czas {time_text} to wynik zbliżony do środka stawki w kategorii {age_category}."
+    else:
+        assessment = f"{name}, czas {time_text} pokazuje, że w kategorii {age_category} jest jeszcze sporo do zyskania."
+    
+    # Porównanie do średniej kategorii
+    if category_stats.get('mean') is not None:  # Sama liczba rekordów nie gwarantuje średniej
+        mean = int(category_stats['mean'])
+        context = f" Średni czas w kategorii to {mean // 3600}:{(mean % 3600) // 60:02d}:{mean % 60:02d}."
+    else:
+        context = ""
+    
+    advice = " Trzymaj równe tempo od startu i regularnie dokładaj jeden dłuższy bieg w tygodniu."
+    return assessment + context + advice
+
+
+def _log_generation(prompt, completion, session_id=None, usage=None, streamed=False):
+    """
+    Dopisuje wywołanie API do kolejki eksportera Langfuse (bez I/O w wątku wywołującym)
+    
+    Args:
+        prompt (str): Prompt komentarza
+        completion (str): Odpowiedź modelu (ze znacznikami imienia i czasu)
+        session_id (str, optional): ID sesji (grupuje generacje w Langfuse)
+        usage (dict, optional): Zużycie tokenów
+        streamed (bool): Czy odpowiedź była strumieniowana
+    """
+    exporter = get_telemetry_exporter()  # None = Langfuse nie skonfigurowane
+    if exporter is None:
+        return
+    trace = create_trace(exporter, user_name=session_id or "anonymous", session_id=session_id)
+    log_generation(trace, OPENAI_MODEL, prompt, completion, usage=usage, metadata={'streamed': streamed})
+    finalize_trace(trace, status="success", output={'commentary': completion})  # Wynik sesji komentarza
+
+
+def _commentary_messages(prompt):
+    """Wiadomości dla chat.completions (system + prompt użytkownika)"""
+    return [
+        {"role": "system", "content": "Jesteś ekspertem od biegania i trenerem. Twoje komentarze są krótkie, motywujące i oparte na danych."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+@stage_timer('generate_commentary')  # Czas etapu (także trafienia w cache)
+def generate_commentary(
+    client,
+    user_name,
+    predicted_time_formatted,
+    gender,
+    age,
+    age_category,
+    category_stats,
+    ranking_info,
+    session_id=None
+):
+    """
+    Generuje komentarz AI na temat wyniku użytkownika (wywołanie blokujące)
+    
+    Komentarz jest generowany dla przedziału (kategoria, płeć, czas, procent wolniejszych)
+    i zapisywany w cache - kolejni użytkownicy z tego samego przedziału dostają go bez
+    wywołania API, z własnym imieniem i czasem.
+    
+    Args:
+        client (OpenAI): Klient OpenAI (None = wspólny klient z get_openai_client)
+        user_name (str): Imię użytkownika
+        predicted_time_formatted (str): Przewidywany czas (H:MM:SS)
+        gender (str): Płeć ('M' lub 'K')
+        age (int): Wiek
+        age_category (str): Kategoria wiekowa (np. 'M35')
+        category_stats (dict): Statystyki kategorii (mean, median, min, max)
+        ranking_info (dict): Informacje o pozycji (estimated_position, percentile)
+        session_id (str, optional): ID sesji (limit wywołań na sesję)
+        
+    Returns:
+        str: Wygenerowany komentarz AI, komentarz lokalny (API niedostępne lub limit) lub None jeśli brak klucza API
+    """
+    key, prompt = build_commentary_request(predicted_time_formatted, gender, age_category, category_stats, ranking_info)
+    
+    cache = get_commentary_cache()
+    template = _stored_commentary(cache, key)  # Trafienie = brak wywołania API
+    if template is not None:
+        return render_commentary(template, user_name, predicted_time_formatted)
+    
+    # Sprawdź czy klient jest dostępny
+    client = client or get_openai_client()  # Wspólny klient (pula połączeń)
+    if client is None:  # Jeśli brak klienta
+        return None  # Zwróć None
     
     try:
-        # Wywołaj API OpenAI
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,  # Model z config.py (gpt-4o-mini)
-            messages=[
-                {"role": "system", "content": "Jesteś ekspertem od biegania i trenerem. Twoje komentarze są krótkie, motywujące i oparte na danych."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=OPENAI_TEMPERATURE,  # Temperatura z config (0.7)
-            max_tokens=OPENAI_MAX_TOKENS  # Max tokens z config (300)
-        )
+        # Wywołaj API OpenAI (slot z kontroli dopuszczania, limity czasu, ponowienia z jitterem, circuit breaker)
+        with OPENAI_ADMISSION.slot(session_id) as waited:
+            METRICS.observe('llm_queue_wait', waited)  # Histogram oczekiwania (Prometheus + panel admina)
+            response = call_with_retries(OPENAI_CIRCUIT, lambda: client.chat.completions.create(
+                model=OPENAI_MODEL,  # Model z config.py (gpt-4o-mini)
+                messages=_commentary_messages(prompt),
+                temperature=OPENAI_TEMPERATURE,  # Temperatura z config (0.7)
+                max_tokens=OPENAI_MAX_TOKENS  # Max tokens z config (300)
+            ))
         
         # Wyciągnij wygenerowany tekst
-        commentary = response.choices[0].message.content.strip()  # Treść odpowiedzi
+        template = response.choices[0].message.content.strip()  # Treść odpowiedzi (ze znacznikami)
+        cache.put(key, template)  # Zapamiętaj dla kolejnych użytkowników z tego przedziału
+        usage = getattr(response, 'usage', None)  # Zużycie tokenów (jeśli zwrócone przez API)
+        _log_generation(prompt, template, session_id, usage={
+            'promptTokens': usage.prompt_tokens,
+            'completionTokens': usage.completion_tokens,
+            'totalTokens': usage.total_tokens
+        } if usage is not None else None)
         
-        return commentary  # Zwróć komentarz
+    except Exception:  # Błąd API, otwarty obwód lub odrzucenie przez limity - komentarz lokalny (nie trafia do cache)
+        template = fallback_commentary(key, category_stats)
+    
+    return render_commentary(template, user_name, predicted_time_formatted)  # Wstaw imię i czas
+
+
+class CommentaryStream:
+    """
+    Komentarz generowany w tle - tokeny dopisywane przez wątek roboczy
+    
+    Obiekt trzymany w st.session_state; fragment Streamlit odczytuje go cyklicznie
+    (render), a wątek dopisuje kolejne fragmenty odpowiedzi (append). Wątek nie
+    wywołuje API Streamlit - błąd zapisuje w polu error, a tekst zastępuje
+    komentarzem lokalnym (is_fallback).
+    """
+    
+    def __init__(self):
+        self._chunks = []  # Otrzymane fragmenty tekstu
+        self._lock = threading.Lock()  # Wątek roboczy pisze, skrypt Streamlit czyta
+        self.done = False  # Czy generowanie zakończone
+        self.error = None  # Komunikat błędu (None = sukces)
+        self.from_cache = False  # Czy komentarz pochodzi z cache lub banku (bez wywołania API)
+        self.is_fallback = False  # Czy to komentarz lokalny (API niedostępne)
+        self.rejected_reason = None  # Powód odrzucenia przez kontrolę dopuszczania (AdmissionRejected.reason)
+        self.queue_wait_seconds = None  # Czas oczekiwania na slot wywołania
+        self.started_at = time.perf_counter()  # Start (do pomiaru czasu pierwszego tokenu)
+        self.first_token_seconds = None  # Czas do pierwszego fragmentu
+    
+    def append(self, delta):
+        """Dopisuje fragment odpowiedzi"""
+        with self._lock:
+            if self.first_token_seconds is None:
+                self.first_token_seconds = time.perf_counter() - self.started_at
+            self._chunks.append(delta)
+    
+    def finish(self, error=None):
+        """Oznacza koniec generowania (opcjonalnie z błędem)"""
+        with self._lock:
+            self.error = error
+            self.done = True
+    
+    def replace_with_fallback(self, template, error):
+        """Zastępuje (częściowy) tekst komentarzem lokalnym i kończy generowanie"""
+        with self._lock:
+            self._chunks = [template]
+            self.is_fallback = True
+            self.error = error
+            self.done = True
+    
+    @property
+    def text(self):
+        """Dotychczas otrzymany tekst"""
+        with self._lock:
+            return "".join(self._chunks)
+    
+    def render(self, user_name, predicted_time_formatted):
+        """
+        Zwraca tekst do wyświetlenia (z imieniem i czasem zamiast znaczników)
         
-    except Exception as e:  # Jeśli błąd API
-        st.warning(f"⚠️ Nie udało się wygenerować komentarza AI: {e}")  # Ostrzeżenie
-        return None  # Zwróć None
+        W trakcie generowania ucina niedokończony znacznik na końcu (np. "[IMI").
+        
+        Args:
+            user_name (str): Imię użytkownika
+            predicted_time_formatted (str): Przewidywany czas (H:MM:SS)
+            
+        Returns:
+            str: Komentarz (częściowy, jeśli generowanie trwa)
+        """
+        text = self.text
+        if not self.done and text.rfind('[') > text.rfind(']'):  # Znacznik jeszcze się nie domknął
+            text = text[:text.rfind('[')]
+        return render_commentary(text, user_name, predicted_time_formatted)
+
+
+def _stream_commentary_worker(stream, client, cache, key, prompt, category_stats, session_id=None):
+    """Wątek roboczy: strumieniuje odpowiedź API do stream i zapisuje komentarz w cache"""
+    try:
+        client = client or get_openai_client()  # Wspólny klient (import openai poza wątkiem skryptu)
+        if client is None:
+            stream.finish("Brak OPENAI_API_KEY")
+            return
+        
+        # Slot trzymany przez cały strumień - limit dotyczy trwających wywołań, nie tylko ich startu
+        with OPENAI_ADMISSION.slot(session_id) as waited:
+            stream.queue_wait_seconds = waited
+            METRICS.observe('llm_queue_wait', waited)  # Histogram oczekiwania (Prometheus + panel admina)
+            
+            # Nawiązanie strumienia przez circuit breaker (ponowienia tylko przed pierwszym tokenem);
+            # wynik trafia do obwodu raz - po odczytaniu całego strumienia
+            response, complete = call_with_retries(OPENAI_CIRCUIT, lambda: client.chat.completions.create(
+                model=OPENAI_MODEL,  # Model z config.py (gpt-4o-mini)
+                messages=_commentary_messages(prompt),
+                temperature=OPENAI_TEMPERATURE,  # Temperatura z config (0.7)
+                max_tokens=OPENAI_MAX_TOKENS,  # Max tokens z config (300)
+                stream=True  # Odpowiedź w kawałkach (Server-Sent Events)
+            ), defer_success=True)
+            try:
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:  # Pomijaj puste fragmenty (np. rola)
+                        stream.append(chunk.choices[0].delta.content)
+            except Exception:  # Zerwany strumień liczy się jako błąd API (zamiast sukcesu)
+                complete(False)
+                raise
+            complete(True)
+        
+        template = stream.text.strip()  # Pełny komentarz ze znacznikami
+        if template:
+            cache.put(key, template)  # Zapamiętaj dla kolejnych użytkowników
+            _log_generation(prompt, template, session_id, streamed=True)  # Telemetria w tle
+        stream.finish()
+        
+    except AdmissionRejected as e:  # Limit sesji/globalny lub za długa kolejka - komentarz lokalny bez czekania
+        stream.rejected_reason = e.reason
+        stream.replace_with_fallback(fallback_commentary(key, category_stats), str(e))
+    except Exception as e:  # Błąd API lub otwarty obwód (CircuitOpenError) - komentarz lokalny
+        stream.replace_with_fallback(fallback_commentary(key, category_stats), str(e))
+    finally:  # Czas całego generowania i czas do pierwszego tokenu
+        METRICS.observe('generate_commentary', time.perf_counter() - stream.started_at)
+        if stream.first_token_seconds is not None and not stream.is_fallback:
+            METRICS.observe('commentary_first_token', stream.first_token_seconds)
+
+
+def start_commentary_stream(predicted_time_formatted, gender, age_category, category_stats, ranking_info, client=None,
+                            session_id=None):
+    """
+    Rozpoczyna generowanie komentarza w tle i od razu zwraca uchwyt
+    
+    Trafienie w banku lub cache kończy się natychmiast (bez wątku). Chybienie uruchamia wątek,
+    który strumieniuje tokeny do zwróconego CommentaryStream.
+    
+    Args:
+        predicted_time_formatted (str): Przewidywany czas (H:MM:SS)
+        gender (str): Płeć ('M' lub 'K')
+        age_category (str): Kategoria wiekowa (np. 'M35')
+        category_stats (dict): Statystyki kategorii (mean, median, min, max)
+        ranking_info (dict): Informacje o pozycji (estimated_position, faster_than_percent)
+        client (OpenAI): Klient OpenAI (None = utworzony w wątku roboczym)
+        session_id (str, optional): ID sesji (limit wywołań na sesję)
+        
+    Returns:
+        CommentaryStream: Uchwyt do odczytu komentarza
+    """
+    key, prompt = build_commentary_request(predicted_time_formatted, gender, age_category, category_stats, ranking_info)
+    stream = CommentaryStream()
+    
+    cache = get_commentary_cache()  # Pobrany w wątku skryptu (st.cache_resource)
+    template = _stored_commentary(cache, key)  # Trafienie = brak wywołania API
+    if template is not None:
+        stream.append(template)
+        stream.from_cache = True
+        stream.finish()
+        METRICS.observe('generate_commentary', time.perf_counter() - stream.started_at)
+        return stream
+    
+    worker = threading.Thread(
+        target=_stream_commentary_worker, args=(stream, client, cache, key, prompt, category_stats, session_id),
+        name="commentary-stream", daemon=True  # Nie blokuje zamknięcia procesu
+    )
+    worker.start()
+    return stream
 
 
 def check_openai_availability():
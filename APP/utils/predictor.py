@@ -2,9 +2,16 @@
 Predictor - Moduł do przewidywania czasu biegu
 """
 
+import numpy as np  # Operacje wektorowe (predykcje wsadowe)
 import pandas as pd  # Praca z DataFrame
 import streamlit as st  # Framework Streamlit
-from config import AGE_CATEGORIES_MEN, AGE_CATEGORIES_WOMEN, CURRENT_YEAR, DEFAULT_COUNTRY  # Import stałych
+from config import (  # Import stałych
+    AGE_CATEGORIES_MEN, AGE_CATEGORIES_WOMEN, CURRENT_YEAR, DEFAULT_COUNTRY, MIN_AGE, MAX_AGE,
+    MODEL_FEATURES
+)
+from utils.intervals import interval_offset, interval_offsets  # Przedziały predykcji z tabeli reszt
+
+HALF_MARATHON_DISTANCE_KM = 21.0975  # Dokładna długość półmaratonu
 
 
 def calculate_age_category(age, gender='M'):
@@ -91,19 +98,22 @@ def prepare_input_data(gender, age, time_5km_seconds, country=DEFAULT_COUNTRY):
     return df_input  # Zwróć DataFrame
 
 
-def predict_time(model, df_input):
+def predict_time(model, df_input, residual_table=None):
     """
     Przewiduje czas biegu używając modelu ML
     
     Args:
         model: Wczytany model PyCaret/scikit-learn
         df_input (pd.DataFrame): Przygotowane dane wejściowe
+        residual_table (dict): Tabela reszt (utils.intervals) - jeśli podana, dodaje przedział predykcji
         
     Returns:
         dict: Słownik z wynikami predykcji
             - 'time_seconds' (int): Przewidywany czas w sekundach
             - 'time_formatted' (str): Czas w formacie H:MM:SS
             - 'pace_per_km' (str): Tempo na kilometr (MM:SS/km)
+            - 'time_low_seconds' / 'time_high_seconds' (int): Granice przedziału (tylko z residual_table)
+            - 'time_low_formatted' / 'time_high_formatted' (str): Granice w formacie H:MM:SS
     """
     try:
         # Wykonaj predykcję
@@ -119,8 +129,7 @@ def predict_time(model, df_input):
         time_formatted = f"{hours}:{minutes:02d}:{seconds:02d}"  # Format H:MM:SS
         
         # Oblicz tempo na kilometr (półmaraton = 21.0975 km)
-        half_marathon_distance = 21.0975  # Dokładna długość półmaratonu
-        pace_seconds_per_km = time_seconds / half_marathon_distance  # Sekundy/km
+        pace_seconds_per_km = time_seconds / HALF_MARATHON_DISTANCE_KM  # Sekundy/km
         pace_minutes = int(pace_seconds_per_km // 60)  # Minuty
         pace_seconds = int(pace_seconds_per_km % 60)  # Sekundy
         pace_per_km = f"{pace_minutes}:{pace_seconds:02d}/km"  # Format MM:SS/km
@@ -132,6 +141,16 @@ def predict_time(model, df_input):
             'pace_per_km': pace_per_km  # Tempo MM:SS/km
         }
         
+        # Przedział predykcji (kwantyle reszt dla płci, kategorii i czasu 5km)
+        if residual_table is not None:
+            gender = df_input['Płeć'].iloc[0]  # 'M' lub 'K'
+            age_category = calculate_age_category(CURRENT_YEAR - int(df_input['Rocznik'].iloc[0]), gender)
+            low, high = interval_offset(residual_table, gender, age_category, df_input['5 km Czas_sekundy'].iloc[0])
+            result['time_low_seconds'] = int(time_seconds + low)  # Dolna granica
+            result['time_high_seconds'] = int(time_seconds + high)  # Górna granica
+            result['time_low_formatted'] = seconds_to_formatted_time(result['time_low_seconds'])
+            result['time_high_formatted'] = seconds_to_formatted_time(result['time_high_seconds'])
+        
         return result  # Zwróć słownik
         
     except Exception as e:  # Jeśli błąd podczas predykcji
@@ -139,6 +158,144 @@ def predict_time(model, df_input):
         st.stop()  # Zatrzymaj aplikację
 
 
+def calculate_age_category_batch(ages, genders):
+    """
+    Wektorowo oblicza kategorie wiekowe (jak calculate_age_category)
+    
+    Args:
+        ages (array-like): Wiek zawodników
+        genders (str lub array-like): Płeć ('M' lub 'K') - jedna dla wszystkich lub dla każdego
+        
+    Returns:
+        np.ndarray: Kody kategorii (np. 'M20', 'K30')
+    """
+    ages = np.asarray(ages, dtype=np.int64)  # Wiek
+    is_men = np.broadcast_to(np.asarray(genders, dtype=object), ages.shape) == 'M'  # Inna płeć = kategorie kobiet
+    categories = np.where(is_men, 'M20', 'K20').astype(object)  # Domyślnie najmłodsza kategoria
+    
+    for gender_mask, mapping in ((is_men, AGE_CATEGORIES_MEN), (~is_men, AGE_CATEGORIES_WOMEN)):
+        for (min_age, max_age), category in mapping.items():
+            categories[gender_mask & (ages >= min_age) & (ages <= max_age)] = category
+    return categories
+
+
+def calculate_rocznik_batch(ages, current_year=CURRENT_YEAR):
+    """
+    Wektorowo oblicza roczniki dla wielu zawodników (bez ostrzeżeń Streamlit)
+    
+    Args:
+        ages (array-like): Wiek zawodników
+        current_year (int): Aktualny rok
+        
+    Returns:
+        tuple: (np.ndarray z rocznikami, maska wierszy skorygowanych do zakresu MIN_AGE-MAX_AGE)
+    """
+    raw = current_year - np.asarray(ages, dtype=np.int64)  # Rok urodzenia
+    rocznik = np.clip(raw, current_year - MAX_AGE, current_year - MIN_AGE)  # Zakres jak w calculate_rocznik
+    return rocznik, rocznik != raw  # Roczniki i maska korekt
+
+
+def prepare_input_batch(genders, ages, times_5km_seconds, current_year=CURRENT_YEAR):
+    """
+    Przygotowuje dane wejściowe dla wielu zawodników naraz
+    
+    Args:
+        genders (str lub array-like): Płeć ('M' lub 'K') - jedna dla wszystkich lub dla każdego
+        ages (array-like): Wiek zawodników
+        times_5km_seconds (array-like): Czasy na 5km w sekundach
+        current_year (int): Aktualny rok (do obliczenia rocznika)
+        
+    Returns:
+        pd.DataFrame: DataFrame z 3 cechami modelu, jeden wiersz na zawodnika
+    """
+    times = np.asarray(times_5km_seconds, dtype=np.int64)  # Czasy 5km
+    rocznik, _ = calculate_rocznik_batch(np.broadcast_to(ages, times.shape), current_year)  # Roczniki
+    
+    return pd.DataFrame({
+        'Płeć': np.broadcast_to(np.asarray(genders, dtype=object), times.shape),  # 'M' lub 'K'
+        '5 km Czas_sekundy': times,  # Czas w SEKUNDACH (int)
+        'Rocznik': rocznik,  # Rok urodzenia
+    }, columns=MODEL_FEATURES)
+
+
+def format_times_batch(seconds):
+    """
+    Wektorowo formatuje czasy w sekundach jako H:MM:SS
+    
+    Args:
+        seconds (array-like): Czasy w sekundach (int)
+        
+    Returns:
+        np.ndarray: Teksty w formacie H:MM:SS
+    """
+    secs = pd.Series(np.asarray(seconds, dtype=np.int64))  # Sekundy
+    return (
+        (secs // 3600).astype(str) + ':' +  # Pełne godziny
+        ((secs % 3600) // 60).astype(str).str.zfill(2) + ':' +  # Pełne minuty
+        (secs % 60).astype(str).str.zfill(2)  # Pozostałe sekundy
+    ).to_numpy()
+
+
+def format_paces_batch(seconds):
+    """
+    Wektorowo oblicza tempo na kilometr (MM:SS/km) dla czasów półmaratonu
+    
+    Args:
+        seconds (array-like): Czasy półmaratonu w sekundach
+        
+    Returns:
+        np.ndarray: Teksty w formacie M:SS/km
+    """
+    pace = np.asarray(seconds, dtype=np.float64) / HALF_MARATHON_DISTANCE_KM  # Sekundy/km
+    pace_minutes = pd.Series((pace // 60).astype(np.int64))  # Minuty
+    pace_seconds = pd.Series((pace % 60).astype(np.int64))  # Sekundy
+    return (pace_minutes.astype(str) + ':' + pace_seconds.astype(str).str.zfill(2) + '/km').to_numpy()
+
+
+def predict_batch(model, genders, ages, times_5km_seconds, current_year=CURRENT_YEAR, residual_table=None):
+    """
+    Przewiduje czasy dla wielu zawodników jednym wywołaniem modelu
+    
+    Nie korzysta z API Streamlit (brak st.warning / st.error), więc działa także
+    w skryptach wsadowych. Błędy modelu są zgłaszane jako wyjątki.
+    
+    Args:
+        model: Wczytany model PyCaret/scikit-learn
+        genders (str lub array-like): Płeć ('M' lub 'K') - jedna dla wszystkich lub dla każdego
+        ages (array-like): Wiek zawodników
+        times_5km_seconds (array-like): Czasy na 5km w sekundach
+        current_year (int): Aktualny rok (do obliczenia rocznika)
+        residual_table (dict): Tabela reszt (utils.intervals) - jeśli podana, dodaje przedziały predykcji
+        
+    Returns:
+        pd.DataFrame: Cechy modelu oraz kolumny wyników jak w predict_time
+            - 'time_seconds' (int): Przewidywany czas w sekundach
+            - 'time_formatted' (str): Czas w formacie H:MM:SS
+            - 'pace_per_km' (str): Tempo na kilometr (MM:SS/km)
+            - 'time_low_seconds' / 'time_high_seconds' (int): Granice przedziału (tylko z residual_table)
+            - 'time_low_formatted' / 'time_high_formatted' (str): Granice w formacie H:MM:SS
+    """
+    df_input = prepare_input_batch(genders, ages, times_5km_seconds, current_year)  # Cechy modelu
+    
+    prediction = np.asarray(model.predict(df_input), dtype=np.float64)  # Jedno wywołanie modelu
+    time_seconds = np.trunc(prediction).astype(np.int64)  # Obcięcie jak int() w predict_time
+    
+    result = df_input.copy()  # Zachowaj wejście obok wyników
+    result['time_seconds'] = time_seconds  # Czas w sekundach
+    result['time_formatted'] = format_times_batch(time_seconds)  # Format H:MM:SS
+    result['pace_per_km'] = format_paces_batch(time_seconds)  # Tempo MM:SS/km
+    
+    # Przedziały predykcji - jedno wyszukanie na unikalną kombinację płeć/kategoria/czas 5km
+    if residual_table is not None:
+        age_categories = calculate_age_category_batch(current_year - df_input['Rocznik'].to_numpy(), df_input['Płeć'].to_numpy())
+        low, high = interval_offsets(residual_table, df_input['Płeć'], age_categories, df_input['5 km Czas_sekundy'])
+        result['time_low_seconds'] = np.trunc(time_seconds + low).astype(np.int64)  # Dolna granica
+        result['time_high_seconds'] = np.trunc(time_seconds + high).astype(np.int64)  # Górna granica
+        result['time_low_formatted'] = format_times_batch(result['time_low_seconds'])
+        result['time_high_formatted'] = format_times_batch(result['time_high_seconds'])
+    return result  # Zwróć DataFrame
+
+
 def seconds_to_formatted_time(seconds):
     """
     Konwertuje sekundy na format H:MM:SS
@@ -0,0 +1,132 @@
+"""
+Result Cache - Wspólny (dla wszystkich sesji) cache wyników predykcji
+
+Wynik dla wejść (płeć, wiek, czas 5km) zależy tylko od danych historycznych
+i modelu, więc jeden pakiet wyników (predykcja, statystyki kategorii, obie
+pozycje w rankingu, zwycięzcy kategorii) obsługuje wszystkie sesje z tymi samymi
+wejściami. Sesja trzyma tylko klucz, a pakiet jest w cache LRU ograniczonym
+liczbą wpisów i szacowanym rozmiarem w pamięci.
+"""
+
+import sys  # Rozmiar obiektów
+import threading  # Sesje Streamlit działają w wątkach
+from collections import OrderedDict  # Kolejność ostatniego użycia (LRU)
+
+import pandas as pd  # Rozmiar tabel w pakiecie
+import streamlit as st  # Jeden cache na proces
+
+from config import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES  # Limity cache
+
+
+def result_cache_key(gender, age, time_5km_seconds, data_version, model_version):
+    """
+    Tworzy klucz pakietu wyników z wejść sprowadzonych do postaci kanonicznej
+
+    Args:
+        gender (str): Płeć ('M' lub 'K')
+        age (int): Wiek zawodnika
+        time_5km_seconds (int): Czas na 5km w sekundach
+        data_version (str): Wersja danych historycznych (get_data_version)
+        model_version (str): Wersja modelu
+
+    Returns:
+        tuple: Klucz cache
+    """
+    return (str(gender), int(age), int(time_5km_seconds), str(data_version), str(model_version))
+
+
+def _estimate_bytes(value):
+    """Szacuje rozmiar obiektu w pamięci (tabele - memory_usage, słowniki i listy - rekurencyjnie)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_bytes(k) + _estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class PredictionResultCache:
+    """
+    Cache LRU pakietów wyników (limit wpisów i bajtów)
+
+    Pakiety są współdzielone przez sesje - wywołujący nie może ich modyfikować.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries  # Limit wpisów
+        self.max_bytes = max_bytes  # Limit szacowanego rozmiaru
+        self._entries = OrderedDict()  # Klucz -> (pakiet, rozmiar); kolejność = ostatnie użycie
+        self._bytes = 0  # Suma rozmiarów wpisów
+        self._lock = threading.Lock()
+        self.hits = 0  # Trafienia
+        self.misses = 0  # Chybienia
+        self.evictions = 0  # Wpisy usunięte przez limity
+
+    def get(self, key):
+        """
+        Zwraca pakiet wyników
+
+        Args:
+            key (tuple): Klucz z result_cache_key
+
+        Returns:
+            dict: Pakiet wyników lub None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)  # Ostatnio użyty
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, bundle):
+        """
+        Zapisuje pakiet wyników (usuwa najdawniej używane ponad limity)
+
+        Args:
+            key (tuple): Klucz z result_cache_key
+            bundle (dict): Pakiet wyników
+        """
+        size = _estimate_bytes(bundle)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (bundle, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)  # Najdawniej używany
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Zwraca liczniki cache (do monitoringu)
+
+        Returns:
+            dict: hits, misses, hit_rate (%), size, bytes, evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,  # Trafienia
+                'misses': self.misses,  # Chybienia
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,  # Skuteczność (%)
+                'size': len(self._entries),  # Liczba wpisów
+                'bytes': self._bytes,  # Szacowany rozmiar
+                'evictions': self.evictions  # Usunięte przez limity
+            }
+
+
+@st.cache_resource  # Jeden cache na proces (wspólny dla wszystkich sesji)
+def get_result_cache():
+    """
+    Zwraca wspólny cache wyników predykcji
+
+    Returns:
+        PredictionResultCache: Cache z limitami z config.py
+    """
+    return PredictionResultCache()
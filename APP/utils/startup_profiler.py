@@ -0,0 +1,119 @@
+"""
+Startup Profiler - Pomiar zimnego startu aplikacji (importy + pierwszy render)
+
+Moduł importowany jako pierwszy w app.py. Mierzy czas importu modułów aplikacji
+(tylko pierwszy, "zimny" import w procesie) oraz czas kolejnych etapów pierwszego
+renderu, a po jego zakończeniu zapisuje raport JSON (STARTUP_REPORT_PATH).
+Kolejne przebiegi skryptu (reruny Streamlit) nie są już mierzone.
+"""
+
+import json  # Zapis raportu
+import os  # Ścieżki do plików
+import sys  # Lista załadowanych modułów
+import threading  # Blokada (wiele sesji w jednym procesie)
+import time  # Pomiar czasu
+from contextlib import contextmanager  # Context manager dla importów
+from datetime import datetime  # Znacznik czasu raportu
+
+from config import STARTUP_REPORT_PATH, STARTUP_BUDGET_MS  # Ustawienia profilowania
+
+# Ciężkie zależności - raport pokazuje, czy zostały zaimportowane podczas startu
+HEAVY_MODULES = ['pycaret', 'sklearn', 'openai', 'langfuse', 'openpyxl']
+
+_START = time.perf_counter()  # Początek pomiaru (import profilera = początek skryptu)
+_lock = threading.Lock()  # Blokada stanu profilera
+_imports = {}  # Moduł -> czas importu (ms)
+_stages = {}  # Etap -> czas trwania (ms)
+_last_mark = _START  # Koniec poprzedniego etapu
+_report_written = False  # Czy raport został już zapisany
+
+
+def _elapsed_ms(since):
+    """Zwraca czas w ms od podanego punktu (zaokrąglony do 0.1 ms)"""
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+@contextmanager
+def profile_import(module_name):
+    """
+    Mierzy czas importu modułu (tylko jeśli moduł nie był jeszcze załadowany)
+
+    Użycie:
+        with profile_import('utils.data_loader'):
+            from utils.data_loader import load_historical_data
+
+    Args:
+        module_name (str): Nazwa modułu w raporcie
+    """
+    cold = module_name not in sys.modules  # Zimny import = pierwszy w procesie
+    start = time.perf_counter()
+    yield
+    if cold and not _report_written:
+        with _lock:
+            _imports.setdefault(module_name, _elapsed_ms(start))
+
+
+def mark_stage(name):
+    """
+    Zamyka etap pierwszego renderu (czas od poprzedniego znacznika)
+
+    Args:
+        name (str): Nazwa etapu (np. 'dane', 'model')
+    """
+    global _last_mark
+    if _report_written:  # Mierzymy tylko pierwszy render
+        return
+    with _lock:
+        _stages.setdefault(name, _elapsed_ms(_last_mark))
+        _last_mark = time.perf_counter()
+
+
+def build_startup_report():
+    """
+    Buduje raport zimnego startu
+
+    Returns:
+        dict: Czasy importów, etapów, łączny czas i status budżetu
+    """
+    total_ms = _elapsed_ms(_START)  # Łączny czas od początku skryptu
+    with _lock:
+        imports = dict(sorted(_imports.items(), key=lambda item: -item[1]))  # Najwolniejsze na górze
+        stages = dict(_stages)
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),  # Kiedy zmierzono
+        'python': sys.version.split()[0],  # Wersja Pythona
+        'total_ms': total_ms,  # Czas pierwszego renderu
+        'budget_ms': STARTUP_BUDGET_MS,  # Budżet z config.py
+        'within_budget': total_ms <= STARTUP_BUDGET_MS,  # Czy zmieściliśmy się w budżecie
+        'imports_ms': imports,  # Import modułów aplikacji
+        'stages_ms': stages,  # Etapy pierwszego renderu
+        'heavy_modules_loaded': {  # Które ciężkie zależności zostały zaimportowane
+            name: name in sys.modules for name in HEAVY_MODULES
+        }
+    }
+
+
+def write_startup_report(path=STARTUP_REPORT_PATH):
+    """
+    Zapisuje raport po pierwszym renderze (raz na proces)
+
+    Args:
+        path (str): Ścieżka pliku JSON
+
+    Returns:
+        dict: Raport lub None jeśli został już zapisany wcześniej
+    """
+    global _report_written
+    with _lock:
+        if _report_written:  # Raport tylko z zimnego startu
+            return None
+        _report_written = True
+
+    report = build_startup_report()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)  # Utwórz folder logs/
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    except OSError:  # Brak prawa zapisu (np. read-only hosting) - raport tylko w pamięci
+        pass
+    return report
@@ -5,8 +5,185 @@ Stats Calculator - Moduł do obliczania statystyk z danych historycznych
 import pandas as pd  # Praca z DataFrame
 import numpy as np  # Operacje numeryczne (NaN handling)
 import streamlit as st  # Framework Streamlit
+import threading  # Blokada dla cache indeksów
+from collections import OrderedDict  # Cache indeksów z limitem wersji danych
 from io import BytesIO  # Do eksportu Excel w pamięci
 
+# Struktury budowane raz na wersję danych: (nazwa, wersja) -> obiekt
+_VERSIONED_CACHE = OrderedDict()  # Kolejność = ostatnie użycie
+_VERSIONED_CACHE_LOCK = threading.Lock()  # Sesje Streamlit działają w wątkach
+_VERSIONED_CACHE_SIZE = 8  # Maksymalna liczba trzymanych struktur
+
+# Poziomy agregacji indeksu rankingowego (None w kluczu = wszystkie wartości)
+RANKING_LEVELS = [
+    ('Płeć',),  # Klasyfikacja ogólna
+    ('Płeć', 'Kategoria wiekowa'),  # Kategoria wiekowa
+    ('Płeć', 'Rok'),  # Klasyfikacja ogólna w danym roku
+    ('Płeć', 'Kategoria wiekowa', 'Rok'),  # Kategoria w danym roku
+]
+
+
+def frame_fingerprint(df):
+    """
+    Zwraca odcisk wierszy ramki: liczba wierszy + indeks
+    
+    pandas kopiuje df.attrs do każdej przefiltrowanej ramki - odcisk odróżnia
+    podzbiór (inne wiersze) od pełnych danych, dla których ustawiono wersję.
+    
+    Args:
+        df (pd.DataFrame): Dane
+        
+    Returns:
+        str: Odcisk (RangeIndex bez haszowania, inny indeks - hash etykiet)
+    """
+    index = df.index
+    if isinstance(index, pd.RangeIndex):  # Pełne dane z loadera - bez kosztu
+        return f"{len(df)}:r{index.start}:{index.stop}:{index.step}"
+    hashed = pd.util.hash_pandas_object(index, index=False).to_numpy()  # Hash etykiet wierszy
+    return f"{len(df)}:{int(hashed.sum(dtype=np.uint64)):x}"
+
+
+def get_data_version(df):
+    """
+    Zwraca wersję danych - klucz dla struktur budowanych raz na zbiór danych
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        
+    Returns:
+        str: Wersja z df.attrs (ustawiana przez load_historical_data), jeśli odcisk wierszy
+             pasuje do tej ramki, w przeciwnym razie hash kolumn
+    """
+    version = df.attrs.get('data_version')  # Wersja z loadera (hash plików źródłowych)
+    if version is not None and df.attrs.get('data_fingerprint') == frame_fingerprint(df):
+        return version
+    
+    # Dane spoza loadera (np. syntetyczne) lub podzbiór (attrs skopiowane z pełnych danych)
+    cols = [c for c in ['Rok', 'Płeć', 'Kategoria wiekowa', 'Czas_sekundy'] if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[cols], index=True).to_numpy()  # Hash wierszy
+    return f"h{len(df)}_{int(hashed.sum(dtype=np.uint64)):x}"
+
+
+def get_versioned(df, name, builder):
+    """
+    Zwraca strukturę `name` dla wersji danych, budując ją przy pierwszym użyciu
+    
+    Wspólny cache struktur zależnych od danych (także spoza modułu, np. tabela reszt
+    w utils.intervals) - klucz to get_data_version, więc podzbiór ma własne wpisy.
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        name (str): Nazwa struktury (np. 'ranking_index')
+        builder (callable): Funkcja budująca strukturę z DataFrame
+        
+    Returns:
+        object: Zbudowana (lub zapamiętana) struktura
+    """
+    key = (name, get_data_version(df))  # Klucz cache
+    with _VERSIONED_CACHE_LOCK:
+        if key in _VERSIONED_CACHE:  # Trafienie - przesuń na koniec (LRU)
+            _VERSIONED_CACHE.move_to_end(key)
+            return _VERSIONED_CACHE[key]
+    
+    value = builder(df)  # Budowa poza blokadą (może chwilę trwać)
+    
+    with _VERSIONED_CACHE_LOCK:
+        _VERSIONED_CACHE[key] = value
+        while len(_VERSIONED_CACHE) > _VERSIONED_CACHE_SIZE:  # Usuń najdawniej używane
+            _VERSIONED_CACHE.popitem(last=False)
+    return value
+
+
+# Wymiary kostki agregatów (kolejność kluczy w kostce)
+CUBE_DIMENSIONS = ('Rok', 'Płeć', 'Kategoria wiekowa')
+CUBE_QUANTILES = (0.1, 0.25, 0.75, 0.9)  # Kwantyle trzymane w kostce
+
+
+def _format_hms(seconds):
+    """Wektorowo formatuje sekundy (pd.Series) jako H:MM:SS (obcina ułamki, NaN -> 'N/A')"""
+    missing = seconds.isna()  # Brak czasu
+    secs = seconds.fillna(0).astype(np.int64)  # Pełne sekundy
+    formatted = (
+        (secs // 3600).astype(str) + ':' +
+        ((secs % 3600) // 60).astype(str).str.zfill(2) + ':' +
+        (secs % 60).astype(str).str.zfill(2)
+    )
+    return formatted.mask(missing, 'N/A')
+
+
+def _cube_cell(times):
+    """Statystyki jednej komórki kostki dla serii czasów (NaN = brak czasu)"""
+    finished = times.dropna()  # Tylko zawodnicy z czasem
+    quantiles = finished.quantile(list(CUBE_QUANTILES)) if len(finished) else None
+    return {
+        'count': len(times),  # Wszyscy zawodnicy (także bez czasu)
+        'mean': finished.mean(),  # Średnia (NaN gdy brak czasów)
+        'median': finished.median(),  # Mediana
+        'min': finished.min(),  # Najlepszy czas
+        'max': finished.max(),  # Najgorszy czas
+        **{f"q{int(p * 100)}": (quantiles[p] if quantiles is not None else np.nan)
+           for p in CUBE_QUANTILES},  # q10, q25, q75, q90
+        'winner_index': finished.idxmin() if len(finished) else None  # Etykieta wiersza zwycięzcy
+    }
+
+
+def build_stats_cube(df):
+    """
+    Buduje kostkę agregatów czasów dla wszystkich kombinacji (rok, płeć, kategoria)
+    
+    Kostka zawiera też wiersze zbiorcze - None w kluczu oznacza "wszystkie wartości"
+    (np. (None, 'M', 'M30') to kategoria M30 ze wszystkich lat).
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        
+    Returns:
+        dict: (rok, płeć, kategoria) -> {'count', 'mean', 'median', 'min', 'max',
+              'q10', 'q25', 'q75', 'q90', 'winner_index'}
+    """
+    times = df['Czas_sekundy'].astype('float64')  # Czasy (NaN dla DNF/DNS)
+    dims = [d for d in CUBE_DIMENSIONS if d in df.columns]  # Dostępne wymiary
+    cube = {(None, None, None): _cube_cell(times)}  # Poziom zbiorczy - wszystkie dane
+    
+    # Pozostałe podzbiory wymiarów (grouping sets)
+    for mask in range(1, 2 ** len(dims)):
+        level = [d for i, d in enumerate(dims) if mask & (1 << i)]  # Wymiary tego poziomu
+        grouped = times.groupby([df[d] for d in level])  # Grupowanie po wymiarach poziomu
+        
+        # Agregaty liczone raz dla całego poziomu
+        stats = grouped.agg(['size', 'mean', 'median', 'min', 'max'])
+        quantiles = grouped.quantile(list(CUBE_QUANTILES)).unstack()  # Kwantyle w kolumnach
+        finished = times.notna()
+        winners = times[finished].groupby([df[d][finished] for d in level]).idxmin().to_dict()  # Zwycięzcy
+        
+        for group_key, row in zip(stats.index, stats.itertuples(index=False)):
+            values = dict(zip(level, group_key if isinstance(group_key, tuple) else (group_key,)))
+            cube_key = tuple(values.get(d) for d in CUBE_DIMENSIONS)  # Brakujące wymiary = None
+            cube[cube_key] = {
+                'count': int(row.size),  # Wszyscy zawodnicy (także bez czasu)
+                'mean': row.mean,  # Średnia (NaN gdy brak czasów)
+                'median': row.median,  # Mediana
+                'min': row.min,  # Najlepszy czas
+                'max': row.max,  # Najgorszy czas
+                **{f"q{int(p * 100)}": quantiles.at[group_key, p] for p in CUBE_QUANTILES},  # q10..q90
+                'winner_index': winners.get(group_key)  # Etykieta wiersza zwycięzcy
+            }
+    
+    return cube  # Zwróć kostkę
+
+
+def get_stats_cube(df):
+    """
+    Zwraca kostkę agregatów dla danych (budowaną raz na wersję danych)
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        
+    Returns:
+        dict: Kostka zbudowana przez build_stats_cube
+    """
+    return get_versioned(df, 'stats_cube', build_stats_cube)
+
 
 def get_winners(df, year=None, gender=None):
     """
@@ -52,16 +229,25 @@ def get_averages(df, group_by=['Rok', 'Płeć']):
     Returns:
         pd.DataFrame: DataFrame ze średnimi czasami
     """
-    # Grupuj i oblicz średnią
-    df_avg = df.groupby(group_by)['Czas_sekundy'].mean().reset_index()  # Średnia dla grup
-    
-    # Zmień nazwę kolumny
-    df_avg.rename(columns={'Czas_sekundy': 'Średni_czas_sekundy'}, inplace=True)  # Nowa nazwa
+    if set(group_by) <= set(CUBE_DIMENSIONS) and len(set(group_by)) == len(group_by):  # Wymiary kostki
+        # Odczyt z kostki - komórki z dokładnie tymi wymiarami
+        positions = [CUBE_DIMENSIONS.index(col) for col in group_by]  # Pozycje w kluczu kostki
+        rows = [
+            [key[p] for p in positions] + [cell['mean']]
+            for key, cell in get_stats_cube(df).items()
+            if all((key[i] is not None) == (dim in group_by) for i, dim in enumerate(CUBE_DIMENSIONS))
+        ]
+        df_avg = pd.DataFrame(rows, columns=list(group_by) + ['Średni_czas_sekundy'])
+        df_avg = df_avg.sort_values(list(group_by)).reset_index(drop=True)  # Kolejność jak w groupby
+    else:
+        # Grupowanie po innych kolumnach - liczymy na żądanie
+        df_avg = df.groupby(group_by)['Czas_sekundy'].mean().reset_index()  # Średnia dla grup
+        
+        # Zmień nazwę kolumny
+        df_avg.rename(columns={'Czas_sekundy': 'Średni_czas_sekundy'}, inplace=True)  # Nowa nazwa
     
     # Konwertuj średni czas na format H:MM:SS
-    df_avg['Średni_czas_formatted'] = df_avg['Średni_czas_sekundy'].apply(
-        lambda x: f"{int(x)//3600}:{(int(x)%3600)//60:02d}:{int(x)%60:02d}"  # Format
-    )
+    df_avg['Średni_czas_formatted'] = _format_hms(df_avg['Średni_czas_sekundy'])  # Format
     
     # Zaokrąglij sekundy
     df_avg['Średni_czas_sekundy'] = df_avg['Średni_czas_sekundy'].round(0).astype(int)  # Int
@@ -81,43 +267,87 @@ def get_category_stats(df, age_category, gender):
     Returns:
         dict: Słownik ze statystykami (mean, median, min, max, count)
     """
-    # Filtruj dane
-    df_filtered = df[
-        (df['Kategoria wiekowa'] == age_category) &  # Kategoria
-        (df['Płeć'] == gender)  # Płeć
-    ]
+    cell = get_stats_cube(df).get((None, gender, age_category))  # Kategoria ze wszystkich lat
     
     # Jeśli brak danych
-    if len(df_filtered) == 0:  # Pusta ramka
+    if cell is None or cell['count'] == 0 or pd.isna(cell['mean']):  # Brak zawodników z czasem
         return {
-            'count': 0,  # Brak rekordów
+            'count': cell['count'] if cell else 0,  # Liczba rekordów
             'mean': None,  # Brak średniej
             'median': None,  # Brak mediany
             'min': None,  # Brak minimum
             'max': None  # Brak maksimum
         }
     
-    # Oblicz statystyki
+    # Statystyki z kostki
     stats = {
-        'count': len(df_filtered),  # Liczba zawodników
-        'mean': int(df_filtered['Czas_sekundy'].mean()),  # Średnia (int)
-        'median': int(df_filtered['Czas_sekundy'].median()),  # Mediana (int)
-        'min': int(df_filtered['Czas_sekundy'].min()),  # Minimum (int)
-        'max': int(df_filtered['Czas_sekundy'].max())  # Maksimum (int)
+        'count': cell['count'],  # Liczba zawodników
+        'mean': int(cell['mean']),  # Średnia (int)
+        'median': int(cell['median']),  # Mediana (int)
+        'min': int(cell['min']),  # Minimum (int)
+        'max': int(cell['max'])  # Maksimum (int)
     }
     
     return stats  # Zwróć słownik
 
 
-def estimate_ranking(df, predicted_time_seconds, gender, age_category=None):
+def build_ranking_index(df):
+    """
+    Buduje indeks rankingowy: posortowane czasy dla każdej grupy (płeć, kategoria, rok)
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        
+    Returns:
+        dict: (płeć, kategoria lub None, rok lub None) -> {'times': posortowane czasy,
+              'total': liczba zawodników w grupie (także bez czasu, jak w klasyfikacji)}
+    """
+    index = {}  # Klucz grupy -> dane grupy
+    times_all = df['Czas_sekundy'].to_numpy(dtype=np.float64, na_value=np.nan)  # Czasy (NaN dla DNF/DNS)
+    
+    for level in RANKING_LEVELS:
+        cols = [c for c in level if c in df.columns]  # Pomiń poziomy bez kolumny (np. brak 'Rok')
+        if len(cols) != len(level):
+            continue
+        for group_key, positions in df.groupby(list(level), sort=False).indices.items():
+            group_key = group_key if isinstance(group_key, tuple) else (group_key,)
+            values = dict(zip(level, group_key))  # Kolumna -> wartość
+            key = (values['Płeć'], values.get('Kategoria wiekowa'), values.get('Rok'))
+            times = times_all[positions]  # Czasy w grupie
+            index[key] = {
+                'times': np.sort(times[~np.isnan(times)]),  # Posortowane (bez NaN)
+                'total': len(positions)  # Wszyscy zawodnicy w grupie
+            }
+    
+    return index  # Zwróć indeks
+
+
+def get_ranking_index(df):
+    """
+    Zwraca indeks rankingowy dla danych (budowany raz na wersję danych)
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        
+    Returns:
+        dict: Indeks zbudowany przez build_ranking_index
+    """
+    return get_versioned(df, 'ranking_index', build_ranking_index)
+
+
+def estimate_ranking(df, predicted_time_seconds, gender, age_category=None, year=None):
     """
     Szacuje pozycję w klasyfikacji na podstawie przewidywanego czasu
     
+    Pozycja liczona jest wyszukiwaniem binarnym (O(log n)) w posortowanych
+    czasach grupy z indeksu rankingowego.
+    
     Args:
         df (pd.DataFrame): Dane historyczne
         predicted_time_seconds (int): Przewidywany czas w sekundach
         gender (str): Płeć ('M' lub 'K')
         age_category (str, optional): Kategoria wiekowa (jeśli None - klasyfikacja ogólna)
+        year (int, optional): Rok edycji (jeśli None - wszystkie lata)
         
     Returns:
         dict: Słownik z szacowaną pozycją i statystykami
@@ -126,18 +356,10 @@ def estimate_ranking(df, predicted_time_seconds, gender, age_category=None):
             - 'percentile' (float): Percentyl (0-100)
             - 'faster_than_percent' (float): Procent wolniejszych zawodników
     """
-    # Filtruj dane po płci
-    df_filtered = df[df['Płeć'] == gender]  # Filtruj po płci
-    
-    # Dodatkowo filtruj po kategorii wiekowej jeśli podano
-    if age_category is not None:  # Jeśli określono kategorię
-        df_filtered = df_filtered[df_filtered['Kategoria wiekowa'] == age_category]  # Filtruj
-    
-    # Liczba zawodników w kategorii
-    total_runners = len(df_filtered)  # Łączna liczba
+    group = get_ranking_index(df).get((gender, age_category, year))  # Grupa z indeksu
     
     # Jeśli brak danych
-    if total_runners == 0:  # Pusta ramka
+    if group is None or group['total'] == 0:  # Pusta grupa
         return {
             'estimated_position': None,  # Brak pozycji
             'total_runners': 0,  # Brak zawodników
@@ -145,11 +367,12 @@ def estimate_ranking(df, predicted_time_seconds, gender, age_category=None):
             'faster_than_percent': None  # Brak procentu
         }
     
-    # Policz ilu zawodników miało lepszy (szybszy) czas
-    faster_runners = len(df_filtered[df_filtered['Czas_sekundy'] < predicted_time_seconds])  # Szybsi
+    times = group['times']  # Posortowane czasy
+    total_runners = group['total']  # Łączna liczba
     
-    # Policz ilu zawodników miało gorszy (wolniejszy) czas
-    slower_runners = len(df_filtered[df_filtered['Czas_sekundy'] > predicted_time_seconds])  # Wolniejsi
+    # Zawodnicy z szybszym czasem (< przewidywany) i wolniejszym (> przewidywany)
+    faster_runners = int(np.searchsorted(times, predicted_time_seconds, side='left'))  # Szybsi
+    slower_runners = len(times) - int(np.searchsorted(times, predicted_time_seconds, side='right'))  # Wolniejsi
     
     # Szacowana pozycja = liczba szybszych + 1
     # (jeśli 10 osób jest szybszych, to jesteś na 11 miejscu)
@@ -171,6 +394,56 @@ def estimate_ranking(df, predicted_time_seconds, gender, age_category=None):
     return result  # Zwróć słownik
 
 
+def estimate_ranking_batch(df, predicted_times, genders, age_categories=None, year=None):
+    """
+    Szacuje pozycje dla wielu przewidywanych czasów w jednym wywołaniu
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        predicted_times (array-like): Przewidywane czasy w sekundach
+        genders (str lub array-like): Płeć dla wszystkich lub dla każdego czasu
+        age_categories (str lub array-like, optional): Kategorie (None - klasyfikacja ogólna)
+        year (int, optional): Rok edycji (jeśli None - wszystkie lata)
+        
+    Returns:
+        pd.DataFrame: Kolumny jak w estimate_ranking, jeden wiersz na czas
+            (<NA>/NaN gdy brak danych dla grupy)
+    """
+    times = np.asarray(predicted_times, dtype=np.float64)  # Czasy do oceny
+    n = len(times)
+    genders = np.broadcast_to(np.asarray(genders, dtype=object), (n,))  # Płeć per czas
+    categories = np.broadcast_to(np.asarray(age_categories, dtype=object), (n,))  # Kategoria per czas
+    
+    index = get_ranking_index(df)  # Indeks rankingowy
+    position = np.full(n, -1, dtype=np.int64)  # -1 = brak danych
+    total = np.zeros(n, dtype=np.int64)
+    slower = np.zeros(n, dtype=np.int64)
+    
+    # Jedno wyszukiwanie binarne na grupę (płeć, kategoria)
+    groups = pd.DataFrame({'g': genders, 'c': categories}).groupby(['g', 'c'], dropna=False, sort=False).indices
+    for (gender, category), rows in groups.items():
+        category = None if pd.isna(category) else category  # NaN z groupby -> klasyfikacja ogólna
+        group = index.get((gender, category, year))
+        if group is None or group['total'] == 0:  # Brak danych dla grupy
+            continue
+        group_times = group['times']
+        position[rows] = np.searchsorted(group_times, times[rows], side='left') + 1  # Szybsi + 1
+        slower[rows] = len(group_times) - np.searchsorted(group_times, times[rows], side='right')  # Wolniejsi
+        total[rows] = group['total']
+    
+    has_data = position > 0  # Wiersze z danymi
+    with np.errstate(divide='ignore', invalid='ignore'):  # Dzielenie przez 0 dla pustych grup
+        percentile = np.where(has_data, np.round(position / total * 100, 1), np.nan)
+        faster_than = np.where(has_data, np.round(slower / total * 100, 1), np.nan)
+    
+    return pd.DataFrame({
+        'estimated_position': pd.Series(position, dtype='Int64').where(has_data),  # Pozycja (<NA> gdy brak danych)
+        'total_runners': total,  # Łączna liczba (0 gdy brak danych)
+        'percentile': percentile,  # Percentyl
+        'faster_than_percent': faster_than  # Procent wolniejszych
+    })
+
+
 def prepare_excel_export(df):
     """
     Przygotowuje DataFrame do eksportu jako Excel
@@ -215,23 +488,25 @@ def format_time_from_seconds(seconds):
     return f"{hours}:{minutes:02d}:{secs:02d}"  # Format H:MM:SS
 
 
-def get_winners_by_category(df):
+def _build_winners_by_category(df):
     """
-    Zwraca zwycięzców dla każdej kategorii wiekowej i płci w każdym roku
+    Buduje tabelę zwycięzców kategorii z indeksów zwycięzców w kostce
     
     Args:
         df (pd.DataFrame): Dane historyczne
         
     Returns:
-        pd.DataFrame: DataFrame ze zwycięzcami (min czas w każdej kategorii)
+        pd.DataFrame: Zwycięzcy (min czas w każdej kategorii) posortowani po roku, płci i kategorii
     """
-    # Grupuj po roku, płci i kategorii, znajdź minimalny czas
-    winners = df.loc[df.groupby(['Rok', 'Płeć', 'Kategoria wiekowa'])['Czas_sekundy'].idxmin()]
+    cube = get_stats_cube(df)  # Kostka agregatów
+    winner_labels = [
+        cell['winner_index'] for key, cell in cube.items()
+        if None not in key and cell['winner_index'] is not None  # Pełne klucze (rok, płeć, kategoria)
+    ]
+    winners = df.loc[winner_labels].copy()  # Wiersze zwycięzców
     
     # Dodaj sformatowany czas
-    winners['Czas_formatted'] = winners['Czas_sekundy'].apply(
-        lambda x: f"{int(x)//3600}:{(int(x)%3600)//60:02d}:{int(x)%60:02d}"
-    )
+    winners['Czas_formatted'] = _format_hms(winners['Czas_sekundy'])
     
     # Dodaj czas 5km sformatowany jeśli istnieje
     # Obsługa zarówno starej nazwy '5km_sekundy' jak i nowej '5 km Czas_sekundy'
@@ -252,6 +527,47 @@ def get_winners_by_category(df):
     return winners
 
 
+def get_winners_by_category(df):
+    """
+    Zwraca zwycięzców dla każdej kategorii wiekowej i płci w każdym roku
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        
+    Returns:
+        pd.DataFrame: DataFrame ze zwycięzcami (min czas w każdej kategorii)
+    """
+    winners = get_versioned(df, 'winners_by_category', _build_winners_by_category)  # Raz na wersję danych
+    return winners.copy()  # Kopia - wywołujący może ją modyfikować
+
+
+def _build_category_winners(df):
+    """Dzieli tabelę zwycięzców na słownik (kategoria, płeć) -> DataFrame"""
+    winners = get_versioned(df, 'winners_by_category', _build_winners_by_category)
+    return {
+        key: group for key, group in winners.groupby(['Kategoria wiekowa', 'Płeć'], sort=False)
+    }
+
+
+def get_category_winners(df, age_category, gender):
+    """
+    Zwraca zwycięzców z poszczególnych lat dla jednej kategorii i płci
+    
+    Args:
+        df (pd.DataFrame): Dane historyczne
+        age_category (str): Kategoria wiekowa (np. 'M30')
+        gender (str): Płeć ('M' lub 'K')
+        
+    Returns:
+        pd.DataFrame: Zwycięzcy kategorii (pusty DataFrame jeśli brak danych)
+    """
+    by_category = get_versioned(df, 'category_winners', _build_category_winners)  # Słownik grup
+    winners = by_category.get((age_category, gender))  # Odczyt O(1)
+    if winners is None:  # Brak zwycięzców w kategorii
+        return get_winners_by_category(df).iloc[0:0]  # Pusta tabela z tymi samymi kolumnami
+    return winners.copy()  # Kopia - wywołujący może ją modyfikować
+
+
 def get_average_times_by_category(df):
     """
     Zwraca średnie czasy dla każdej kategorii wiekowej i płci w każdym roku
@@ -262,21 +578,20 @@ def get_average_times_by_category(df):
     Returns:
         pd.DataFrame: DataFrame ze średnimi czasami
     """
-    # Grupuj i oblicz średnią
-    avg_times = df.groupby(['Rok', 'Płeć', 'Kategoria wiekowa']).agg({
-        'Czas_sekundy': 'mean',
-        'Płeć': 'count'  # Liczba zawodników
-    }).reset_index()
-    
-    # Zmień nazwę kolumny z liczbą zawodników
-    avg_times.columns = ['Rok', 'Płeć', 'Kategoria wiekowa', 'Średni_czas_sekundy', 'Liczba_zawodników']
+    # Komórki kostki z pełnym kluczem (rok, płeć, kategoria)
+    rows = [
+        list(key) + [cell['mean'], cell['count']]
+        for key, cell in get_stats_cube(df).items()
+        if None not in key
+    ]
+    avg_times = pd.DataFrame(
+        rows, columns=['Rok', 'Płeć', 'Kategoria wiekowa', 'Średni_czas_sekundy', 'Liczba_zawodników']
+    )
     
     # Dodaj sformatowany czas
-    avg_times['Średni_czas_formatted'] = avg_times['Średni_czas_sekundy'].apply(
-        lambda x: f"{int(x)//3600}:{(int(x)%3600)//60:02d}:{int(x)%60:02d}"
-    )
+    avg_times['Średni_czas_formatted'] = _format_hms(avg_times['Średni_czas_sekundy'])
     
     # Sortuj
-    avg_times = avg_times.sort_values(['Rok', 'Płeć', 'Kategoria wiekowa'])
+    avg_times = avg_times.sort_values(['Rok', 'Płeć', 'Kategoria wiekowa']).reset_index(drop=True)
     
     return avg_times